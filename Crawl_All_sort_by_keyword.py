@@ -17,7 +17,7 @@ def main():
     max_articles = 10
     
     # 设置关键词和权重
-    keywords = ["人工智能", "数据科学", "程序设计"]  # 最多3个关键词
+    keywords = ["人工智能", "数据科学", "程序设计"]  # 关键词数量不限
     weights = [1.5, 1.2, 1.0]  # 对应的权重，数量应与关键词相同
     
     print(f"准备在公众号 '{target_account}' 的文章中搜索关键词: {keywords}")
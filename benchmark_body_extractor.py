@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+正文提取各解析器的性能与一致性对比
+
+在同一批页面上分别运行ArticleBodyExtractor已安装的各个解析器（selectolax、lxml、BeautifulSoup），
+输出每页平均耗时，并以BeautifulSoup的结果为基准逐页比较正文、字数、图片和外链，
+有不一致的页面时打印差异并以非0状态码退出。
+
+页面来源与benchmark_publish_time.py相同，另外总会加入一个包含脚本、样式、模板和注释的边界页面。
+"""
+
+import contextlib
+import io
+import sys
+import time
+
+from benchmark_publish_time import load_pages
+from wechat_mp_crawler import ArticleBodyExtractor
+
+# 脚本、样式、模板中的文本不计入正文，注释和这些元素之后的文本计入正文
+EDGE_CASE_PAGE = (
+    "<html><head><style>p { color: red; }</style></head><body>"
+    "<div id='js_content'><p>第一段<b>加粗</b></p>"
+    "<template><p>模板内容<img src='template.png'></p></template>模板之后"
+    "<script>var hidden = '脚本内容';</script>脚本之后"
+    "<style>.x { }</style><!-- 注释内容 -->注释之后"
+    "<p><a href='https://example.com/a'>外链</a><a href='#top'>锚点</a><img data-src='https://example.com/1.png'></p>"
+    "</div><div>正文之外</div></body></html>"
+)
+
+
+def installed_backends():
+    """已安装的解析器列表，BeautifulSoup作为基准放在最前"""
+    return ["bs4"] + [backend for backend in ArticleBodyExtractor.available_backends() if backend != "bs4"]
+
+
+def time_backend(backend, pages, rounds=3):
+    """
+    多轮运行某个解析器，取最快一轮
+
+    Returns:
+        tuple: (每页平均耗时毫秒, 提取结果列表)
+    """
+    extractor = ArticleBodyExtractor(backend=backend)
+    best = None
+    results = None
+    for _ in range(rounds):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            results = [extractor.extract(page) for page in pages]
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000 / len(pages), results
+
+
+def compare_results(baseline, results):
+    """
+    逐页比较提取结果
+
+    Returns:
+        list: [(页面序号, 字段, 基准值, 实际值), ...]
+    """
+    differences = []
+    for i, (expected, actual) in enumerate(zip(baseline, results)):
+        for field in ("text", "word_count", "images", "links"):
+            if expected[field] != actual[field]:
+                differences.append((i, field, expected[field], actual[field]))
+    return differences
+
+
+def main():
+    # 设置参数
+    pages_dir = sys.argv[1] if len(sys.argv) > 1 else "saved_pages"
+    rounds = 3
+
+    source, pages = load_pages(pages_dir)
+    pages = [EDGE_CASE_PAGE] + pages
+    print(f"页面来源: {source}（另加1个边界页面），共 {len(pages)} 页")
+
+    backends = installed_backends()
+    baseline_ms, baseline = time_backend("bs4", pages, rounds)
+    print(f"bs4:        {baseline_ms:.2f} ms/页（基准）")
+
+    mismatched = False
+    for backend in backends[1:]:
+        backend_ms, results = time_backend(backend, pages, rounds)
+        differences = compare_results(baseline, results)
+        print(f"{backend + ':':<11} {backend_ms:.2f} ms/页，提速 {baseline_ms / backend_ms:.1f} 倍，"
+              f"与基准不一致 {len({i for i, *_ in differences})}/{len(pages)} 页")
+        for i, field, expected, actual in differences[:5]:
+            print(f"  第{i}页 {field}: 基准 {str(expected)[:80]!r}，{backend} {str(actual)[:80]!r}")
+        mismatched = mismatched or bool(differences)
+
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
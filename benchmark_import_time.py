@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+模块导入耗时测试
+
+在新的Python子进程中反复导入wechat_mp_crawler，输出冷启动导入耗时（取中位数），
+并列出导入后已加载的重量级依赖以及各依赖单独导入的耗时。
+wechat_mp_crawler只在用到时才导入这些依赖，正常情况下导入后不应加载其中任何一个。
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+# 按需导入的重量级依赖
+HEAVY_MODULES = [
+    "pandas",
+    "selenium.webdriver.support.ui",
+    "webdriver_manager.chrome",
+    "bs4",
+    "wechatarticles",
+    "requests",
+    "openpyxl",
+    "xlsxwriter",
+    "pyarrow.parquet",
+    "asyncio",
+    "lxml.etree",
+    "selectolax.lexbor",
+    "ahocorasick",
+    "zstandard",
+    "sqlite3",
+    "concurrent.futures.process",
+]
+
+TIMING_CODE = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print((time.perf_counter() - start) * 1000)\n"
+)
+
+LOADED_CODE = (
+    "import sys\n"
+    "import wechat_mp_crawler\n"
+    "print(','.join(m for m in {modules!r} if m in sys.modules))\n"
+)
+
+
+def run_python(code):
+    """在新的子进程中执行代码，返回标准输出；执行失败时返回None"""
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+def time_import(module, rounds=5):
+    """
+    多次在新进程中导入模块
+
+    Returns:
+        float: 导入耗时中位数（毫秒），模块未安装时返回None
+    """
+    timings = []
+    for _ in range(rounds):
+        output = run_python(TIMING_CODE.format(module=module))
+        if output is None:
+            return None
+        timings.append(float(output))
+    return statistics.median(timings)
+
+
+def main():
+    # 设置参数
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    # 先导入一次，保证.pyc已生成
+    run_python("import wechat_mp_crawler")
+
+    crawler_ms = time_import("wechat_mp_crawler", rounds)
+    if crawler_ms is None:
+        print("导入wechat_mp_crawler失败")
+        return
+    print(f"导入wechat_mp_crawler: {crawler_ms:.0f} ms（{rounds}次取中位数）")
+
+    loaded = run_python(LOADED_CODE.format(modules=HEAVY_MODULES))
+    print(f"导入后已加载的重量级依赖: {loaded or '无'}")
+
+    print("各依赖单独导入耗时（只在用到时才会付出）:")
+    for module in HEAVY_MODULES:
+        module_ms = time_import(module, rounds)
+        if module_ms is None:
+            print(f"  {module:<26} 未安装")
+        else:
+            print(f"  {module:<26} {module_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
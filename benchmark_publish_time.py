@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+发布时间提取性能对比
+
+在保存的文章页面上分别运行旧的提取方式（每页构建BeautifulSoup DOM、逐个执行未编译的正则）
+和PublishTimeExtractor，输出每页平均耗时、两者结果是否一致以及各提取方法的命中次数。
+
+页面来源（按顺序选择第一个可用的）：
+1. pages_dir 目录下保存的 *.html 文件
+2. 文章本地存储 article_store/ 中保存的页面
+3. 都没有时生成模拟页面
+"""
+
+import contextlib
+import glob
+import io
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+from wechat_mp_crawler import ArticleStore, PublishTimeExtractor
+
+
+def load_pages(pages_dir="saved_pages", store_dir="article_store", synthetic_count=200):
+    """
+    读取用于测试的页面
+
+    Returns:
+        tuple: (页面来源说明, 页面HTML列表)
+    """
+    files = sorted(glob.glob(os.path.join(pages_dir, "*.html")))
+    if files:
+        pages = []
+        for filename in files:
+            with open(filename, "r", encoding="utf-8", errors="ignore") as f:
+                pages.append(f.read())
+        return f"{pages_dir}/ 目录", pages
+
+    if os.path.isdir(store_dir):
+        pages = [record["html"] for record in ArticleStore(store_dir).iter_records() if record.get("html")]
+        if pages:
+            return f"文章本地存储 {store_dir}/", pages
+
+    return "模拟页面", [make_synthetic_page(i) for i in range(synthetic_count)]
+
+
+def make_synthetic_page(seed):
+    """生成结构与微信文章页面类似的模拟页面（几百KB，时间戳位于正文之后的脚本中）"""
+    rng = random.Random(seed)
+    timestamp = rng.randint(1500000000, 1750000000)
+    paragraphs = "".join(
+        f"<p>第{i}段 正文内容，提到了 {2000 + rng.randint(0, 25)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)} 这样的日期。</p>"
+        for i in range(rng.randint(200, 600))
+    )
+    filler_script = "".join(f"<script>var v{i} = '{'x' * 200}';</script>" for i in range(300))
+    return (
+        "<html><head><meta charset='utf-8'>" + filler_script + "</head><body>"
+        "<div id='js_content'>" + paragraphs + "</div>"
+        "<em id='publish_time' class='rich_media_meta rich_media_meta_text'></em>"
+        "<script>var nickname = \"测试公众号\";\nvar appmsg_type = \"9\";\n"
+        f"var ct = \"{timestamp}\";\nvar publish_time = \"\" || \"\";</script>"
+        "</body></html>"
+    )
+
+
+def legacy_extract(page_text):
+    """旧的提取方式：每页先构建DOM，再逐个执行未预编译的正则（方法顺序与原实现一致）"""
+    soup = BeautifulSoup(page_text, "html.parser")
+    timestamp_patterns = [
+        r'var\s+ct\s*=\s*["\'](\d{10})["\']',
+        r'ct\s*=\s*["\'](\d{10})["\']',
+        r'"ct"\s*:\s*["\']?(\d{10})["\']?',
+        r'create_time["\']?\s*:\s*["\']?(\d{10})["\']?',
+        r'publish_time["\']?\s*:\s*["\']?(\d{10})["\']?',
+        r'var\s+t\s*=\s*["\'](\d{10})["\']',
+        r'"(\d{10})",n="(\d{10})",s="([^"]+)"',
+        r't\s*=\s*["\'](\d{10})["\']',
+        r'["\'](\d{10})["\'],\s*n\s*=\s*["\'](\d{10})["\']',
+    ]
+    for pattern in timestamp_patterns:
+        matches = re.findall(pattern, page_text, re.IGNORECASE)
+        if matches:
+            first = matches[0] if isinstance(matches[0], tuple) else (matches[0],)
+            for item in first:
+                if item.isdigit() and len(item) == 10 and 946684800 <= int(item) <= 1893456000:
+                    publish_date_obj = datetime.fromtimestamp(int(item))
+                    return publish_date_obj.date(), publish_date_obj.strftime('%Y-%m-%d %H:%M:%S')
+
+    publish_time_element = soup.select_one('#publish_time') or soup.select_one('.publish_time')
+    if publish_time_element and publish_time_element.text.strip():
+        text = publish_time_element.text.strip()
+        for date_format in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y年%m月%d日 %H:%M', '%Y年%m月%d日']:
+            try:
+                return datetime.strptime(text, date_format).date(), text
+            except ValueError:
+                continue
+
+    for pattern in [r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', r'\d{4}-\d{2}-\d{2}']:
+        for match in re.findall(pattern, page_text):
+            for date_format in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d']:
+                try:
+                    return datetime.strptime(match, date_format).date(), match
+                except ValueError:
+                    continue
+    return None, ""
+
+
+def time_extraction(extract, pages, rounds=3):
+    """
+    多轮运行提取函数，取最快一轮
+
+    Returns:
+        tuple: (每页平均耗时毫秒, 提取结果列表)
+    """
+    best = None
+    results = None
+    for _ in range(rounds):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            results = [extract(page) for page in pages]
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000 / len(pages), results
+
+
+def main():
+    # 设置参数
+    pages_dir = sys.argv[1] if len(sys.argv) > 1 else "saved_pages"
+    rounds = 3
+
+    source, pages = load_pages(pages_dir)
+    total_kb = sum(len(page) for page in pages) / 1024
+    print(f"页面来源: {source}，共 {len(pages)} 页，平均 {total_kb / len(pages):.0f} KB/页")
+
+    legacy_ms, legacy_results = time_extraction(legacy_extract, pages, rounds)
+    extractor = PublishTimeExtractor()
+    fast_ms, fast_results = time_extraction(extractor.extract, pages, rounds)
+
+    same = sum(1 for a, b in zip(legacy_results, fast_results) if a[0] == b[0])
+    found = sum(1 for result in fast_results if result[0])
+
+    print(f"旧方式（DOM + 未编译正则）: {legacy_ms:.2f} ms/页")
+    print(f"PublishTimeExtractor:        {fast_ms:.2f} ms/页，提速 {legacy_ms / fast_ms:.1f} 倍")
+    print(f"提取成功 {found}/{len(pages)} 页，与旧方式结果一致 {same}/{len(pages)} 页")
+
+    report = extractor.report()
+    print(f"各方法命中次数: {report['methods']}")
+    print(f"当前时间戳正则顺序: {report['order']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,6 @@ try:
         WechatArticleManager,
         read_accounts_from_excel,
         save_articles_to_excel,   # 直接复用原有 Excel 输出逻辑
-        ArticleAnalyzer           # 关键：拿来做关键词评分排序
     )
 except ImportError as e:
     print("❌ 无法导入 wechat_mp_crawler 中的核心组件，请确认文件名/包路径！")
@@ -25,10 +24,13 @@ def crawl_and_rank(
     days: int = 4,
     keywords: List[str] = None,
     weights: List[float] = None,
-    headless: bool = False
+    headless: bool = False,
+    ranking: str = "count"
 ):
     """
     主流程：读取账号列表 → 爬取最近文章 → 关键词分析排序 → 写入 Excel。
+
+    ranking: "count" 按关键词次数×权重排序；"bm25" 按 BM25 相关性排序（考虑文章长度和关键词稀有程度）
     """
     # -------- 读取公众号列表 --------
     account_list = read_accounts_from_excel(accounts_file)
@@ -49,13 +51,23 @@ def crawl_and_rank(
     articles, stats = manager.crawler.fetch_wechat_articles(
         nickname_list=account_list,
         articles_per_account=articles_per_account,
-        days=days
+        days=days,
+        skip_seen=manager.dedup_index is not None   # 跳过之前已爬取过的文章
     )
 
     if not articles:
         print("⚠️  未抓取到任何文章，程序结束。")
         return
 
+    # 爬取结果写入文章数据库，Excel 最后从数据库导出
+    database = manager.database
+    run_id = manager.start_database_run("keyword_rank", {
+        "accounts": account_list, "articles_per_account": articles_per_account, "days": days
+    })
+    if database is not None:
+        database.upsert_articles(articles, run_id)
+        database.update_accounts(account_list, manager.fakeid_cache)
+
     # -------- 关键词设置（若用户未指定则交互式输入 / 用默认） --------
     if not keywords:
         # 默认使用与示例相同的关键词
@@ -67,7 +79,8 @@ def crawl_and_rank(
     print(f"\n🔍 关键词列表：{keywords}")
     print(f"   权重列表： {weights}")
 
-    analyzer = ArticleAnalyzer()
+    # 复用管理器的分析器：爬取阶段下载过的文章页面直接从缓存读取，不再重复下载
+    analyzer = manager.analyzer
 
     # -------- 按公众号分组并做关键词排序 --------
     articles_by_account = defaultdict(list)
@@ -85,21 +98,35 @@ def crawl_and_rank(
         ranked = analyzer.analyze_articles_with_keywords(
             acc_articles,
             keywords=keywords,
-            weights=weights
+            weights=weights,
+            ranking=ranking
         )
         sorted_articles_all.extend(ranked)
+        if database is not None:
+            database.save_analysis(ranked, keywords, weights, ranking, run_id)
 
-    # -------- 输出到 Excel（复用原 save_articles_to_excel） --------
+    # -------- 输出到 Excel（从数据库导出；未启用数据库时复用原 save_articles_to_excel） --------
     current_date = datetime.now()
     output_file = f"{current_date.month}月{current_date.day}号wechat_articles.xlsx"
 
     print(f"\n💾 正在写入 Excel：{output_file}")
-    save_articles_to_excel(
-        articles_info=sorted_articles_all,
-        stats=stats,
-        output_file=output_file,
-        filter_existing=True   # 仍然按照昨天的文件去重
-    )
+    if database is not None:
+        database.finish_run(run_id)
+        database.export_to_excel(
+            output_file,
+            stats=stats,
+            filter_existing=manager.dedup_index is None,   # 启用去重索引时已在爬取时跳过
+            run_id=run_id,
+            nicknames=account_list,
+            analysis=(keywords, weights, ranking)
+        )
+    else:
+        save_articles_to_excel(
+            articles_info=sorted_articles_all,
+            stats=stats,
+            output_file=output_file,
+            filter_existing=manager.dedup_index is None   # 未启用去重索引时按照昨天的文件去重
+        )
 
     print("\n🎉 全部完成！")
     print(f"   Excel 已生成：{output_file}")
@@ -114,5 +141,6 @@ if __name__ == "__main__":
         days=2,
         keywords=["嘉定校区", "济人楼", "艺嘉楼"],   # ✅ 如需自定义请修改
         weights=[1.5, 1.2, 1.0],                    # ✅ 权重应与关键词一一对应
-        headless=False                              # ✅ 设为 True 则无头运行
+        headless=False,                             # ✅ 设为 True 则无头运行
+        ranking="count"                             # ✅ 设为 "bm25" 则按相关性排序
     )
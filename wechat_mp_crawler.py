@@ -1,28 +1,51 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import abc
 import time
 import random
 import pickle
 import csv
 import os
+import glob
+import json
+import threading
+import queue
+import gzip
+import hashlib
+import itertools
+import math
+import importlib
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from wechatarticles import PublicAccountsWeb
+
+# 较重的依赖（pandas、selenium、webdriver_manager、bs4、wechatarticles、requests、openpyxl等）以及
+# 可选依赖（lxml、selectolax、pyahocorasick、zstandard、xlsxwriter、pyarrow）、sqlite3和多进程模块
+# 只在用到它们的函数或类中导入：凭证有效时不加载selenium，不读写Excel时不加载pandas，
+# 频繁运行的短任务不必每次都付出全部依赖的导入时间（见benchmark_import_time.py）
 
 
 # ============ 通用辅助函数 ============
 
+def import_optional(module_name):
+    """
+    按需导入可选依赖（如xlsxwriter、pyarrow），只在真正用到时才加载
+    
+    Args:
+        module_name: 模块名
+        
+    Returns:
+        module: 模块对象，未安装时返回None
+    """
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
+
+
 def create_accounts_excel_file(filename="accounts.xlsx", example_accounts=None):
     """创建示例公众号名称Excel文件"""
     if example_accounts is None:
@@ -34,6 +57,7 @@ def create_accounts_excel_file(filename="accounts.xlsx", example_accounts=None):
         return
     
     # 创建DataFrame并写入Excel
+    import pandas as pd
     df = pd.DataFrame({"nickname": example_accounts})
     df.to_excel(filename, index=False)
     
@@ -41,8 +65,13 @@ def create_accounts_excel_file(filename="accounts.xlsx", example_accounts=None):
     print(f"包含的公众号: {', '.join(example_accounts)}")
 
 
-def read_accounts_from_excel(filename="accounts.xlsx"):
-    """从Excel文件读取公众号名称列表"""
+def read_accounts_from_excel(filename="accounts.xlsx", fakeid_cache_file="fakeid_cache.json"):
+    """
+    从Excel文件读取公众号名称列表
+    
+    如果Excel中还有fakeid列，会把填写了fakeid的公众号写入fakeid缓存，
+    爬取时即可跳过公众号搜索接口
+    """
     if not os.path.exists(filename):
         print(f"文件 {filename} 不存在，将创建示例文件。")
         create_accounts_excel_file(filename)
@@ -50,12 +79,25 @@ def read_accounts_from_excel(filename="accounts.xlsx"):
     accounts = []
     try:
         # 读取Excel文件
+        import pandas as pd
         df = pd.read_excel(filename)
         
         # 检查是否有nickname列
         if 'nickname' in df.columns:
             # 过滤掉空值并转换为列表
             accounts = df['nickname'].dropna().astype(str).tolist()
+            
+            # 可选的fakeid列：预先写入缓存
+            if 'fakeid' in df.columns and fakeid_cache_file:
+                known = df.dropna(subset=['nickname', 'fakeid'])
+                fakeid_map = {
+                    str(nickname): str(fakeid).strip()
+                    for nickname, fakeid in zip(known['nickname'], known['fakeid'])
+                    if str(fakeid).strip()
+                }
+                if fakeid_map:
+                    FakeidCache(fakeid_cache_file).update_from_mapping(fakeid_map, source='excel')
+                    print(f"从 {filename} 的fakeid列读取到 {len(fakeid_map)} 个公众号的fakeid")
         else:
             print(f"警告: Excel文件 {filename} 中没有找到'nickname'列")
     except Exception as e:
@@ -65,12 +107,66 @@ def read_accounts_from_excel(filename="accounts.xlsx"):
     return accounts
 
 
-def get_existing_article_titles(date=None):
-    """获取指定日期Excel文件中的文章标题"""
+def load_json_file(filename, default=None):
+    """读取JSON文件，文件不存在或损坏时返回default"""
+    if not filename or not os.path.exists(filename):
+        return default
+    
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"读取 {filename} 时出错: {e}")
+        return default
+
+
+def save_json_file(filename, data):
+    """写入JSON文件（先写临时文件再替换，避免中途退出导致文件损坏）"""
+    try:
+        tmp_file = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, filename)
+        return True
+    except Exception as e:
+        print(f"保存 {filename} 时出错: {e}")
+        return False
+
+
+def read_credentials_file(filename):
+    """
+    读取weixin_credentials.py格式的凭证文件
+    
+    Args:
+        filename: 凭证文件路径
+        
+    Returns:
+        tuple: (token, cookie)，缺失时为空字符串
+    """
+    # 动态导入模块
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("credentials", filename)
+    credentials = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(credentials)
+    
+    return getattr(credentials, 'token', ''), getattr(credentials, 'cookie', '')
+
+
+def get_existing_article_titles(date=None, database=None):
+    """
+    获取指定日期（默认昨天）爬到的文章标题
+    
+    传入ArticleDatabase时直接查询数据库，否则读取当天的Excel文件
+    """
     if date is None:
         # 使用昨天的日期
         date = datetime.now().date() - timedelta(days=1)
     
+    if database is not None:
+        titles = database.titles_first_seen_on(date)
+        print(f"从数据库中读取到 {date} 爬取的 {len(titles)} 个文章标题")
+        return titles
+    
     # 根据日期生成文件名
     file_name = f"{date.month}月{date.day}号wechat_articles.xlsx"
     
@@ -81,6 +177,7 @@ def get_existing_article_titles(date=None):
     
     try:
         # 读取Excel文件
+        import pandas as pd
         df = pd.read_excel(file_name, sheet_name='文章信息', skiprows=3)
         
         # 检查是否有title列
@@ -97,8 +194,16 @@ def get_existing_article_titles(date=None):
         return set()
 
 
-def save_articles_to_excel(articles_info, stats=None, output_file=None, filter_existing=True, stats_message=None):
-    """将爬取的文章信息保存到Excel文件，可选择是否排除已存在的文章"""
+# 只保存在文章信息中供后续处理使用、不写入Excel的字段
+EXCEL_EXCLUDED_COLUMNS = ['image_urls', 'outbound_links']
+
+
+def save_articles_to_excel(articles_info, stats=None, output_file=None, filter_existing=True, stats_message=None, database=None):
+    """
+    将爬取的文章信息保存到Excel文件，可选择是否排除已存在的文章（传入database时从数据库查询昨天的文章）
+    
+    articles_info可以是列表或生成器；不过滤时文章逐行写入ExcelArticleSink，不构建DataFrame
+    """
     # 如果未指定输出文件名，则根据当前日期生成
     if output_file is None:
         current_date = datetime.now()
@@ -107,10 +212,10 @@ def save_articles_to_excel(articles_info, stats=None, output_file=None, filter_e
     filtered_articles = articles_info
     filtered_count = 0
     
-    # 只有当需要过滤已存在文章时才执行
+    # 只有当需要过滤已存在文章时才执行（统计信息中的过滤数量要写在首行，需要先过滤完）
     if filter_existing:
-        # 获取昨天Excel文件中的文章标题
-        existing_titles = get_existing_article_titles()
+        # 获取昨天爬到的文章标题
+        existing_titles = get_existing_article_titles(database=database)
         
         # 过滤掉已存在的文章
         filtered_articles = []
@@ -118,82 +223,71 @@ def save_articles_to_excel(articles_info, stats=None, output_file=None, filter_e
         for article in articles_info:
             if article['title'] in existing_titles:
                 filtered_count += 1
-                print(f"文章已存在于昨天的Excel中，将被过滤: {article['title']}")
+                print(f"文章昨天已经爬取过，将被过滤: {article['title']}")
             else:
                 filtered_articles.append(article)
         
         print(f"过滤掉 {filtered_count} 篇已存在的文章，剩余 {len(filtered_articles)} 篇新文章")
     
-    # 如果没有文章信息
-    if not filtered_articles:
+    # 创建自定义统计信息
+    if stats and stats_message is None:
+        stats_message = f"需要爬取的公众号一共{stats.get('total_accounts', 0)}个，"\
+                      f"其中{stats.get('accounts_updated_recently', 0)}个最近有更新，"\
+                      f"其中{stats.get('accounts_not_updated', 0)}个最近未更新，"\
+                      f"过滤掉{filtered_count + stats.get('existing_articles_skipped', 0)}篇已存在的文章"
+    
+    # 如果没有文章信息，只有在有统计信息时才创建Excel文件保存统计信息
+    filtered_articles = iter(filtered_articles)
+    first_article = next(filtered_articles, None)
+    if first_article is None:
         print("没有文章信息可以保存")
-        
-        # 如果有统计信息，则创建一个Excel文件保存
-        if stats:
-            # 创建自定义统计信息
-            if stats_message is None:
-                stats_message = f"需要爬取的公众号一共{stats.get('total_accounts', 0)}个，"\
-                              f"其中{stats.get('accounts_updated_recently', 0)}个最近有更新，"\
-                              f"其中{stats.get('accounts_not_updated', 0)}个最近未更新，"\
-                              f"过滤掉{filtered_count}篇已存在的文章"
-                              
-            df_stats = pd.DataFrame([{'统计信息': stats_message}])
-            df_stats.to_excel(output_file, index=False)
+        if stats_message:
+            ExcelArticleSink(output_file, stats_message=stats_message).close()
             print(f"\n统计信息已保存到 {output_file}")
         return
     
-    # 创建文章信息DataFrame
-    df_articles = pd.DataFrame(filtered_articles)
-    
-    # 调整列的顺序，确保nickname, title, link, publish_time在前面
-    preferred_columns = ['nickname', 'title', 'link', 'publish_time', 'publish_date']
-    available_columns = [col for col in preferred_columns if col in df_articles.columns]
-    other_columns = [col for col in df_articles.columns if col not in preferred_columns]
-    all_columns = available_columns + other_columns
-    df_articles = df_articles[all_columns]
-    
-    # 创建ExcelWriter对象
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        # 如果有统计信息，先写入统计信息
-        if stats:
-            # 创建自定义统计信息
-            if stats_message is None:
-                stats_message = f"需要爬取的公众号一共{stats.get('total_accounts', 0)}个，"\
-                              f"其中{stats.get('accounts_updated_recently', 0)}个最近有更新，"\
-                              f"其中{stats.get('accounts_not_updated', 0)}个最近未更新，"\
-                              f"过滤掉{filtered_count}篇已存在的文章"
-                              
-            stats_row = pd.DataFrame([{'统计信息': stats_message}])
-            stats_row.to_excel(writer, sheet_name='文章信息', index=False)
-            
-            # 写入文章信息，从第4行开始（给统计信息留出空间）
-            df_articles.to_excel(writer, sheet_name='文章信息', startrow=3, index=False)
-        else:
-            # 没有统计信息，直接写入文章信息
-            df_articles.to_excel(writer, sheet_name='文章信息', index=False)
+    # 统计信息（由stats生成或调用方直接传入）写在首行，文章信息从第4行开始（给统计信息留出空间）；
+    # 图片、外链等列表字段不写入Excel
+    sink = ExcelArticleSink(output_file, stats_message=stats_message)
+    try:
+        sink.write_many(itertools.chain([first_article], filtered_articles))
+    finally:
+        sink.close()
     
     print(f"\n文章信息已保存到 {output_file}")
-    if stats and stats_message:
+    if stats_message:
         print(f"统计信息: {stats_message}")
-    print(f"共保存了 {len(filtered_articles)} 篇文章")
+    print(f"共保存了 {sink.count} 篇文章")
 
 
 # ============ 核心类：认证与凭证管理 ============
 
 class WechatAuthManager:
-    """微信公众平台凭证管理类"""
+    """
+    微信公众平台凭证管理类
     
-    def __init__(self, credentials_file="weixin_credentials.py"):
+    凭证最近一次成功请求的时间记录在validation_file中，在validation_ttl秒内再次启动时
+    不再调用搜索接口在线验证；运行中途凭证失效时由reauthenticate重新登录
+    """
+    
+    def __init__(self, credentials_file="weixin_credentials.py", validation_file="credential_validation.json",
+                 validation_ttl=3600):
         """
         初始化认证管理器
         
         Args:
             credentials_file: 凭证文件路径
+            validation_file: 凭证最近成功使用时间的记录文件，为None时每次都在线验证
+            validation_ttl: 距最近一次成功请求多少秒内不再在线验证
         """
         self.credentials_file = credentials_file
+        self.validation_file = validation_file
+        self.validation_ttl = validation_ttl
         self.cookie = None
         self.token = None
         self.crawler = None
+        self.last_recorded_success = 0
+        self.lock = threading.Lock()
     
     def load_credentials(self):
         """
@@ -207,15 +301,8 @@ class WechatAuthManager:
                 print(f"凭证文件 {self.credentials_file} 不存在，需要登录获取")
                 return False
             
-            # 动态导入模块
-            import importlib.util
-            spec = importlib.util.spec_from_file_location("credentials", self.credentials_file)
-            credentials = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(credentials)
-            
             # 获取token和cookie
-            self.token = getattr(credentials, 'token', '')
-            self.cookie = getattr(credentials, 'cookie', '')
+            self.token, self.cookie = read_credentials_file(self.credentials_file)
             
             if not self.token or not self.cookie:
                 print("凭证文件中没有有效的token或cookie")
@@ -223,6 +310,12 @@ class WechatAuthManager:
             
             print(f"已从 {self.credentials_file} 加载token和cookie")
             
+            # 最近成功使用过的凭证不再在线验证（节省一次受限的搜索请求）
+            last_success = self.last_success_time()
+            if last_success and time.time() - last_success < self.validation_ttl:
+                print(f"凭证在 {(time.time() - last_success) / 60:.0f} 分钟前成功使用过，跳过在线验证")
+                return True
+            
             # 测试凭证是否有效
             return self.test_credentials()
         except Exception as e:
@@ -244,6 +337,7 @@ class WechatAuthManager:
         
         try:
             # 创建临时的PublicAccountsWeb实例
+            from wechatarticles import PublicAccountsWeb
             web = PublicAccountsWeb(cookie=self.cookie, token=self.token)
             
             # 尝试获取一个公众号的信息（可以是任何存在的公众号）
@@ -253,6 +347,7 @@ class WechatAuthManager:
             # 检查返回结果
             if result is not None:
                 print("保存的凭证有效，可以继续使用")
+                self.record_success()
                 return True
             else:
                 print("保存的凭证无效，需要重新登录")
@@ -262,6 +357,78 @@ class WechatAuthManager:
             print("将尝试重新登录获取新的凭证")
             return False
     
+    def credentials_fingerprint(self):
+        """当前token和cookie的摘要，凭证更换后旧的验证记录不再适用"""
+        return hashlib.sha1(f"{self.token}|{self.cookie}".encode('utf-8')).hexdigest()
+    
+    def last_success_time(self):
+        """
+        当前凭证最近一次成功请求的时间
+        
+        Returns:
+            float: 时间戳，没有记录时为None
+        """
+        if not self.validation_file:
+            return None
+        record = load_json_file(self.validation_file, {}).get(self.credentials_file) or {}
+        if record.get('fingerprint') != self.credentials_fingerprint():
+            return None
+        return record.get('last_success_at')
+    
+    def record_success(self, timestamp=None):
+        """
+        记录凭证成功完成了一次请求（爬取过程中每分钟最多写入一次文件）
+        
+        Args:
+            timestamp: 成功请求的时间，默认为当前时间
+        """
+        if not self.validation_file or not self.token:
+            return
+        timestamp = timestamp or time.time()
+        with self.lock:
+            if timestamp - self.last_recorded_success < 60:
+                return
+            self.last_recorded_success = timestamp
+            records = load_json_file(self.validation_file, {})
+            records[self.credentials_file] = {'fingerprint': self.credentials_fingerprint(), 'last_success_at': timestamp}
+            save_json_file(self.validation_file, records)
+    
+    def invalidate_validation(self):
+        """凭证失效时清除验证记录，下次启动会重新在线验证"""
+        with self.lock:
+            self.last_recorded_success = 0
+            if not self.validation_file:
+                return
+            records = load_json_file(self.validation_file, {})
+            if records.pop(self.credentials_file, None) is not None:
+                save_json_file(self.validation_file, records)
+    
+    def reauthenticate(self, headless=False):
+        """
+        运行中途凭证失效后重新获取凭证
+        
+        先重新读取凭证文件（可能已被其他进程更新），仍然无效时重新登录
+        
+        Args:
+            headless: 是否使用无头模式
+            
+        Returns:
+            bool: 是否获取到有效凭证
+        """
+        print("凭证已失效，正在重新认证...")
+        expired_token = self.token
+        self.invalidate_validation()
+        try:
+            token, cookie = read_credentials_file(self.credentials_file) if os.path.exists(self.credentials_file) else ('', '')
+        except Exception as e:
+            print(f"重新读取凭证文件时出错: {e}")
+            token, cookie = '', ''
+        if token and cookie and token != expired_token:
+            self.token, self.cookie = token, cookie
+            if self.test_credentials():
+                return True
+        return self.login_and_get_credentials(headless=headless)
+    
     def login_and_get_credentials(self, headless=False):
         """
         登录并获取凭证
@@ -276,10 +443,9 @@ class WechatAuthManager:
         self.crawler = WeixinMpCrawler(headless=headless)
         
         try:
-            # 登录并获取凭证
+            # 登录并获取凭证（login在页面加载完成后才返回，不需要额外等待）
             self.crawler.login()
             print("正在获取token和cookie...")
-            time.sleep(5)  # 等待页面完全加载
             
             # 获取凭证
             self.token = self.crawler.get_token()
@@ -294,8 +460,9 @@ class WechatAuthManager:
             print(f"token: {self.token}")
             print(f"cookie: {self.cookie[:50]}..." if len(self.cookie or '') > 50 else f"cookie: {self.cookie}")
             
-            # 保存凭证到文件
+            # 保存凭证到文件（刚登录的凭证视为刚验证过）
             self.save_credentials()
+            self.record_success()
             return True
         finally:
             if self.crawler:
@@ -333,22 +500,57 @@ class WechatAuthManager:
 # ============ 核心类：登录爬虫 ============
 
 class WeixinMpCrawler:
-    """微信公众平台登录爬虫，获取token和cookie"""
+    """
+    微信公众平台登录爬虫，获取token和cookie
     
-    def __init__(self, headless=False):
+    chromedriver的路径缓存在driver_cache_file中，不必每次登录都调用ChromeDriverManager联网检查；
+    浏览器使用profile_dir中的持久化用户目录，登录会话未过期时打开页面即已登录，不需要再次扫码
+    """
+    
+    def __init__(self, headless=False, profile_dir="chrome_profile", driver_cache_file="chromedriver_path.json"):
         """
         初始化爬虫
         
         Args:
             headless: 是否使用无头模式（不显示浏览器窗口）
+            profile_dir: 浏览器用户数据目录，为None时每次使用全新的浏览器配置（总是需要扫码）
+            driver_cache_file: chromedriver路径缓存文件，为None时每次都通过ChromeDriverManager获取
         """
         self.url = "https://mp.weixin.qq.com/"
         self.browser = None
         self.headless = headless
+        self.profile_dir = profile_dir
+        self.driver_cache_file = driver_cache_file
         self.setup_browser()
+    
+    def get_driver_path(self, refresh=False):
+        """
+        获取chromedriver路径，优先使用缓存的路径
+        
+        Args:
+            refresh: 是否忽略缓存重新下载/检查（例如Chrome升级后旧驱动无法启动）
+            
+        Returns:
+            str: chromedriver可执行文件路径
+        """
+        if self.driver_cache_file and not refresh:
+            driver_path = load_json_file(self.driver_cache_file, {}).get('driver_path')
+            if driver_path and os.path.exists(driver_path):
+                return driver_path
+        
+        from webdriver_manager.chrome import ChromeDriverManager
+        driver_path = ChromeDriverManager().install()
+        if self.driver_cache_file:
+            save_json_file(self.driver_cache_file, {'driver_path': driver_path,
+                                                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+        return driver_path
         
     def setup_browser(self):
         """配置浏览器"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        
         chrome_options = Options()
         if self.headless:
             chrome_options.add_argument("--headless")
@@ -359,29 +561,87 @@ class WeixinMpCrawler:
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--window-size=1920,1080")
         
-        # 初始化浏览器
-        service = Service(ChromeDriverManager().install())
-        self.browser = webdriver.Chrome(service=service, options=chrome_options)
+        # 持久化的浏览器用户目录，保留上次登录的会话
+        if self.profile_dir:
+            chrome_options.add_argument(f"--user-data-dir={os.path.abspath(self.profile_dir)}")
+        
+        # 初始化浏览器；缓存的驱动无法启动时（如Chrome已升级）重新获取一次
+        cached_driver = self.get_driver_path()
+        try:
+            self.browser = webdriver.Chrome(service=Service(cached_driver), options=chrome_options)
+        except Exception as e:
+            driver_path = self.get_driver_path(refresh=True)
+            if driver_path == cached_driver:
+                raise
+            print(f"缓存的chromedriver无法启动（{e}），已重新获取")
+            self.browser = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+    
+    def is_logged_in(self, driver=None):
+        """
+        当前页面是否已经是登录后的页面
+        
+        Args:
+            driver: WebDriverWait传入的浏览器实例，默认为self.browser
+            
+        Returns:
+            bool: 是否已登录
+        """
+        from selenium.webdriver.common.by import By
+        
+        driver = driver or self.browser
+        try:
+            # 尝试多种可能表示登录成功的标志
+            return bool("/cgi-bin/home" in driver.current_url or
+                        driver.find_elements(By.CLASS_NAME, "weui-desktop-panel__title") or
+                        driver.find_elements(By.CLASS_NAME, "menu_item") or
+                        driver.find_elements(By.ID, "menuBar"))
+        except Exception:
+            return False
+    
+    def wait_until_loaded(self, timeout=10):
+        """等待登录后的页面加载完成（URL中出现token且文档加载完毕），代替固定等待"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        
+        try:
+            WebDriverWait(self.browser, timeout, poll_frequency=0.2).until(
+                lambda driver: "token=" in driver.current_url.lower()
+                and driver.execute_script("return document.readyState") == "complete"
+            )
+        except Exception:
+            print("等待页面加载超时，继续尝试获取token和cookie...")
         
     def login(self, timeout=120):
         """
         打开微信公众平台并等待用户扫码登录
         
+        浏览器用户目录中保存的会话仍有效时直接进入后台，不需要扫码
+        
         Args:
             timeout: 等待扫码登录的超时时间（秒）
             
         Returns:
             bool: 登录是否成功
         """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        
         try:
             print("正在打开微信公众平台登录页...")
             self.browser.get(self.url)
             
-            # 等待二维码出现
+            # 等待二维码出现，或者已保存的会话直接进入后台
             try:
-                qrcode_iframe = WebDriverWait(self.browser, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "weui-desktop-qrcheck__iframe"))
-                )
+                WebDriverWait(self.browser, 10, poll_frequency=0.2).until(EC.any_of(
+                    EC.presence_of_element_located((By.CLASS_NAME, "weui-desktop-qrcheck__iframe")),
+                    self.is_logged_in
+                ))
+                if self.is_logged_in():
+                    print("浏览器中保存的登录会话仍然有效，无需扫码")
+                    self.wait_until_loaded()
+                    return True
+                
+                qrcode_iframe = self.browser.find_element(By.CLASS_NAME, "weui-desktop-qrcheck__iframe")
                 self.browser.switch_to.frame(qrcode_iframe)
                 
                 # 等待二维码加载完成
@@ -395,29 +655,19 @@ class WeixinMpCrawler:
                 self.browser.switch_to.default_content()
             except Exception as e:
                 # 可能已经登录或页面结构变化
+                self.browser.switch_to.default_content()
                 print(f"获取二维码过程中出现异常: {str(e)}")
                 print("可能已经登录或页面结构已变化，继续检测登录状态...")
             
-            # 新的登录检测逻辑：不依赖于URL变化，而是检测页面上的元素
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                # 检测是否已登录成功
-                try:
-                    # 尝试多种可能表示登录成功的元素
-                    if (self.browser.find_elements(By.CLASS_NAME, "weui-desktop-panel__title") or
-                        self.browser.find_elements(By.CLASS_NAME, "menu_item") or
-                        self.browser.find_elements(By.ID, "menuBar") or
-                        "/cgi-bin/home" in self.browser.current_url):
-                        print("检测到登录成功标志！")
-                        # 等待页面完全加载
-                        time.sleep(3)
-                        print("登录成功！")
-                        return True
-                except:
-                    pass
-                
-                # 暂停一段时间再次检查
-                time.sleep(2)
+            # 扫码后页面跳转到后台首页即登录成功，不再固定间隔轮询
+            try:
+                WebDriverWait(self.browser, timeout, poll_frequency=0.2).until(self.is_logged_in)
+                print("检测到登录成功标志！")
+                self.wait_until_loaded()
+                print("登录成功！")
+                return True
+            except Exception:
+                pass
             
             # 如果超时但看起来已经登录（用户反馈），我们也认为成功
             print("登录检测超时，但将继续尝试获取token和cookie...")
@@ -617,639 +867,4381 @@ cookie_dict = {{{', '.join([f'"{cookie["name"]}": "{cookie["value"]}"' for cooki
             print("浏览器已关闭")
 
 
-# ============ 核心类：文章爬取管理 ============
+# ============ 核心类：公众号fakeid缓存 ============
 
-class ArticleCrawler:
-    """微信公众号文章爬取管理类"""
+class FakeidCache:
+    """公众号名称 → fakeid 的本地缓存，避免每次翻页都调用搜索接口"""
     
-    def __init__(self, cookie=None, token=None):
+    def __init__(self, cache_file="fakeid_cache.json", ttl_days=30):
         """
-        初始化文章爬取器
+        初始化缓存
         
         Args:
-            cookie: cookie字符串
-            token: token字符串
+            cache_file: 缓存文件路径，为None时只缓存在内存中
+            ttl_days: 通过搜索得到的fakeid的有效天数，Excel中填写的fakeid不过期
         """
-        self.cookie = cookie
-        self.token = token
-        self.web = None
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.entries = {}
+        self.loaded_mtime = None
+        self.lock = threading.RLock()
+        self.load()
+    
+    def load(self):
+        """从文件加载缓存"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
         
-        # 如果有cookie和token，就初始化web实例
-        if self.cookie and self.token:
-            self.init_web()
+        self.entries = load_json_file(self.cache_file, {})
+        self.loaded_mtime = os.path.getmtime(self.cache_file)
     
-    def init_web(self):
-        """初始化Web连接实例"""
-        if self.cookie and self.token:
-            self.web = PublicAccountsWeb(cookie=self.cookie, token=self.token)
-            return True
-        else:
-            print("缺少必要的cookie或token，无法初始化连接")
-            return False
+    def reload_if_changed(self):
+        """缓存文件被其他实例（如read_accounts_from_excel）更新后重新加载"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        
+        if os.path.getmtime(self.cache_file) != self.loaded_mtime:
+            self.load()
     
-    def set_credentials(self, cookie, token):
+    def save(self):
+        """将缓存写入文件"""
+        if not self.cache_file:
+            return
+        
+        with self.lock:
+            if save_json_file(self.cache_file, self.entries):
+                self.loaded_mtime = os.path.getmtime(self.cache_file)
+    
+    def get(self, nickname):
         """
-        设置凭证
+        获取公众号的fakeid
         
         Args:
-            cookie: cookie字符串
-            token: token字符串
+            nickname: 公众号名称
+            
+        Returns:
+            str: fakeid（即公众号的__biz），不存在或已过期时返回None
         """
-        self.cookie = cookie
-        self.token = token
-        return self.init_web()
+        with self.lock:
+            self.reload_if_changed()
+            entry = self.entries.get(nickname)
+        
+        if not entry:
+            return None
+        
+        if entry.get('source') != 'excel' and time.time() - entry.get('updated_at', 0) > self.ttl_seconds:
+            return None
+        
+        return entry.get('fakeid')
     
-    def extract_publish_time_from_url(self, url):
+    def set(self, nickname, fakeid, source='search'):
         """
-        从微信公众号文章URL中提取发布时间
+        记录公众号的fakeid并保存
         
         Args:
-            url: 文章URL
-            
+            nickname: 公众号名称
+            fakeid: 公众号fakeid
+            source: 来源，'search'表示搜索接口，'excel'表示用户在Excel中填写
+        """
+        with self.lock:
+            self.entries[nickname] = {
+                'fakeid': fakeid,
+                'source': source,
+                'updated_at': time.time()
+            }
+            self.save()
+    
+    def update_from_mapping(self, fakeid_map, source='excel'):
+        """
+        批量写入fakeid
+        
+        Args:
+            fakeid_map: {公众号名称: fakeid} 字典
+            source: 来源
+        """
+        now = time.time()
+        with self.lock:
+            for nickname, fakeid in fakeid_map.items():
+                self.entries[nickname] = {'fakeid': fakeid, 'source': source, 'updated_at': now}
+            self.save()
+    
+    def invalidate(self, nickname):
+        """删除公众号的fakeid（查询失败时调用，下次重新搜索）"""
+        with self.lock:
+            if self.entries.pop(nickname, None) is not None:
+                print(f"已清除公众号 '{nickname}' 的fakeid缓存")
+                self.save()
+
+
+# ============ 核心类：公众号增量水位线 ============
+
+class AccountWatermarkStore:
+    """
+    记录每个公众号已经爬取到的最新文章（水位线），增量模式下翻页到水位线即停止，
+    没有新文章的公众号只需一次列表请求
+    """
+    
+    def __init__(self, watermark_file="account_watermarks.json"):
+        """
+        初始化水位线存储
+        
+        Args:
+            watermark_file: 水位线文件路径，为None时只保存在内存中
+        """
+        self.watermark_file = watermark_file
+        self.marks = load_json_file(watermark_file, {})
+        self.lock = threading.Lock()
+    
+    def get(self, nickname):
+        """
+        获取公众号的水位线
+        
         Returns:
-            tuple: (发布日期对象, 发布日期字符串)
+            dict: {aid, appmsgid, create_time, updated_at}，不存在时返回None
+        """
+        return self.marks.get(nickname)
+    
+    def update(self, nickname, article):
+        """
+        用本次看到的最新文章更新水位线
+        
+        Args:
+            nickname: 公众号名称
+            article: 文章列表接口返回的单篇文章字典
         """
         try:
-            # 设置请求头，模拟浏览器访问
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                'Connection': 'keep-alive'
+            create_time = int(article.get('create_time') or article.get('update_time') or 0)
+        except (TypeError, ValueError):
+            create_time = 0
+        
+        with self.lock:
+            self.marks[nickname] = {
+                'aid': ArticlePagePlanner.item_id(article),
+                'appmsgid': article.get('appmsgid'),
+                'create_time': create_time,
+                'updated_at': time.time()
             }
-            
-            # 随机延迟，避免请求过于频繁
-            time.sleep(random.uniform(1, 3))
-            
-            # 请求文章页面获取内容
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                # 使用BeautifulSoup解析HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 方法1：从JavaScript中提取时间戳 - 这是正确的方法
-                page_text = response.text
-                
-                # 查找JavaScript中的时间戳模式
-                # 根据搜索结果，微信文章中时间戳的模式类似：var ct = "1567005049"
-                timestamp_patterns = [
-                    r'var\s+ct\s*=\s*["\'](\d{10})["\']',  # var ct = "1567005049"
-                    r'ct\s*=\s*["\'](\d{10})["\']',        # ct = "1567005049"
-                    r'"ct"\s*:\s*["\']?(\d{10})["\']?',     # "ct": "1567005049" 或 "ct": 1567005049
-                    r'create_time["\']?\s*:\s*["\']?(\d{10})["\']?',  # create_time: 1567005049
-                    r'publish_time["\']?\s*:\s*["\']?(\d{10})["\']?', # publish_time: 1567005049
-                    # 新增更多可能的模式
-                    r'var\s+t\s*=\s*["\'](\d{10})["\']',    # var t = "1567005049"
-                    r'"(\d{10})",n="(\d{10})",s="([^"]+)"', # 匹配类似 "1575860164",n="1575539255",s="2019-12-05" 的模式
-                    r't\s*=\s*["\'](\d{10})["\']',          # t = "1567005049"
-                    r'["\'](\d{10})["\'],\s*n\s*=\s*["\'](\d{10})["\']', # 时间戳对的模式
-                ]
-                
-                # 尝试从JavaScript中提取时间戳
-                for pattern in timestamp_patterns:
-                    matches = re.findall(pattern, page_text, re.IGNORECASE)
-                    if matches:
-                        try:
-                            # 处理不同的匹配结果格式
-                            timestamp = None
-                            
-                            if isinstance(matches[0], tuple):
-                                # 如果匹配结果是元组（多个捕获组），取第一个作为时间戳
-                                for item in matches[0]:
-                                    if item.isdigit() and len(item) == 10:
-                                        timestamp = int(item)
-                                        break
-                            else:
-                                # 如果匹配结果是字符串
-                                if matches[0].isdigit() and len(matches[0]) == 10:
-                                    timestamp = int(matches[0])
-                            
-                            if timestamp:
-                                # 验证时间戳是否合理（2000年到2030年之间）
-                                if 946684800 <= timestamp <= 1893456000:  # 2000-01-01 到 2030-01-01
-                                    # 将时间戳转换为日期对象
-                                    publish_date_obj = datetime.fromtimestamp(timestamp)
-                                    publish_date = publish_date_obj.date()
-                                    publish_date_str = publish_date_obj.strftime('%Y-%m-%d %H:%M:%S')
-                                    
-                                    print(f"从JavaScript中提取到时间戳: {timestamp}, 转换后的时间: {publish_date_str}")
-                                    return publish_date, publish_date_str
-                                else:
-                                    print(f"时间戳 {timestamp} 不在合理范围内，跳过")
-                                    
-                        except (ValueError, OverflowError) as e:
-                            print(f"时间戳转换错误: {e}")
-                            continue
-                
-                # 方法2：查找更复杂的JavaScript时间设置模式
-                # 寻找类似 document.getElementById("publish_time") 的JavaScript代码块
-                js_patterns = [
-                    r'document\.getElementById\("publish_time"\)[^}]+?s\s*=\s*["\']([^"\']+)["\']',
-                    r'getElementById\("publish_time"\)[^}]+?(\d{4}-\d{2}-\d{2})',
-                ]
-                
-                for pattern in js_patterns:
-                    matches = re.findall(pattern, page_text, re.IGNORECASE | re.DOTALL)
-                    if matches:
-                        for match in matches:
-                            # 尝试解析找到的日期字符串
-                            date_formats = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S']
-                            for date_format in date_formats:
-                                try:
-                                    publish_date_obj = datetime.strptime(match, date_format)
-                                    publish_date = publish_date_obj.date()
-                                    print(f"从JavaScript日期字符串中提取到时间: {match}")
-                                    return publish_date, match
-                                except ValueError:
-                                    continue
-                
-                # 方法3：尝试查找微信文章页面中的发布时间元素（备用方法）
-                publish_time_element = soup.select_one('#publish_time') or soup.select_one('.publish_time')
-                if publish_time_element:
-                    publish_time_text = publish_time_element.text.strip()
-                    if publish_time_text:  # 如果元素有内容
-                        # 尝试解析日期
-                        date_formats = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y年%m月%d日 %H:%M', '%Y年%m月%d日']
-                        for date_format in date_formats:
-                            try:
-                                publish_date = datetime.strptime(publish_time_text, date_format).date()
-                                return publish_date, publish_time_text
-                            except ValueError:
-                                continue
-                
-                # 方法4：在页面源码中查找其他时间模式（最后备用）
-                date_patterns = [
-                    r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}',
-                    r'\d{4}-\d{2}-\d{2}',
-                    r'\d{4}年\d{1,2}月\d{1,2}日 \d{1,2}:\d{1,2}',
-                    r'\d{4}年\d{1,2}月\d{1,2}日'
-                ]
-                
-                # 遍历页面查找可能的日期
-                for pattern in date_patterns:
-                    matches = re.findall(pattern, page_text)
-                    if matches:
-                        # 尝试解析找到的第一个日期
-                        for match in matches:
-                            date_formats = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y年%m月%d日 %H:%M', '%Y年%m月%d日']
-                            for date_format in date_formats:
-                                try:
-                                    publish_date = datetime.strptime(match, date_format)
-                                    return publish_date.date(), match
-                                except ValueError:
-                                    continue
-            
-            # 如果从页面内容无法获取到时间，返回None
-            print(f"无法从URL {url} 提取发布时间")
-            return None, ""
-            
-        except Exception as e:
-            print(f"提取文章发布时间时出错: {e}")
-            return None, ""
+            if self.watermark_file:
+                save_json_file(self.watermark_file, self.marks)
     
-    def fetch_articles_from_account(self, nickname, count=10, filter_recent_days=None, max_attempts=10, time_filter_func=None, stop_on_outdated=False):
+    @staticmethod
+    def reached(mark, article):
         """
-        从单个公众号获取文章
+        判断文章是否已到达（不新于）水位线
         
         Args:
-            nickname: 公众号名称
-            count: 获取的文章数量
-            filter_recent_days: 如果不为None，只获取最近几天的文章
-            max_attempts: 最大尝试次数
-            time_filter_func: 时间过滤函数，接收article_date参数，返回布尔值
-            stop_on_outdated: 是否在发现第一篇过期文章时就停止，适用于批量爬取多个公众号时
+            mark: get()返回的水位线
+            article: 文章列表接口返回的单篇文章字典
             
         Returns:
-            list: 文章信息列表 [{nickname, title, link, publish_time}, ...]
+            bool: 是否已到达水位线
         """
-        if not self.web:
-            print("Web连接未初始化，请先设置有效凭证")
-            return []
-            
-        articles_info = []
+        if not mark:
+            return False
         
-        # 设置日期范围（如果需要）
-        today = datetime.now().date()
-        date_range = None
-        if filter_recent_days:
-            date_range = [today - timedelta(days=i) for i in range(filter_recent_days)]
-            print(f"将只保留最近 {filter_recent_days} 天的文章")
+        if ArticlePagePlanner.item_id(article) == mark.get('aid'):
+            return True
         
-        # 使用随机延迟，避免操作过于规律被检测
-        delay = random.uniform(3, 8)
-        print(f"等待 {delay:.2f} 秒后开始获取文章...")
-        time.sleep(delay)
+        # 同一次群发的多篇文章appmsgid相同，发布时间也相同
+        if mark.get('appmsgid') is not None and article.get('appmsgid') == mark.get('appmsgid'):
+            return True
         
-        attempt = 0
-        offset = 0
-        collected = 0
-        has_more = True
-        outdated_found = False  # 标记是否找到过期文章
+        try:
+            create_time = int(article.get('create_time') or 0)
+        except (TypeError, ValueError):
+            return False
+        return bool(create_time and mark.get('create_time') and create_time < mark['create_time'])
+
+
+# ============ 核心类：断点续爬 ============
+
+class CrawlCheckpoint:
+    """
+    爬取进度检查点
+    
+    记录每个公众号是否已爬完以及翻页进度，程序因异常、Ctrl-C或凭证失效中断后，
+    下次以resume=True运行时从中断处继续，不再重复已经消耗过限额的列表请求。
+    已得到的文章本身保存在JsonlArticleSink中，续爬时用其中的链接去重和计数
+    """
+    
+    def __init__(self, checkpoint_file, run_params):
+        """
+        初始化检查点
         
-        # 最大批次，每批次获取数量
-        batch_size = 5  # 减小批次大小，减少漏爬风险
+        Args:
+            checkpoint_file: 检查点文件路径
+            run_params: 本次运行的参数（公众号列表、文章数量等），参数不同的检查点不会被续用
+        """
+        self.checkpoint_file = checkpoint_file
+        self.run_params = run_params
+        self.lock = threading.Lock()
+        self.state = {'run_params': run_params, 'accounts': {}}
+        self.links_by_account = {}  # 公众号 -> 已保存文章的链接集合（从结果文件恢复）
+    
+    def load(self, resume=False):
+        """
+        加载检查点
         
-        # 记录连续空结果次数
-        empty_results_count = 0
+        Args:
+            resume: 是否续用上次的进度，False时清除旧的检查点
+            
+        Returns:
+            bool: 是否从上次中断处继续
+        """
+        if resume:
+            state = load_json_file(self.checkpoint_file, None)
+            if state and state.get('run_params') == self.run_params:
+                self.state = state
+                done = sum(1 for account in state.get('accounts', {}).values() if account.get('status') == 'done')
+                print(f"从检查点 {self.checkpoint_file} 继续上次的爬取，已完成 {done} 个公众号")
+                return True
+            if state:
+                print(f"检查点 {self.checkpoint_file} 的运行参数与本次不同，重新开始爬取")
+            else:
+                print(f"没有找到检查点 {self.checkpoint_file}，重新开始爬取")
         
-        # 记录已获取的文章链接，避免重复
-        fetched_links = set()
+        self.save()
+        return False
+    
+    def save(self):
+        with self.lock:
+            self.state['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            save_json_file(self.checkpoint_file, self.state)
+    
+    def restore_articles(self, articles):
+        """用结果文件中已保存的文章恢复各公众号的已爬取链接"""
+        for article in articles:
+            self.links_by_account.setdefault(article.get('nickname'), set()).add(article.get('link'))
+    
+    def collected_links(self, nickname):
+        """该公众号已保存的文章链接"""
+        return set(self.links_by_account.get(nickname, set()))
+    
+    def is_done(self, nickname):
+        return self.state['accounts'].get(nickname, {}).get('status') == 'done'
+    
+    def resume_state(self, nickname):
+        """
+        该公众号的续爬进度
         
-        while has_more and collected < count and attempt < max_attempts and not outdated_found:
-            try:
-                print(f"获取公众号 '{nickname}' 的文章，批次 {attempt+1}，偏移量 {offset}...")
-                
-                # 获取文章数据
-                articles = self.web.get_urls(nickname=nickname, begin=offset, count=batch_size)
-                
-                if not articles:
-                    empty_results_count += 1
-                    print(f"未获取到文章，连续空结果次数: {empty_results_count}")
-                    
-                    # 只有连续3次获取不到文章，才认为确实没有更多文章了
-                    if empty_results_count >= 3:
-                        print(f"连续{empty_results_count}次未获取到文章，可能已到达文章列表末尾")
-                        has_more = False
-                        break
-                    else:
-                        # 尽管没有获取到文章，仍然尝试增加偏移量继续获取
-                        # 使用较小的增量，避免跳过文章
-                        print("尝试增加偏移量继续获取...")
-                        offset += 1  # 只增加1而不是batch_size，更小的增量减少漏爬
-                        attempt += 1
-                        
-                        # 添加额外延迟，可能是因为请求过于频繁导致的限制
-                        extra_delay = random.uniform(8, 15)
-                        print(f"添加额外延迟 {extra_delay:.2f} 秒...")
-                        time.sleep(extra_delay)
-                        continue
-                else:
-                    # 重置连续空结果计数
-                    empty_results_count = 0
-                    
-                print(f"获取到 {len(articles)} 篇文章，正在处理...")
-                
-                # 标记是否在此批次中添加了任何文章
-                added_in_batch = False
+        最后一页的文章若没有全部写入结果文件（例如还在队列中时程序被中断），从这一页重新开始
+        
+        Returns:
+            tuple: (分页进度dict或None, 增量模式的最新文章或None)
+        """
+        account = self.state['accounts'].get(nickname)
+        if not account:
+            return None, None
+        links = self.links_by_account.get(nickname, set())
+        if all(link in links for link in account.get('page_links', [])):
+            planner_state = account.get('planner_after')
+        else:
+            planner_state = account.get('planner_before')
+        return planner_state, account.get('newest_article')
+    
+    def update_account(self, nickname, planner_before, planner_after, page_links, newest_article=None):
+        """
+        记录公众号处理完一页之后的进度
+        
+        Args:
+            nickname: 公众号名称
+            planner_before: 处理这一页之前的分页进度
+            planner_after: 处理这一页之后的分页进度
+            page_links: 这一页中交给调用方的文章链接
+            newest_article: 增量模式下本次看到的最新文章
+        """
+        with self.lock:
+            self.state['accounts'][nickname] = {
+                'status': 'in_progress',
+                'planner_before': planner_before,
+                'planner_after': planner_after,
+                'page_links': page_links,
+                'newest_article': newest_article
+            }
+        self.save()
+    
+    def mark_done(self, nickname):
+        """标记公众号已爬取完成"""
+        with self.lock:
+            self.state['accounts'][nickname] = {'status': 'done'}
+        self.save()
+    
+    def complete(self, nicknames):
+        """
+        运行结束：所有公众号都已爬取完成时删除检查点文件；
+        有公众号未完成（例如达到最大尝试次数）时保留检查点，下次以resume=True运行时继续爬取这些公众号
+        
+        Args:
+            nicknames: 本次运行的公众号列表
+            
+        Returns:
+            list: 未完成的公众号
+        """
+        unfinished = [nickname for nickname in dict.fromkeys(nicknames) if not self.is_done(nickname)]
+        if unfinished:
+            print(f"{len(unfinished)} 个公众号未爬取完成（{', '.join(unfinished)}），"
+                  f"保留检查点 {self.checkpoint_file}，可以用resume=True继续")
+            return unfinished
+        
+        try:
+            if os.path.exists(self.checkpoint_file):
+                os.remove(self.checkpoint_file)
+        except OSError as e:
+            print(f"删除检查点 {self.checkpoint_file} 时出错: {e}")
+        return unfinished
+
+
+# ============ 核心类：文章列表分页规划 ============
+
+class ArticlePagePlanner:
+    """
+    文章列表分页规划器
+    
+    按接口允许的最大页大小连续、不重叠地翻页；翻页期间公众号新发文或删文导致列表整体
+    移动时，通过文章id（aid）和文章总数（app_msg_cnt）检测位移或遗漏，而不是靠重叠请求兜底
+    """
+    
+    # list_ex接口单页最多返回5条
+    MAX_PAGE_SIZE = 5
+    
+    def __init__(self, page_size=MAX_PAGE_SIZE, start=0):
+        """
+        初始化分页规划器
+        
+        Args:
+            page_size: 每页数量，不超过MAX_PAGE_SIZE
+            start: 起始偏移量
+        """
+        self.page_size = max(1, min(page_size, self.MAX_PAGE_SIZE))
+        self.frontier = start        # 下一页的起始位置
+        self.pending = []            # 需要补抓的区间 [(begin, count), ...]
+        self.total = None            # 最近一次接口返回的文章总数
+        self.seen_ids = set()
+        self.exhausted = False
+        
+        # 统计信息
+        self.list_requests = 0
+        self.unique_items = 0
+        self.duplicate_items = 0
+        self.shifts_detected = 0
+        self.gaps_detected = 0
+    
+    @staticmethod
+    def item_id(item):
+        """获取文章在列表中的唯一id"""
+        if item.get('aid'):
+            return str(item['aid'])
+        if item.get('appmsgid') is not None:
+            return f"{item['appmsgid']}_{item.get('itemidx', 1)}"
+        return item.get('link')
+    
+    @property
+    def has_more(self):
+        """是否还有需要请求的页"""
+        return bool(self.pending) or not self.exhausted
+    
+    def next_request(self):
+        """
+        规划下一次请求
+        
+        Returns:
+            tuple: (begin, count)
+        """
+        if self.pending:
+            return self.pending[0]
+        return self.frontier, self.page_size
+    
+    def observe(self, begin, count, items, total=None):
+        """
+        记录一页请求结果
+        
+        Args:
+            begin: 本次请求的起始位置
+            count: 本次请求的数量
+            items: 接口返回的文章列表
+            total: 接口返回的文章总数（app_msg_cnt），可为None
+            
+        Returns:
+            list: 本页中首次出现的文章
+        """
+        self.list_requests += 1
+        is_backfill = bool(self.pending) and self.pending[0] == (begin, count)
+        if is_backfill:
+            self.pending.pop(0)
+        
+        # 页首连续出现已见过的文章，说明翻页期间有新发文，整个列表向后移动
+        leading_seen = 0
+        for item in items:
+            if self.item_id(item) not in self.seen_ids:
+                break
+            leading_seen += 1
+        if leading_seen and not is_backfill:
+            self.shifts_detected += 1
+            print(f"检测到列表向后移动了 {leading_seen} 篇（翻页期间有新发文），已自动去重")
+        
+        # 文章总数减少且页首没有重叠，说明有文章被删除，列表向前移动，上一页与本页之间可能有遗漏
+        if total is not None and self.total is not None and not is_backfill:
+            removed = self.total - total
+            if removed > 0 and leading_seen == 0 and begin > 0:
+                gap_begin = max(0, begin - removed)
+                self.pending.append((gap_begin, begin - gap_begin))
+                self.gaps_detected += 1
+                print(f"检测到文章总数减少 {removed} 篇，补抓位置 {gap_begin} 开始的 {begin - gap_begin} 篇")
+        if total is not None:
+            self.total = total
+        
+        new_items = []
+        for item in items:
+            item_id = self.item_id(item)
+            if item_id in self.seen_ids:
+                self.duplicate_items += 1
+                continue
+            self.seen_ids.add(item_id)
+            new_items.append(item)
+        self.unique_items += len(new_items)
+        
+        if not is_backfill:
+            self.frontier = begin + len(items)
+            if self.total is not None and self.frontier >= self.total:
+                self.exhausted = True
+            elif items and len(items) < count:
+                self.exhausted = True
+            elif not items and self.total is None:
+                # 没有总数可参考时，空页即视为列表末尾；有总数时由调用方判断是否为限流后重试
+                self.exhausted = True
+        
+        return new_items
+    
+    def to_checkpoint(self):
+        """
+        导出翻页进度，用于断点续爬
+        
+        Returns:
+            dict: {'frontier', 'pending', 'total', 'exhausted'}
+        """
+        return {
+            'frontier': self.frontier,
+            'pending': [list(item) for item in self.pending],
+            'total': self.total,
+            'exhausted': self.exhausted
+        }
+    
+    @classmethod
+    def from_checkpoint(cls, state, page_size=MAX_PAGE_SIZE):
+        """从to_checkpoint导出的进度恢复分页规划器"""
+        planner = cls(page_size=page_size, start=state.get('frontier', 0))
+        planner.pending = [tuple(item) for item in state.get('pending', [])]
+        planner.total = state.get('total')
+        planner.exhausted = state.get('exhausted', False)
+        return planner
+    
+    def mark_exhausted(self):
+        """标记列表已经取完（例如连续多次返回空结果）"""
+        self.exhausted = True
+        self.pending = []
+    
+    def report(self):
+        """
+        生成请求效率统计
+        
+        Returns:
+            dict: 列表请求数、唯一文章数、重复文章数、每篇唯一文章消耗的请求数等
+        """
+        return {
+            'list_requests': self.list_requests,
+            'unique_items': self.unique_items,
+            'duplicate_items': self.duplicate_items,
+            'shifts_detected': self.shifts_detected,
+            'gaps_detected': self.gaps_detected,
+            'requests_per_article': round(self.list_requests / self.unique_items, 3) if self.unique_items else None
+        }
+
+
+# ============ 核心类：请求限速与多公众号调度 ============
+
+class TokenBucket:
+    """
+    令牌桶限速器（线程安全）
+    
+    同一个凭证发出的所有列表/搜索请求共享一个令牌桶，总请求速率不超过requests_per_minute，
+    多个公众号并发爬取时也不会超速
+    """
+    
+    def __init__(self, requests_per_minute=8, burst=1, jitter=2.0):
+        """
+        初始化令牌桶
+        
+        Args:
+            requests_per_minute: 每分钟允许的请求数
+            burst: 令牌桶容量，即允许的最大突发请求数
+            jitter: 每次请求额外增加0~jitter秒的随机延迟，避免请求间隔过于规律
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.jitter = jitter
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    @property
+    def requests_per_minute(self):
+        """当前的每分钟请求数"""
+        return self.rate * 60.0
+    
+    def set_rate(self, requests_per_minute):
+        """
+        调整请求速率
+        
+        Args:
+            requests_per_minute: 每分钟允许的请求数
+        """
+        with self.lock:
+            self.refill()
+            self.rate = requests_per_minute / 60.0
+    
+    def refill(self):
+        """按流逝的时间补充令牌（调用方需持有锁）"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def acquire(self):
+        """
+        获取一个令牌，令牌不足时阻塞等待
+        
+        Returns:
+            float: 实际等待的秒数
+        """
+        with self.lock:
+            self.refill()
+            # 令牌可以透支，透支部分由后续请求排队等待，保证并发请求按顺序均匀放行
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        
+        if self.jitter:
+            wait += random.uniform(0, self.jitter)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class AdaptiveRateController:
+    """
+    AIMD自适应限速控制器
+    
+    请求成功时缓慢提高速率（加性增，默认不超过配置的速率），被限流时速率减半并按指数退避暂停（乘性减），
+    代替固定的随机等待时间
+    """
+    
+    def __init__(self, rate_limiter, min_requests_per_minute=1, max_requests_per_minute=None,
+                 increase_step=0.5, decrease_factor=0.5, base_backoff=30, max_backoff=900):
+        """
+        初始化控制器
+        
+        Args:
+            rate_limiter: 被控制的TokenBucket
+            min_requests_per_minute: 速率下限
+            max_requests_per_minute: 速率上限，默认为令牌桶配置的初始速率（加性增只在被限流降速后恢复，
+                不会超过用户配置的速率），显式传入时才允许超过
+            increase_step: 每次成功后增加的每分钟请求数
+            decrease_factor: 被限流时速率乘以的系数
+            base_backoff: 第一次被限流时的暂停时间（秒），连续被限流时翻倍
+            max_backoff: 最长暂停时间（秒）
+        """
+        self.rate_limiter = rate_limiter
+        self.min_rpm = min_requests_per_minute
+        self.max_rpm = max_requests_per_minute or rate_limiter.requests_per_minute
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.consecutive_throttles = 0
+        self.consecutive_errors = 0
+        self.paused_until = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """等待退避结束并从令牌桶获取一个令牌"""
+        wait = self.paused_until - time.time()
+        if wait > 0:
+            print(f"限速退避中，等待 {wait:.2f} 秒...")
+            time.sleep(wait)
+        return self.rate_limiter.acquire()
+    
+    def on_success(self):
+        """请求成功：加性提速"""
+        with self.lock:
+            self.consecutive_throttles = 0
+            self.consecutive_errors = 0
+            rpm = min(self.max_rpm, self.rate_limiter.requests_per_minute + self.increase_step)
+            self.rate_limiter.set_rate(rpm)
+    
+    def on_throttle(self):
+        """
+        被限流：乘性降速并指数退避
+        
+        Returns:
+            float: 退避时间（秒）
+        """
+        with self.lock:
+            self.consecutive_throttles += 1
+            rpm = max(self.min_rpm, self.rate_limiter.requests_per_minute * self.decrease_factor)
+            self.rate_limiter.set_rate(rpm)
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (self.consecutive_throttles - 1))
+            backoff *= random.uniform(1, 1.2)
+            self.paused_until = time.time() + backoff
+        print(f"检测到频率限制，速率降至 {rpm:.1f} 次/分钟，暂停 {backoff:.0f} 秒")
+        return backoff
+    
+    def on_error(self):
+        """
+        其他错误（网络异常、返回格式异常等）：短暂指数退避，不改变速率
+        
+        Returns:
+            float: 退避时间（秒）
+        """
+        with self.lock:
+            self.consecutive_errors += 1
+            backoff = min(self.max_backoff, 5 * 2 ** (self.consecutive_errors - 1)) * random.uniform(1, 1.2)
+            self.paused_until = time.time() + backoff
+        return backoff
+
+
+class AccountCrawlScheduler:
+    """多公众号调度器：多个公众号交错并发爬取，实际请求速率由凭证的令牌桶统一控制"""
+    
+    def __init__(self, max_workers=3):
+        """
+        初始化调度器
+        
+        Args:
+            max_workers: 同时爬取的公众号数量
+        """
+        self.max_workers = max(1, max_workers)
+    
+    def run(self, nickname_list, crawl_func):
+        """
+        对每个公众号执行爬取函数
+        
+        Args:
+            nickname_list: 公众号名称列表
+            crawl_func: 爬取函数，接收(序号, 公众号名称)，返回该公众号的结果
+            
+        Returns:
+            list: 与nickname_list顺序一致的结果列表，出错的公众号结果为None
+        """
+        if self.max_workers == 1 or len(nickname_list) <= 1:
+            return [self.run_one(crawl_func, i, nickname) for i, nickname in enumerate(nickname_list)]
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.run_one, crawl_func, i, nickname) for i, nickname in enumerate(nickname_list)]
+            return [future.result() for future in futures]
+    
+    def iter_run(self, nickname_list, iter_func):
+        """
+        对每个公众号执行逐条返回结果的爬取函数，哪个公众号先得到结果就先返回哪个；
+        调用方停止迭代后，各公众号在返回下一条结果前停止
+        
+        Args:
+            nickname_list: 公众号名称列表
+            iter_func: 爬取函数，接收(序号, 公众号名称)，返回该公众号结果的迭代器
+            
+        Yields:
+            tuple: (序号, 公众号名称, 结果)
+        """
+        if self.max_workers == 1 or len(nickname_list) <= 1:
+            for i, nickname in enumerate(nickname_list):
+                try:
+                    for item in iter_func(i, nickname):
+                        yield i, nickname, item
+                except Exception as e:
+                    print(f"爬取公众号 '{nickname}' 时出错: {e}")
+            return
+        
+        # 队列有上限，调用方处理不过来时爬取线程会等待，内存占用有界
+        results = queue.Queue(maxsize=self.max_workers * 16)
+        stop_event = threading.Event()
+        finished = object()
+        
+        def put(item):
+            while not stop_event.is_set():
+                try:
+                    results.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def worker(i, nickname):
+            items = iter_func(i, nickname)
+            try:
+                for item in items:
+                    if not put((i, nickname, item)):
+                        break
+            except Exception as e:
+                print(f"爬取公众号 '{nickname}' 时出错: {e}")
+            finally:
+                if hasattr(items, 'close'):
+                    items.close()
+                put(finished)
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        for i, nickname in enumerate(nickname_list):
+            executor.submit(worker, i, nickname)
+        
+        remaining = len(nickname_list)
+        try:
+            while remaining:
+                item = results.get()
+                if item is finished:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def run_one(crawl_func, index, nickname):
+        """执行单个公众号的爬取，出错时不影响其他公众号"""
+        try:
+            return crawl_func(index, nickname)
+        except Exception as e:
+            print(f"爬取公众号 '{nickname}' 时出错: {e}")
+            return None
+
+
+# ============ 核心类：列表接口结果分类 ============
+
+class ListResponseStatus:
+    """文章列表接口返回结果的分类"""
+    
+    OK = 'ok'                            # 正常返回文章
+    EMPTY = 'empty'                      # 正常返回但没有文章，即已到达列表末尾
+    FREQ_CONTROL = 'freq_control'        # 请求过于频繁被限制
+    INVALID_SESSION = 'invalid_session'  # 登录失效或token无效
+    ERROR = 'error'                      # 其他错误（参数错误、fakeid无效等）
+    
+    # 接口base_resp.ret的含义
+    FREQ_CONTROL_CODES = (200013,)
+    INVALID_SESSION_CODES = (200003, 200040)
+    
+    @classmethod
+    def classify(cls, data, list_field='app_msg_list'):
+        """
+        对列表接口返回的json分类
+        
+        Args:
+            data: 接口返回的json
+            list_field: 结果列表所在的字段，文章列表接口为app_msg_list，公众号搜索接口（searchbiz）为list
+            
+        Returns:
+            str: 分类结果
+        """
+        if not isinstance(data, dict):
+            return cls.ERROR
+        
+        base_resp = data.get('base_resp') or {}
+        ret = base_resp.get('ret', 0 if list_field in data else None)
+        err_msg = str(base_resp.get('err_msg', '')).lower()
+        
+        if ret in cls.FREQ_CONTROL_CODES or 'freq control' in err_msg:
+            return cls.FREQ_CONTROL
+        if ret in cls.INVALID_SESSION_CODES or 'invalid session' in err_msg:
+            return cls.INVALID_SESSION
+        if ret == 0 and list_field in data:
+            return cls.OK if data[list_field] else cls.EMPTY
+        return cls.ERROR
+
+
+class ArticleListError(Exception):
+    """文章列表请求失败，status为ListResponseStatus中的分类，credential为发出请求的凭证"""
+    
+    def __init__(self, status, message, credential=None):
+        super().__init__(message)
+        self.status = status
+        self.credential = credential
+
+
+# ============ 核心类：凭证池 ============
+
+class CrawlCredential:
+    """一个已登录的公众平台会话（token+cookie），包含独立的限速器和健康状态"""
+    
+    def __init__(self, cookie, token, name="default", rate_limiter=None, on_success=None):
+        """
+        初始化会话
+        
+        Args:
+            cookie: cookie字符串
+            token: token字符串
+            name: 凭证名称（一般为凭证文件路径）
+            rate_limiter: 该凭证的TokenBucket限速器，默认每分钟8次请求
+            on_success: 每次请求成功后调用的函数，参数为成功的时间戳（用于记录凭证验证时间）
+        """
+        self.name = name
+        self.cookie = cookie
+        self.token = token
+        from wechatarticles import PublicAccountsWeb
+        self.web = PublicAccountsWeb(cookie=cookie, token=token)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucket()
+        self.rate_controller = AdaptiveRateController(self.rate_limiter)
+        
+        # wechatarticles的搜索接口（official_info）会原地修改共享的请求参数，
+        # 调用它以及复制请求参数时都需要持有这个锁
+        self.search_lock = threading.Lock()
+        
+        # 健康状态：active 可用，throttled 被限流冷却中，reauthenticating 登录失效、正在重新认证，expired 登录失效
+        self.status = 'active'
+        self.cooldown_until = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_success_at = None
+        self.on_success = on_success
+    
+    @property
+    def available(self):
+        """当前是否可用"""
+        if self.status == 'throttled' and time.time() >= self.cooldown_until:
+            self.status = 'active'
+        return self.status == 'active'
+    
+    def mark_success(self):
+        """记录一次成功请求，并让限速控制器逐步提速"""
+        self.successes += 1
+        self.last_success_at = time.time()
+        self.rate_controller.on_success()
+        if self.on_success is not None:
+            self.on_success(self.last_success_at)
+    
+    def mark_throttled(self, cooldown=None):
+        """
+        标记被限流，冷却期内移出轮换
+        
+        Args:
+            cooldown: 冷却时间（秒），默认由限速控制器按连续限流次数指数退避计算
+        """
+        if cooldown is None:
+            cooldown = self.rate_controller.on_throttle()
+        self.failures += 1
+        self.status = 'throttled'
+        self.cooldown_until = time.time() + cooldown
+        print(f"凭证 {self.name} 被限流，{cooldown:.0f} 秒内暂停使用")
+    
+    def mark_error(self):
+        """记录一次其他错误，短暂退避"""
+        self.failures += 1
+        self.rate_controller.on_error()
+    
+    def mark_expired(self):
+        """标记登录失效，移出轮换"""
+        self.failures += 1
+        self.status = 'expired'
+        print(f"凭证 {self.name} 已失效，移出轮换")
+    
+    def mark_reauthenticating(self):
+        """标记登录失效且即将重新认证，认证结束前移出轮换（其他线程等待认证结果，而不是认为凭证已全部失效）"""
+        self.failures += 1
+        self.status = 'reauthenticating'
+        print(f"凭证 {self.name} 已失效，正在重新认证")
+
+
+class CredentialPool:
+    """
+    凭证池：把公众号分配到多个已登录的公众平台会话上，突破单个账号的频率限制
+    
+    同一个公众号固定分配给同一个凭证（分配关系保存在文件中），
+    凭证被限流或失效时自动移出轮换，其公众号临时改由其他凭证处理
+    """
+    
+    def __init__(self, credentials=None, assignment_file="credential_assignments.json", reauth_timeout=300):
+        """
+        初始化凭证池
+        
+        Args:
+            credentials: CrawlCredential列表
+            assignment_file: 公众号→凭证分配关系的保存路径，为None时只保存在内存中
+            reauth_timeout: 有凭证正在重新认证（可能需要扫码）时，获取凭证最多等待的秒数
+        """
+        self.credentials = {}
+        self.assignment_file = assignment_file
+        self.assignments = load_json_file(assignment_file, {})
+        self.reauth_timeout = reauth_timeout
+        self.lock = threading.RLock()
+        # 凭证加入或重新认证结束时通知等待中的线程
+        self.changed = threading.Condition(self.lock)
+        for credential in credentials or []:
+            self.add(credential)
+    
+    @classmethod
+    def from_files(cls, credential_files, requests_per_minute=8, jitter=2.0, assignment_file="credential_assignments.json"):
+        """
+        从多个weixin_credentials.py格式的凭证文件创建凭证池
+        
+        Args:
+            credential_files: 凭证文件路径列表，或通配符（如 "credentials/*.py"）
+            requests_per_minute: 每个凭证每分钟允许的请求数
+            jitter: 每次请求额外增加的最大随机延迟（秒）
+            assignment_file: 分配关系保存路径
+            
+        Returns:
+            CredentialPool: 凭证池
+        """
+        if isinstance(credential_files, str):
+            credential_files = sorted(glob.glob(credential_files))
+        
+        pool = cls(assignment_file=assignment_file)
+        for filename in credential_files:
+            try:
+                token, cookie = read_credentials_file(filename)
+            except Exception as e:
+                print(f"加载凭证文件 {filename} 时出错: {e}")
+                continue
+            
+            if not token or not cookie:
+                print(f"凭证文件 {filename} 中没有有效的token或cookie，跳过")
+                continue
+            
+            pool.add(CrawlCredential(cookie, token, name=filename,
+                                     rate_limiter=TokenBucket(requests_per_minute=requests_per_minute, jitter=jitter)))
+        
+        print(f"凭证池共加载 {len(pool.credentials)} 个凭证")
+        return pool
+    
+    def add(self, credential):
+        """添加凭证，同名凭证会被替换（例如重新登录后）"""
+        with self.lock:
+            self.credentials[credential.name] = credential
+            self.changed.notify_all()
+    
+    def finish_reauthentication(self, credential):
+        """
+        重新认证结束：成功时新凭证已经通过add替换了旧凭证，失败时旧凭证标记为失效；唤醒等待凭证的线程
+        
+        Args:
+            credential: 登录失效的旧凭证
+        """
+        with self.lock:
+            if credential.status == 'reauthenticating':
+                credential.status = 'expired'
+            self.changed.notify_all()
+    
+    def available_credentials(self):
+        """当前可用的凭证列表"""
+        with self.lock:
+            return [credential for credential in self.credentials.values() if credential.available]
+    
+    def get(self, nickname):
+        """
+        获取处理某个公众号的凭证
+        
+        Args:
+            nickname: 公众号名称
+            
+        Returns:
+            CrawlCredential: 凭证
+        """
+        reauth_deadline = None
+        while True:
+            with self.lock:
+                assigned = self.credentials.get(self.assignments.get(nickname))
+                if assigned and assigned.available:
+                    return assigned
+                
+                available = self.available_credentials()
+                if available:
+                    # 选择当前分配公众号最少的凭证
+                    load = {name: 0 for name in self.credentials}
+                    for name in self.assignments.values():
+                        if name in load:
+                            load[name] += 1
+                    chosen = min(available, key=lambda credential: load[credential.name])
+                    
+                    # 原凭证只是暂时被限流时不改变分配，冷却结束后继续使用原凭证
+                    if not assigned or assigned.status == 'expired':
+                        self.assignments[nickname] = chosen.name
+                        if self.assignment_file:
+                            save_json_file(self.assignment_file, self.assignments)
+                    return chosen
+                
+                # 全部被限流时等待最早结束冷却的凭证，有凭证正在重新认证时等待认证结束，全部失效时才报错
+                throttled = [credential for credential in self.credentials.values() if credential.status == 'throttled']
+                reauthenticating = [credential for credential in self.credentials.values()
+                                    if credential.status == 'reauthenticating']
+                if not throttled and not reauthenticating:
+                    raise Exception("凭证池中没有可用的凭证（全部已失效）")
+                wait = max(0, min(credential.cooldown_until for credential in throttled) - time.time()) if throttled else None
+                
+                if reauthenticating:
+                    if reauth_deadline is None:
+                        reauth_deadline = time.monotonic() + self.reauth_timeout
+                    remaining = reauth_deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Exception(f"等待凭证重新认证超时（{self.reauth_timeout} 秒）")
+                    print(f"凭证 {reauthenticating[0].name} 正在重新认证，等待认证完成...")
+                    # 新凭证加入或认证失败时会被唤醒；同时有凭证在限流冷却时最多等到冷却结束
+                    self.changed.wait(remaining if wait is None else min(wait, remaining))
+                    continue
+            
+            print(f"所有凭证都在限流冷却中，等待 {wait:.0f} 秒...")
+            time.sleep(wait)
+    
+    def status_report(self):
+        """
+        凭证健康状态汇总
+        
+        Returns:
+            list: [{name, status, successes, failures}, ...]
+        """
+        report = []
+        with self.lock:
+            for credential in self.credentials.values():
+                # 访问available会刷新冷却到期的凭证状态
+                credential.available
+                report.append({
+                    'name': credential.name,
+                    'status': credential.status,
+                    'successes': credential.successes,
+                    'failures': credential.failures
+                })
+        return report
+
+
+# ============ 核心类：文章发布时间提取 ============
+
+class PublishTimeExtractor:
+    """
+    从文章页面HTML中提取发布时间
+    
+    正则全部预编译，时间戳正则按历史命中次数排序，优先只扫描包含 var ct 的脚本片段；
+    只有在所有正则都失败时才构建DOM查找发布时间元素
+    """
+    
+    # 时间戳正则（按初始优先级排列），匹配结果取第一个10位数字作为时间戳
+    TIMESTAMP_PATTERNS = [
+        ('var_ct', re.compile(r'var\s+ct\s*=\s*["\'](\d{10})["\']', re.IGNORECASE)),  # var ct = "1567005049"
+        ('ct', re.compile(r'ct\s*=\s*["\'](\d{10})["\']', re.IGNORECASE)),  # ct = "1567005049"
+        ('json_ct', re.compile(r'"ct"\s*:\s*["\']?(\d{10})["\']?', re.IGNORECASE)),  # "ct": "1567005049" 或 "ct": 1567005049
+        ('create_time', re.compile(r'create_time["\']?\s*:\s*["\']?(\d{10})["\']?', re.IGNORECASE)),  # create_time: 1567005049
+        ('publish_time', re.compile(r'publish_time["\']?\s*:\s*["\']?(\d{10})["\']?', re.IGNORECASE)),  # publish_time: 1567005049
+        ('var_t', re.compile(r'var\s+t\s*=\s*["\'](\d{10})["\']', re.IGNORECASE)),  # var t = "1567005049"
+        ('t_n_s', re.compile(r'"(\d{10})",n="(\d{10})",s="([^"]+)"', re.IGNORECASE)),  # "1575860164",n="1575539255",s="2019-12-05"
+        ('t', re.compile(r't\s*=\s*["\'](\d{10})["\']', re.IGNORECASE)),  # t = "1567005049"
+        ('t_n', re.compile(r'["\'](\d{10})["\'],\s*n\s*=\s*["\'](\d{10})["\']', re.IGNORECASE)),  # 时间戳对
+    ]
+    
+    # 页面脚本中设置 publish_time 元素内容的代码
+    JS_DATE_PATTERNS = [
+        re.compile(r'document\.getElementById\("publish_time"\)[^}]+?s\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE | re.DOTALL),
+        re.compile(r'getElementById\("publish_time"\)[^}]+?(\d{4}-\d{2}-\d{2})', re.IGNORECASE | re.DOTALL),
+    ]
+    
+    # 最后备用：只接受紧跟在发布时间标记之后的日期，避免把正文里出现的日期当作发布时间
+    LABELED_DATE_PATTERN = re.compile(
+        r'(?:publish_time|publish-time|发布时间|发表时间|发布于|发表于)[^0-9<]{0,40}?(?:<[^>]{0,200}>\s*){0,3}'
+        r'(\d{4}-\d{1,2}-\d{1,2}(?: \d{1,2}:\d{1,2}(?::\d{1,2})?)?|\d{4}年\d{1,2}月\d{1,2}日(?: ?\d{1,2}:\d{1,2})?)',
+        re.IGNORECASE
+    )
+    
+    DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y年%m月%d日 %H:%M', '%Y年%m月%d日%H:%M', '%Y年%m月%d日']
+    
+    # 时间戳有效范围：2000-01-01 到 2030-01-01
+    MIN_TIMESTAMP = 946684800
+    MAX_TIMESTAMP = 1893456000
+    
+    # 以 var ct 为中心向两侧扫描的最大字符数（找不到所在<script>标签边界时使用）
+    SCRIPT_WINDOW = 4000
+    
+    def __init__(self):
+        """初始化提取器"""
+        self.lock = threading.Lock()
+        self.pattern_hits = {name: 0 for name, _ in self.TIMESTAMP_PATTERNS}
+        self.ordered_patterns = list(self.TIMESTAMP_PATTERNS)
+        self.method_hits = {'script_region': 0, 'full_text': 0, 'js_date': 0, 'dom': 0, 'labeled_date': 0, 'failed': 0}
+    
+    def record_hit(self, method, pattern_name=None):
+        """记录命中情况，并按命中次数重新排列时间戳正则（次数相同时保持初始顺序）"""
+        with self.lock:
+            self.method_hits[method] += 1
+            if pattern_name is not None:
+                self.pattern_hits[pattern_name] += 1
+                initial_order = {name: i for i, (name, _) in enumerate(self.TIMESTAMP_PATTERNS)}
+                self.ordered_patterns = sorted(
+                    self.TIMESTAMP_PATTERNS,
+                    key=lambda item: (-self.pattern_hits[item[0]], initial_order[item[0]])
+                )
+    
+    @classmethod
+    def script_region(cls, page_text):
+        """
+        找到包含 var ct 的<script>片段
+        
+        Returns:
+            str: 脚本片段，页面中没有 var ct 时返回None
+        """
+        # 绝大多数页面写法固定为 var ct，先用字符串查找定位，找不到再用正则
+        position = page_text.find('var ct')
+        if position < 0:
+            match = cls.TIMESTAMP_PATTERNS[0][1].search(page_text)
+            if not match:
+                return None
+            position = match.start()
+        start = page_text.rfind('<script', max(0, position - cls.SCRIPT_WINDOW), position)
+        end = page_text.find('</script>', position, position + cls.SCRIPT_WINDOW)
+        if start < 0:
+            start = max(0, position - cls.SCRIPT_WINDOW)
+        if end < 0:
+            end = position + cls.SCRIPT_WINDOW
+        return page_text[start:end]
+    
+    def match_timestamp(self, text):
+        """
+        按当前顺序依次尝试时间戳正则
+        
+        Returns:
+            tuple: (时间戳, 正则名称)，都未命中时返回 (None, None)
+        """
+        for name, pattern in self.ordered_patterns:
+            match = pattern.search(text)
+            if not match:
+                continue
+            # 多个捕获组时取第一个10位数字作为时间戳
+            for group in match.groups():
+                if group and group.isdigit() and len(group) == 10:
+                    timestamp = int(group)
+                    if self.MIN_TIMESTAMP <= timestamp <= self.MAX_TIMESTAMP:
+                        return timestamp, name
+                    print(f"时间戳 {timestamp} 不在合理范围内，跳过")
+                    break
+        return None, None
+    
+    @classmethod
+    def parse_date(cls, text):
+        """按常见格式解析日期字符串，无法解析时返回None"""
+        text = text.strip()
+        for date_format in cls.DATE_FORMATS:
+            try:
+                return datetime.strptime(text, date_format)
+            except ValueError:
+                continue
+        return None
+    
+    def extract(self, page_text):
+        """
+        从文章页面HTML中提取发布时间
+        
+        Args:
+            page_text: 文章页面HTML
+            
+        Returns:
+            tuple: (发布日期对象, 发布日期字符串)，无法提取时返回 (None, "")
+        """
+        if not page_text:
+            return None, ""
+        
+        # 方法1：从JavaScript中提取时间戳，先只扫描 var ct 所在的脚本片段，再扫描整个页面
+        region = self.script_region(page_text)
+        for method, text in (('script_region', region), ('full_text', page_text)):
+            if text is None:
+                continue
+            timestamp, pattern_name = self.match_timestamp(text)
+            if timestamp:
+                self.record_hit(method, pattern_name)
+                publish_date_obj = datetime.fromtimestamp(timestamp)
+                publish_date_str = publish_date_obj.strftime('%Y-%m-%d %H:%M:%S')
+                print(f"从JavaScript中提取到时间戳: {timestamp}, 转换后的时间: {publish_date_str}")
+                return publish_date_obj.date(), publish_date_str
+        
+        # 方法2：脚本中设置 publish_time 元素内容的日期字符串
+        for pattern in self.JS_DATE_PATTERNS:
+            for match in pattern.findall(page_text):
+                publish_date_obj = self.parse_date(match)
+                if publish_date_obj:
+                    self.record_hit('js_date')
+                    print(f"从JavaScript日期字符串中提取到时间: {match}")
+                    return publish_date_obj.date(), match
+        
+        # 方法3：正则都失败时才解析DOM，查找发布时间元素
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(page_text, 'html.parser')
+        publish_time_element = soup.select_one('#publish_time') or soup.select_one('.publish_time')
+        if publish_time_element:
+            publish_time_text = publish_time_element.text.strip()
+            publish_date_obj = self.parse_date(publish_time_text) if publish_time_text else None
+            if publish_date_obj:
+                self.record_hit('dom')
+                return publish_date_obj.date(), publish_time_text
+        
+        # 方法4：只接受跟在“发布时间”等标记后面、且不晚于当前时间的日期
+        now = datetime.now()
+        for match in self.LABELED_DATE_PATTERN.finditer(page_text):
+            publish_date_obj = self.parse_date(match.group(1))
+            if publish_date_obj and publish_date_obj <= now:
+                self.record_hit('labeled_date')
+                return publish_date_obj.date(), match.group(1)
+        
+        self.record_hit('failed')
+        return None, ""
+    
+    def report(self):
+        """
+        提取统计
+        
+        Returns:
+            dict: {'methods': 各方法命中次数, 'patterns': 各时间戳正则命中次数, 'order': 当前正则顺序}
+        """
+        with self.lock:
+            return {
+                'methods': dict(self.method_hits),
+                'patterns': dict(self.pattern_hits),
+                'order': [name for name, _ in self.ordered_patterns],
+            }
+
+
+# ============ 核心类：文章爬取管理 ============
+
+class ArticleCrawler:
+    """微信公众号文章爬取管理类"""
+    
+    def __init__(self, cookie=None, token=None, fakeid_cache=None, watermark_store=None, rate_limiter=None,
+                 credential_pool=None, credential_name="default", page_cache=None, article_index=None, dedup_index=None,
+                 reauth_callback=None, success_callback=None):
+        """
+        初始化文章爬取器
+        
+        Args:
+            cookie: cookie字符串
+            token: token字符串
+            fakeid_cache: FakeidCache实例，默认使用当前目录下的fakeid_cache.json
+            watermark_store: AccountWatermarkStore实例，默认使用当前目录下的account_watermarks.json
+            rate_limiter: 该凭证的TokenBucket限速器，默认每分钟8次请求
+            credential_pool: CredentialPool实例，传入后公众号会分散到池中的多个凭证上爬取
+            credential_name: cookie/token对应的凭证名称，加入凭证池时使用
+            page_cache: ArticlePageCache实例，提取发布时间时下载的页面会存入其中供关键词分析复用
+            article_index: ArticleIndex实例，传入后爬取到的文章会加入本地索引
+            dedup_index: ArticleDedupIndex实例，传入后爬取到的文章会记录在其中，skip_seen=True时跳过已爬取过的文章
+            reauth_callback: 凭证失效时调用的函数，参数为凭证名称，返回新的 (cookie, token)，失败时返回None；
+                传入后请求遇到登录失效会重新认证并自动重试，爬取进度不受影响
+            success_callback: 当前凭证每次请求成功后调用的函数，参数为时间戳
+        """
+        self.cookie = cookie
+        self.token = token
+        self.web = None
+        self.fakeid_cache = fakeid_cache if fakeid_cache is not None else FakeidCache()
+        self.watermark_store = watermark_store if watermark_store is not None else AccountWatermarkStore()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucket()
+        self.page_cache = page_cache if page_cache is not None else ArticlePageCache()
+        self.publish_time_extractor = PublishTimeExtractor()
+        self.article_index = article_index
+        self.dedup_index = dedup_index
+        self.reauth_callback = reauth_callback
+        self.success_callback = success_callback
+        self.reauth_lock = threading.Lock()
+        
+        # 未传入凭证池时，使用只包含当前cookie/token的凭证池
+        self.credential_pool = credential_pool if credential_pool is not None else CredentialPool(assignment_file=None)
+        self.credential_name = credential_name
+        
+        # 文章列表每页数量（接口允许的最大值）及最近一次翻页的请求统计
+        self.list_page_size = ArticlePagePlanner.MAX_PAGE_SIZE
+        self.last_page_report = None
+        
+        # 最近一次多公众号爬取的统计信息
+        self.last_run_stats = {}
+        
+        # 如果有cookie和token，就初始化web实例
+        if self.cookie and self.token:
+            self.init_web()
+        elif self.credential_pool.credentials:
+            self.web = next(iter(self.credential_pool.credentials.values())).web
+    
+    def init_web(self):
+        """初始化Web连接实例，并把当前凭证加入凭证池"""
+        if self.cookie and self.token:
+            credential = CrawlCredential(self.cookie, self.token, name=self.credential_name, rate_limiter=self.rate_limiter,
+                                         on_success=self.success_callback)
+            self.credential_pool.add(credential)
+            self.web = credential.web
+            return True
+        else:
+            print("缺少必要的cookie或token，无法初始化连接")
+            return False
+    
+    def set_credentials(self, cookie, token):
+        """
+        设置凭证
+        
+        Args:
+            cookie: cookie字符串
+            token: token字符串
+        """
+        self.cookie = cookie
+        self.token = token
+        return self.init_web()
+    
+    def reauthenticate(self, expired_credential):
+        """
+        凭证失效后重新认证，并用新凭证替换池中的旧凭证
+        
+        多个线程同时发现失效时只认证一次，其余线程等待后直接使用新凭证
+        
+        Args:
+            expired_credential: 失效的CrawlCredential
+            
+        Returns:
+            bool: 是否已有可用的新凭证
+        """
+        with self.reauth_lock:
+            try:
+                current = self.credential_pool.credentials.get(expired_credential.name)
+                if current is not None and current is not expired_credential and current.available:
+                    return True
+                if self.reauth_callback is None:
+                    return False
+                
+                try:
+                    credentials = self.reauth_callback(expired_credential.name)
+                except Exception as e:
+                    print(f"重新认证凭证 {expired_credential.name} 时出错: {e}")
+                    credentials = None
+                if not credentials:
+                    print(f"凭证 {expired_credential.name} 重新认证失败")
+                    return False
+                
+                cookie, token = credentials
+                if expired_credential.name == self.credential_name:
+                    self.set_credentials(cookie, token)
+                else:
+                    self.credential_pool.add(CrawlCredential(cookie, token, name=expired_credential.name,
+                                                             rate_limiter=expired_credential.rate_limiter,
+                                                             on_success=expired_credential.on_success))
+                print(f"凭证 {expired_credential.name} 已重新认证，继续爬取")
+                return True
+            finally:
+                # 唤醒在凭证池中等待认证结果的线程（失败时旧凭证标记为失效）
+                self.credential_pool.finish_reauthentication(expired_credential)
+    
+    def resolve_fakeid(self, nickname):
+        """
+        获取公众号的fakeid，优先使用缓存，缓存未命中时才调用搜索接口
+        
+        Args:
+            nickname: 公众号名称
+            
+        Returns:
+            str: fakeid
+        """
+        fakeid = self.fakeid_cache.get(nickname)
+        if fakeid:
+            return fakeid
+        
+        print(f"正在搜索公众号 '{nickname}' 的fakeid...")
+        candidates = self.search_official_accounts(nickname)
+        if not candidates:
+            raise Exception(f"未搜索到公众号 '{nickname}'")
+        
+        # 优先选择名称完全一致的公众号，否则使用搜索结果的第一个
+        matched = next((item for item in candidates if item.get('nickname') == nickname), candidates[0])
+        fakeid = matched['fakeid']
+        self.fakeid_cache.set(nickname, fakeid)
+        return fakeid
+    
+    def search_official_accounts(self, nickname):
+        """
+        调用公众号搜索接口（searchbiz），返回结果与文章列表接口一样分类：
+        限流时凭证进入冷却，登录失效时由get_article_list_page重新认证后重试
+        
+        Args:
+            nickname: 公众号名称
+            
+        Returns:
+            list: 搜索结果 [{fakeid, nickname, alias, ...}, ...]
+            
+        Raises:
+            ArticleListError: 请求失败，status说明失败类型（限流、登录失效等）
+        """
+        credential = self.credential_pool.get(nickname)
+        with credential.search_lock:
+            params = dict(credential.web.params)
+        params.update({
+            "action": "search_biz",
+            "ajax": "1",
+            "begin": "0",
+            "count": "5",
+            "query": nickname,
+        })
+        
+        credential.rate_controller.acquire()
+        try:
+            response = credential.web.s.get(
+                "https://mp.weixin.qq.com/cgi-bin/searchbiz",
+                headers=credential.web.headers,
+                params=params,
+                proxies=credential.web.proxies,
+                timeout=10
+            )
+            data = response.json()
+        except Exception as e:
+            credential.mark_error()
+            raise ArticleListError(ListResponseStatus.ERROR, f"搜索公众号 '{nickname}' 失败: {e}", credential)
+        
+        status = ListResponseStatus.classify(data, list_field='list')
+        if status in (ListResponseStatus.OK, ListResponseStatus.EMPTY):
+            credential.mark_success()
+            return data['list']
+        
+        self.record_failed_response(credential, status)
+        raise ArticleListError(status, f"搜索公众号失败（{status}）: {self.describe_response(data)}", credential)
+    
+    def record_failed_response(self, credential, status):
+        """按失败类型更新凭证状态：限流进入冷却，登录失效等待重新认证（或移出轮换），其他错误短暂退避"""
+        if status == ListResponseStatus.FREQ_CONTROL:
+            credential.mark_throttled()
+        elif status == ListResponseStatus.INVALID_SESSION:
+            # 能重新认证时，认证结束前其他线程等待新凭证，而不是因为"全部已失效"放弃爬取
+            if self.reauth_callback is not None:
+                credential.mark_reauthenticating()
+            else:
+                credential.mark_expired()
+        else:
+            credential.mark_error()
+    
+    @staticmethod
+    def describe_response(data):
+        base_resp = data.get('base_resp', {}) if isinstance(data, dict) else {}
+        return f"ret={base_resp.get('ret')}, err_msg={base_resp.get('err_msg')}"
+    
+    def get_article_list(self, nickname, begin=0, count=5):
+        """
+        通过fakeid获取公众号的一页文章列表（相当于web.get_urls，但不会每次都搜索公众号）
+        
+        Args:
+            nickname: 公众号名称
+            begin: 起始位置
+            count: 获取数量（1-5）
+            
+        Returns:
+            list: 文章列表，格式与web.get_urls相同
+        """
+        return self.get_article_list_page(nickname, begin=begin, count=count)['app_msg_list']
+    
+    def get_article_list_page(self, nickname, begin=0, count=5):
+        """
+        通过fakeid获取公众号的一页文章列表的完整返回数据
+        
+        Args:
+            nickname: 公众号名称
+            begin: 起始位置
+            count: 获取数量（1-5）
+            
+        Returns:
+            dict: 接口返回的json，包含app_msg_list（文章列表）和app_msg_cnt（文章总数）
+            
+        Raises:
+            ArticleListError: 请求失败，status说明失败类型（限流、登录失效等）
+        """
+        try:
+            return self.request_article_list_page(nickname, begin, count)
+        except ArticleListError as e:
+            # 登录失效：重新认证成功后用新凭证重试同一页，调用方的翻页进度不受影响
+            if e.status != ListResponseStatus.INVALID_SESSION or not self.reauthenticate(e.credential):
+                raise
+        return self.request_article_list_page(nickname, begin, count)
+    
+    def request_article_list_page(self, nickname, begin, count):
+        """发送一次文章列表请求（参数和返回值同get_article_list_page）"""
+        fakeid = self.resolve_fakeid(nickname)
+        credential = self.credential_pool.get(nickname)
+        
+        with credential.search_lock:
+            params = dict(credential.web.params)
+        params.update({
+            "action": "list_ex",
+            "ajax": "1",
+            "begin": str(begin),
+            "count": str(count),
+            "fakeid": fakeid,
+            "type": "9",
+            "query": "",
+        })
+        
+        credential.rate_controller.acquire()
+        try:
+            response = credential.web.s.get(
+                "https://mp.weixin.qq.com/cgi-bin/appmsg",
+                headers=credential.web.headers,
+                params=params,
+                proxies=credential.web.proxies,
+                timeout=10
+            )
+            data = response.json()
+        except Exception as e:
+            credential.mark_error()
+            raise ArticleListError(ListResponseStatus.ERROR, f"请求公众号 '{nickname}' 的文章列表失败: {e}", credential)
+        
+        status = ListResponseStatus.classify(data)
+        if status in (ListResponseStatus.OK, ListResponseStatus.EMPTY):
+            credential.mark_success()
+            return data
+        
+        # 限流和登录失效都与fakeid无关，只有其他错误才清除fakeid缓存
+        self.record_failed_response(credential, status)
+        if status == ListResponseStatus.ERROR:
+            self.fakeid_cache.invalidate(nickname)
+        raise ArticleListError(status, f"获取文章列表失败（{status}）: {self.describe_response(data)}", credential)
+    
+    def extract_publish_time_from_url(self, url):
+        """
+        从微信公众号文章URL中提取发布时间
+        
+        Args:
+            url: 文章URL
+            
+        Returns:
+            tuple: (发布日期对象, 发布日期字符串)
+        """
+        try:
+            html = self.page_cache.get(url)
+            if html is None:
+                # 随机延迟，避免请求过于频繁
+                time.sleep(random.uniform(1, 3))
+                
+                # 请求文章页面获取内容（共享连接池，自动重试），留给后续关键词分析复用
+                html = get_http_client().get_text(url)
+                self.page_cache.put(url, html)
+            if html:
+                publish_date, publish_date_str = self.extract_publish_time_from_html(html)
+                if publish_date:
+                    return publish_date, publish_date_str
+            
+            # 如果从页面内容无法获取到时间，返回None
+            print(f"无法从URL {url} 提取发布时间")
+            return None, ""
+            
+        except Exception as e:
+            print(f"提取文章发布时间时出错: {e}")
+            return None, ""
+    
+    def extract_publish_time_from_html(self, page_text):
+        """
+        从已下载的微信公众号文章页面中提取发布时间
+        
+        Args:
+            page_text: 文章页面HTML
+            
+        Returns:
+            tuple: (发布日期对象, 发布日期字符串)，无法提取时返回 (None, "")
+        """
+        try:
+            return self.publish_time_extractor.extract(page_text)
+        except Exception as e:
+            print(f"提取文章发布时间时出错: {e}")
+            return None, ""
+    
+    def extract_publish_time_from_list_item(self, article):
+        """
+        从文章列表接口（get_urls）返回的数据中提取发布时间，无需请求文章页面
+        
+        Args:
+            article: get_urls 返回的单篇文章字典
+            
+        Returns:
+            tuple: (发布日期对象, 发布日期字符串)，字段缺失或无效时返回 (None, "")
+        """
+        # create_time 为首次发布时间，update_time 为最后修改时间，优先使用前者
+        for field in ('create_time', 'update_time'):
+            try:
+                timestamp = int(article.get(field) or 0)
+            except (TypeError, ValueError):
+                continue
+            
+            # 验证时间戳是否合理（2000年到2030年之间）
+            if 946684800 <= timestamp <= 1893456000:
+                publish_date_obj = datetime.fromtimestamp(timestamp)
+                return publish_date_obj.date(), publish_date_obj.strftime('%Y-%m-%d %H:%M:%S')
+        
+        return None, ""
+    
+    def fetch_articles_from_account(self, nickname, count=10, filter_recent_days=None, max_attempts=10, time_filter_func=None, stop_on_outdated=False, use_list_time=True, incremental=False, checkpoint=None, skip_seen=False):
+        """
+        从单个公众号获取文章（iter_articles的列表版本，参数相同）
+        
+        Returns:
+            list: 文章信息列表 [{nickname, title, link, publish_time}, ...]
+        """
+        return list(self.iter_articles(
+            nickname, count=count, filter_recent_days=filter_recent_days, max_attempts=max_attempts,
+            time_filter_func=time_filter_func, stop_on_outdated=stop_on_outdated,
+            use_list_time=use_list_time, incremental=incremental, checkpoint=checkpoint, skip_seen=skip_seen
+        ))
+    
+    def iter_articles(self, nickname, count=10, filter_recent_days=None, max_attempts=10, time_filter_func=None, stop_on_outdated=False, use_list_time=True, incremental=False, checkpoint=None, skip_seen=False):
+        """
+        从单个公众号逐篇获取文章，每得到一篇就立即返回，调用方可以随时停止迭代
+        
+        调用方提前停止迭代时不会更新增量水位线，没看到的文章下次还会爬取
+        
+        Args:
+            nickname: 公众号名称
+            count: 获取的文章数量
+            filter_recent_days: 如果不为None，只获取最近几天的文章
+            max_attempts: 最大失败次数（请求出错、被限流或登录失效）
+            time_filter_func: 时间过滤函数，接收article_date参数，返回布尔值
+            stop_on_outdated: 是否在发现第一篇过期文章时就停止，适用于批量爬取多个公众号时
+            use_list_time: 是否优先使用文章列表接口返回的时间戳，缺失时才请求文章页面提取
+            incremental: 增量模式，翻页到上次爬取的最新文章（水位线）即停止；翻页到水位线、列表末尾或日期范围之外时
+                才更新水位线，出错或达到数量上限时保留原水位线
+            checkpoint: CrawlCheckpoint实例，传入后每处理完一页记录一次进度，并从上次中断处继续
+            skip_seen: 跳过去重索引中今天之前已爬取过的文章（不请求其文章页面）
+            
+        Yields:
+            dict: 文章信息 {nickname, title, link, publish_time, publish_date}
+        """
+        if not self.web:
+            print("Web连接未初始化，请先设置有效凭证")
+            return
+        
+        # 设置日期范围（如果需要）
+        today = datetime.now().date()
+        date_range = None
+        if filter_recent_days:
+            date_range = [today - timedelta(days=i) for i in range(filter_recent_days)]
+            print(f"将只保留最近 {filter_recent_days} 天的文章")
+        
+        # 请求间隔由凭证的令牌桶限速器控制，不再固定等待
+        attempt = 0
+        collected = 0
+        has_more = True
+        outdated_found = False  # 标记是否找到过期文章
+        
+        # 分页规划器：按最大页大小连续翻页，用文章id检测列表位移
+        planner = ArticlePagePlanner(page_size=self.list_page_size)
+        
+        # 记录已获取的文章链接，避免重复
+        fetched_links = set()
+        
+        # 断点续爬：已完成的公众号直接跳过，未完成的从上次的翻页进度继续
+        resumed_newest_article = None
+        if checkpoint is not None:
+            if checkpoint.is_done(nickname):
+                print(f"公众号 '{nickname}' 上次已爬取完成，跳过")
+                return
+            planner_state, resumed_newest_article = checkpoint.resume_state(nickname)
+            fetched_links = checkpoint.collected_links(nickname)
+            collected = len(fetched_links)
+            if planner_state:
+                planner = ArticlePagePlanner.from_checkpoint(planner_state, page_size=self.list_page_size)
+                print(f"公众号 '{nickname}' 从偏移量 {planner.frontier} 继续爬取，之前已保存 {collected} 篇文章")
+        
+        # 记录直接使用列表时间戳（未请求文章页面）的文章数量
+        page_requests_saved = 0
+        
+        # 增量模式：读取上次的水位线，记录本次看到的最新文章
+        watermark = self.watermark_store.get(nickname) if incremental else None
+        newest_article = resumed_newest_article
+        watermark_reached = False
+        date_cutoff_reached = False
+        count_reached = False
+        page_failed = False
+        if watermark:
+            print(f"增量模式：公众号 '{nickname}' 上次爬取到的最新文章发布于 "
+                  f"{datetime.fromtimestamp(watermark['create_time']) if watermark.get('create_time') else '未知时间'}")
+        
+        while has_more and planner.has_more and collected < count and attempt < max_attempts and not outdated_found:
+            try:
+                page_failed = False
+                planner_before = planner.to_checkpoint() if checkpoint is not None else None
+                page_links = []
+                begin, page_count = planner.next_request()
+                print(f"获取公众号 '{nickname}' 的文章，第 {planner.list_requests+1} 次列表请求，偏移量 {begin}...")
+                
+                # 获取文章数据
+                page = self.get_article_list_page(nickname, begin=begin, count=page_count)
+                page_articles = page.get('app_msg_list') or []
+                articles = planner.observe(begin, page_count, page_articles, page.get('app_msg_cnt'))
+                
+                # 限流等异常已经在get_article_list_page中以ArticleListError抛出，
+                # 这里的空列表是接口正常返回的，说明确实已到达文章列表末尾
+                if not page_articles:
+                    print("已到达文章列表末尾")
+                    planner.mark_exhausted()
+                    break
+                    
+                print(f"获取到 {len(page_articles)} 篇文章，其中 {len(articles)} 篇为新文章，正在处理...")
+                
+                # 处理获取到的文章
+                for article in articles:
+                    # 从文章数据中提取所需信息
+                    title = article.get('title', '无标题')
+                    link = article.get('link', '无链接')
+                    
+                    if incremental:
+                        if newest_article is None and begin == 0:
+                            newest_article = article
+                        
+                        # 到达水位线，之后的文章都已经爬取过
+                        if AccountWatermarkStore.reached(watermark, article):
+                            print(f"文章 '{title}' 已到达上次爬取的位置，停止爬取公众号 '{nickname}'")
+                            watermark_reached = True
+                            has_more = False
+                            break
+                    
+                    # 检查是否已经处理过这个链接
+                    if link in fetched_links:
+                        print(f"文章 '{title}' 已经爬取过，跳过")
+                        continue
+                    
+                    # 之前的运行中已经爬取过的文章（去重索引中O(1)查询）
+                    seen_before = (skip_seen and self.dedup_index is not None and link != '无链接'
+                                   and self.dedup_index.seen_before_today(link))
+                    
+                    # 从URL中提取发布时间
+                    article_date = None
+                    publish_date_str = ''
+                    
+                    if link != '无链接':
+                        # 优先使用列表数据中的时间戳，避免为了日期单独下载文章页面
+                        if use_list_time:
+                            article_date, publish_date_str = self.extract_publish_time_from_list_item(article)
+                        
+                        if article_date:
+                            page_requests_saved += 1
+                        elif seen_before:
+                            # 已爬取过的文章不为了日期下载文章页面
+                            print(f"文章 '{title}' 之前已经爬取过，跳过")
+                            self.dedup_index.record_skip(nickname)
+                            continue
+                        else:
+                            article_date, publish_date_str = self.extract_publish_time_from_url(link)
+                        
+                        if article_date:
+                            # 如果有自定义的时间过滤函数
+                            if time_filter_func and not time_filter_func(article_date):
+                                print(f"文章 '{title}' 不符合时间过滤条件，跳过")
+                                
+                                # 如果设置了stop_on_outdated，并且文章确实是因为太旧而被过滤
+                                # 这里我们假设time_filter_func是用来检查文章是否在最近的日期范围内
+                                if stop_on_outdated:
+                                    print(f"发现不符合时间条件的文章，停止爬取公众号 '{nickname}'")
+                                    outdated_found = True
+                                    break
+                                    
+                                continue
+                                
+                            # 如果需要过滤最近几天的文章
+                            if date_range and article_date not in date_range:
+                                print(f"文章 '{title}' 发布于 {article_date}，不在指定的日期范围内")
+                                
+                                # 无论是否已收集文章，只要文章日期早于范围，如果启用了stop_on_outdated，就停止
+                                if stop_on_outdated:
+                                    print(f"发现超出日期范围的文章，停止爬取公众号 '{nickname}'")
+                                    outdated_found = True
+                                    break
+                                    
+                                # 原有的逻辑：只有已经收集了文章才因为日期早于范围而停止
+                                if article_date < min(date_range) and collected > 0:
+                                    print("已找到早于指定日期范围的文章，停止获取")
+                                    date_cutoff_reached = True
+                                    has_more = False
+                                    break
+                                continue
+                            
+                            # 日期符合条件但之前已经爬取过（仍参与上面的过期判断，避免多翻页）
+                            if seen_before:
+                                print(f"文章 '{title}' 之前已经爬取过，跳过")
+                                self.dedup_index.record_skip(nickname)
+                                continue
+                            
+                            # 添加文章信息
+                            article_info = {
+                                'nickname': nickname,
+                                'title': title,
+                                'link': link,
+                                'publish_time': publish_date_str,
+                                'publish_date': article_date.strftime('%Y-%m-%d')
+                            }
+                            
+                            # 先按标题加入本地索引，正文在关键词分析时补充
+                            if self.article_index is not None:
+                                self.article_index.add_article(article_info)
+                            if self.dedup_index is not None:
+                                self.dedup_index.add(link, nickname)
+                            
+                            # 记录已获取的链接
+                            fetched_links.add(link)
+                            
+                            collected += 1
+                            print(f"[{collected}/{count}] 已添加文章: {title}")
+                            page_links.append(link)
+                            yield article_info
+                            
+                            # 如果已经收集足够的文章，则终止循环
+                            if collected >= count:
+                                print(f"已达到目标数量 {count} 篇文章，停止获取")
+                                count_reached = True
+                                has_more = False
+                                break
+                        else:
+                            print(f"从URL无法提取到发布时间: {link}")
+                
+                # 记录这一页处理完之后的进度
+                if checkpoint is not None:
+                    checkpoint.update_account(nickname, planner_before, planner.to_checkpoint(), page_links,
+                                              newest_article)
+                
+                # 如果发现了过期文章，退出主循环
+                if outdated_found:
+                    print(f"由于发现过期文章，提前停止爬取公众号 '{nickname}'")
+                    break
+                    
+            except Exception as e:
+                # 重试前的等待由凭证的自适应限速控制器（限流退避/错误退避）和凭证池负责
+                page_failed = True
+                attempt += 1
+                print(f"获取公众号 '{nickname}' 的文章时出错 (尝试 {attempt}/{max_attempts}): {e}")
+                if attempt >= max_attempts:
+                    print(f"已达到最大尝试次数 {max_attempts}，停止获取")
+                    break
+        
+        # 因为连续出错而停止的公众号不算完成，续爬时会重试
+        if checkpoint is not None and attempt < max_attempts:
+            checkpoint.mark_done(nickname)
+        
+        if outdated_found:
+            print(f"提前终止：公众号 '{nickname}' 的文章已超出时间范围，共获取到 {collected} 篇符合条件的文章")
+        else:
+            print(f"共获取到公众号 '{nickname}' 的 {collected} 篇文章")
+        
+        if page_requests_saved:
+            print(f"其中 {page_requests_saved} 篇文章的发布时间直接取自列表数据，未请求文章页面")
+        
+        # 只有翻页到水位线、列表末尾或日期范围之外时，水位线之上的文章才都已处理过，这时才更新水位线；
+        # 因出错（包括最后一页处理到一半出错）或达到数量上限而停止时保留原水位线，没爬到的文章下次还会爬取
+        boundary_reached = (watermark_reached or outdated_found or date_cutoff_reached
+                            or (not planner.has_more and not count_reached))
+        if incremental and newest_article is not None:
+            if boundary_reached and not page_failed and attempt < max_attempts:
+                self.watermark_store.update(nickname, newest_article)
+            else:
+                print(f"公众号 '{nickname}' 未爬取到上次的位置，保留原水位线")
+            if watermark_reached and not collected:
+                print(f"公众号 '{nickname}' 自上次爬取以来没有新文章")
+        
+        report = planner.report()
+        print(f"列表请求 {report['list_requests']} 次，唯一文章 {report['unique_items']} 篇，"
+              f"重复 {report['duplicate_items']} 篇，平均每篇唯一文章消耗 {report['requests_per_article']} 次请求")
+        self.last_page_report = report
+    
+    def fetch_wechat_articles(self, nickname_list, articles_per_account=10, days=2, incremental=False, max_workers=3, checkpoint=None,
+                              skip_seen=False):
+        """
+        爬取多个公众号的文章
+        
+        多个公众号交错并发爬取，请求速率由凭证的令牌桶统一控制，
+        总耗时取决于限速而不是各公众号固定等待时间之和
+        
+        Args:
+            nickname_list: 公众号名称列表
+            articles_per_account: 每个公众号获取的文章数量(最大值)
+            days: 获取最近几天的文章 (默认为2，即今天和昨天)
+            incremental: 增量模式，只获取上次爬取之后的新文章
+            max_workers: 同时爬取的公众号数量，1表示逐个爬取
+            checkpoint: CrawlCheckpoint实例，用于断点续爬
+            skip_seen: 跳过去重索引中今天之前已爬取过的文章（需要传入dedup_index）
+            
+        Returns:
+            tuple: (文章信息列表 [{nickname, title, link, publish_time}, ...], 统计信息)
+        """
+        if not self.web:
+            print("Web连接未初始化，请先设置有效凭证")
+            return [], {}
+        
+        # 按公众号顺序整理文章（与逐个爬取时的顺序一致）
+        articles_by_account = [[] for _ in nickname_list]
+        for index, article in self.iter_wechat_articles(nickname_list, articles_per_account, days, incremental=incremental,
+                                                        max_workers=max_workers, checkpoint=checkpoint, skip_seen=skip_seen):
+            articles_by_account[index].append(article)
+        
+        all_articles_info = [article for account_articles in articles_by_account for article in account_articles]
+        return all_articles_info, self.last_run_stats
+    
+    def iter_wechat_articles(self, nickname_list, articles_per_account=10, days=2, incremental=False, max_workers=3, checkpoint=None,
+                             skip_seen=False):
+        """
+        爬取多个公众号的文章，每得到一篇就立即返回，调用方可以随时停止迭代
+        
+        全部公众号爬取完后，统计信息保存在 self.last_run_stats 中
+        
+        Args:
+            参数同fetch_wechat_articles
+            
+        Yields:
+            tuple: (公众号在nickname_list中的序号, 文章信息)
+        """
+        if not self.web:
+            print("Web连接未初始化，请先设置有效凭证")
+            return
+            
+        # 获取当前日期和昨天日期
+        today = datetime.now().date()
+        date_range = [today - timedelta(days=i) for i in range(days)]
+        
+        print(f"当前日期: {today}，将抓取最近 {days} 天发布的文章")
+        
+        # 统计信息（续爬时包含之前已保存的文章）
+        total_accounts = len(nickname_list)
+        article_counts = [0] * total_accounts
+        if checkpoint is not None:
+            article_counts = [len(checkpoint.collected_links(nickname)) for nickname in nickname_list]
+        skipped_before = dict(self.dedup_index.skipped) if self.dedup_index is not None else {}
+        
+        # 定义时间过滤函数：只保留最近days天的文章
+        def recent_days_filter(article_date):
+            return article_date in date_range
+        
+        def crawl_account(i, nickname):
+            print(f"\n正在获取公众号 '{nickname}' 的文章 ({i+1}/{total_accounts})...")
+            
+            # 获取该公众号的文章（使用时间过滤）
+            # 启用stop_on_outdated，一旦发现过期文章就停止爬取当前公众号
+            return self.iter_articles(
+                nickname=nickname,
+                count=articles_per_account,
+                time_filter_func=recent_days_filter,
+                stop_on_outdated=True,  # 添加这个参数，一旦发现过期文章就停止
+                incremental=incremental,
+                checkpoint=checkpoint,
+                skip_seen=skip_seen
+            )
+        
+        credentials = self.credential_pool.available_credentials()
+        total_rate = sum(credential.rate_limiter.requests_per_minute for credential in credentials)
+        print(f"同时爬取 {min(max_workers, total_accounts)} 个公众号，使用 {len(credentials)} 个凭证，"
+              f"请求速率上限 {total_rate:.1f} 次/分钟")
+        
+        for index, nickname, article in AccountCrawlScheduler(max_workers=max_workers).iter_run(nickname_list, crawl_account):
+            article_counts[index] += 1
+            yield index, article
+        
+        # 因之前已爬取过而跳过的文章（这些公众号最近同样有更新）
+        skipped_counts = {}
+        if self.dedup_index is not None:
+            skipped_counts = {nickname: count - skipped_before.get(nickname, 0)
+                              for nickname, count in self.dedup_index.skipped.items()}
+        
+        # 更新统计信息
+        accounts_updated_recently = 0
+        accounts_not_updated = 0
+        for nickname, article_count in zip(nickname_list, article_counts):
+            skipped_count = skipped_counts.get(nickname, 0)
+            if article_count or skipped_count:
+                accounts_updated_recently += 1
+                print(f"公众号 '{nickname}' 最近 {days} 天有更新，找到 {article_count} 篇新文章"
+                      f"{f'，另有 {skipped_count} 篇之前已爬取过' if skipped_count else ''}")
+            else:
+                accounts_not_updated += 1
+                print(f"公众号 '{nickname}' 最近 {days} 天无更新")
+        
+        # 准备统计信息
+        self.last_run_stats = {
+            'total_accounts': total_accounts,
+            'accounts_updated_recently': accounts_updated_recently,
+            'accounts_not_updated': accounts_not_updated,
+            'existing_articles_skipped': sum(skipped_counts.values()),
+            'date': today.strftime('%Y-%m-%d')
+        }
+    
+    def fetch_account_history(self, nickname, max_articles=100, checkpoint=None):
+        """
+        爬取单个公众号的历史文章（最多max_articles篇）
+        
+        Args:
+            nickname: 公众号名称
+            max_articles: 最大爬取文章数量，默认100
+            checkpoint: CrawlCheckpoint实例，用于断点续爬（返回结果只包含本次新爬取的文章）
+            
+        Returns:
+            list: 文章信息列表 [{nickname, title, link, publish_time, publish_date}, ...]
+        """
+        if not self.web:
+            print("Web连接未初始化，请先设置有效凭证")
+            return []
+            
+        print(f"===== 开始爬取公众号 '{nickname}' 的历史文章 =====")
+        
+        # 获取该公众号的文章（不使用时间过滤）
+        articles = self.fetch_articles_from_account(
+            nickname=nickname,
+            count=max_articles,
+            checkpoint=checkpoint
+        )
+        
+        print(f"===== 完成爬取公众号 '{nickname}' 的历史文章，共获取 {len(articles)} 篇 =====")
+        return articles
+
+
+# ============ 核心类：文章页面HTTP客户端 ============
+
+class ArticleHttpClient:
+    """
+    文章页面共享HTTP客户端
+    
+    复用连接池（keep-alive），声明支持gzip/br压缩，失败自动退避重试，
+    并对下载过的页面使用If-None-Match/If-Modified-Since条件请求，未修改时直接复用本地内容
+    """
+    
+    def __init__(self, pool_size=16, retries=3, backoff_factor=0.5, timeout=10, max_cached_pages=500):
+        """
+        初始化HTTP客户端
+        
+        Args:
+            pool_size: 每个host的连接池大小
+            retries: 失败重试次数（连接错误及429/5xx响应）
+            backoff_factor: 重试退避系数，第n次重试前等待 backoff_factor * 2^(n-1) 秒
+            timeout: 单次请求超时时间（秒）
+            max_cached_pages: 为条件请求保留的页面数量上限
+        """
+        self.timeout = timeout
+        self.max_cached_pages = max_cached_pages
+        self.validators = OrderedDict()  # url -> {etag, last_modified, text}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'not_modified': 0, 'bytes': 0, 'errors': 0}
+        
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+            'Accept-Encoding': self.accept_encoding(),
+            'Connection': 'keep-alive'
+        })
+    
+    @staticmethod
+    def accept_encoding():
+        """只有安装了brotli时urllib3才能解压br，否则只声明gzip/deflate"""
+        for module_name in ('brotli', 'brotlicffi'):
+            try:
+                __import__(module_name)
+                return 'gzip, deflate, br'
+            except ImportError:
+                continue
+        return 'gzip, deflate'
+    
+    def get_text(self, url):
+        """
+        获取页面HTML
+        
+        Args:
+            url: 页面URL
+            
+        Returns:
+            str: 页面HTML，失败时返回None
+        """
+        headers = {}
+        with self.lock:
+            cached = self.validators.get(url)
+            if cached:
+                self.validators.move_to_end(url)
+                if cached.get('etag'):
+                    headers['If-None-Match'] = cached['etag']
+                if cached.get('last_modified'):
+                    headers['If-Modified-Since'] = cached['last_modified']
+        
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"请求页面时出错: {e}，URL: {url}")
+            return None
+        
+        self.stats['requests'] += 1
+        if response.status_code == 304 and cached:
+            self.stats['not_modified'] += 1
+            return cached['text']
+        
+        if response.status_code != 200:
+            self.stats['errors'] += 1
+            print(f"请求页面失败，状态码: {response.status_code}，URL: {url}")
+            return None
+        
+        text = response.text
+        self.stats['bytes'] += len(response.content)
+        
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self.lock:
+                self.validators[url] = {'etag': etag, 'last_modified': last_modified, 'text': text}
+                self.validators.move_to_end(url)
+                while len(self.validators) > self.max_cached_pages:
+                    self.validators.popitem(last=False)
+        return text
+
+
+_shared_http_client = None
+_shared_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """获取全局共享的ArticleHttpClient（爬取和分析共用同一个连接池）"""
+    global _shared_http_client
+    with _shared_http_client_lock:
+        if _shared_http_client is None:
+            _shared_http_client = ArticleHttpClient()
+        return _shared_http_client
+
+
+# ============ 核心类：文章本地存储 ============
+
+def parse_article_identity(url):
+    """
+    从文章链接中解析文章身份（__biz/mid/idx/sn）
+    
+    Args:
+        url: 文章URL
+        
+    Returns:
+        dict: {'biz', 'mid', 'idx', 'sn'}，不是完整参数形式的链接（如短链接）返回None
+    """
+    try:
+        params = parse_qs(urlparse(url).query)
+    except Exception:
+        return None
+    
+    identity = {
+        'biz': params.get('__biz', [''])[0],
+        'mid': params.get('mid', params.get('appmsgid', ['']))[0],
+        'idx': params.get('idx', params.get('itemidx', ['']))[0],
+        'sn': params.get('sn', params.get('signature', ['']))[0],
+    }
+    if not (identity['biz'] and identity['mid'] and identity['idx']):
+        return None
+    return identity
+
+
+def canonical_article_key(url):
+    """
+    文章的规范化标识：同一篇文章不同形式的链接（附带scene、chksm等参数）得到同一个标识
+    
+    Args:
+        url: 文章URL
+        
+    Returns:
+        str: 文章标识，完整参数链接为 "biz/mid/idx/sn"，短链接为去掉查询参数后的地址
+    """
+    identity = parse_article_identity(url)
+    if identity:
+        return f"{identity['biz']}/{identity['mid']}/{identity['idx']}/{identity['sn']}"
+    parsed = urlparse(url)
+    return f"{parsed.netloc}{parsed.path}".rstrip('/')
+
+
+class ArticleStore:
+    """
+    已下载文章的本地存储
+    
+    按文章身份（__biz/mid/idx/sn）的哈希值保存压缩后的页面HTML和正文文本，
+    用不同关键词重新分析已爬过的公众号时不必再次下载；总大小超过上限时淘汰最久未访问的文章
+    """
+    
+    def __init__(self, store_dir="article_store", max_bytes=500 * 1024 * 1024):
+        """
+        初始化文章存储
+        
+        Args:
+            store_dir: 存储目录
+            max_bytes: 存储占用的磁盘空间上限（压缩后字节数）
+        """
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        # 可选依赖：安装了zstandard时使用zstd压缩，否则使用gzip
+        self.zstandard = import_optional('zstandard')
+        self.extension = '.json.zst' if self.zstandard is not None else '.json.gz'
+        self.lock = threading.Lock()
+        self.sizes = None  # path -> 文件大小，首次使用时扫描目录得到
+        self.total_bytes = 0
+    
+    def path_for(self, url):
+        """文章在存储目录中的文件路径（不含扩展名）"""
+        digest = hashlib.sha1(canonical_article_key(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.store_dir, digest[:2], digest)
+    
+    def scan(self):
+        """扫描存储目录，统计已有文件大小"""
+        if self.sizes is not None:
+            return
+        self.sizes = {}
+        self.total_bytes = 0
+        for path in glob.glob(os.path.join(self.store_dir, '*', '*.json.*')):
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            self.sizes[path] = size
+            self.total_bytes += size
+    
+    def compress(self, data, extension):
+        if extension == '.json.zst':
+            return self.zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+    
+    def decompress(self, data, extension):
+        if extension == '.json.zst':
+            return self.zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+    
+    def get(self, url):
+        """
+        读取文章记录
+        
+        Args:
+            url: 文章URL
+            
+        Returns:
+            dict: {'url', 'html', 'text', 'body', 'stored_at'}，未保存过时返回None
+        """
+        base = self.path_for(url)
+        for extension in ('.json.zst', '.json.gz'):
+            path = base + extension
+            if not os.path.exists(path):
+                continue
+            if extension == '.json.zst' and self.zstandard is None:
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    record = json.loads(self.decompress(f.read(), extension).decode('utf-8'))
+                # 更新访问时间，淘汰时按访问时间从旧到新删除
+                os.utime(path, None)
+                return record
+            except Exception as e:
+                print(f"读取本地文章 {path} 时出错: {e}")
+        return None
+    
+    def put(self, url, html=None, body=None):
+        """
+        保存文章HTML和/或正文提取结果（与已有记录合并）
+        
+        Args:
+            url: 文章URL
+            html: 页面HTML
+            body: ArticleBodyExtractor的提取结果（正文文本、字数、图片、外链）
+        """
+        if not html and body is None:
+            return
+        
+        existing = self.get(url)
+        record = dict(existing) if existing is not None else {'url': url, 'html': None, 'text': None}
+        if html:
+            record['html'] = html
+        if body is not None:
+            record['text'] = body.get('text', '')
+            record['body'] = body
+        
+        # 内容与已保存的记录相同时不再压缩和写入（get已更新访问时间）
+        if existing is not None and record == existing:
+            return
+        record['stored_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        base = self.path_for(url)
+        path = base + self.extension
+        try:
+            data = self.compress(json.dumps(record, ensure_ascii=False).encode('utf-8'), self.extension)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, path)
+        except Exception as e:
+            print(f"保存本地文章 {path} 时出错: {e}")
+            return
+        
+        with self.lock:
+            self.scan()
+            self.total_bytes += len(data) - self.sizes.get(path, 0)
+            self.sizes[path] = len(data)
+            if self.total_bytes > self.max_bytes:
+                self.evict(keep=path)
+    
+    def iter_records(self):
+        """
+        遍历存储中的所有文章记录
+        
+        Yields:
+            dict: {'url', 'html', 'text', 'body', 'stored_at'}
+        """
+        for path in glob.glob(os.path.join(self.store_dir, '*', '*.json.*')):
+            extension = '.json.zst' if path.endswith('.json.zst') else '.json.gz'
+            if extension == '.json.zst' and self.zstandard is None:
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    yield json.loads(self.decompress(f.read(), extension).decode('utf-8'))
+            except Exception as e:
+                print(f"读取本地文章 {path} 时出错: {e}")
+    
+    def evict(self, keep=None):
+        """按访问时间从旧到新删除文章，直到总大小低于上限的90%"""
+        def access_time(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+        
+        target = self.max_bytes * 0.9
+        for path in sorted(self.sizes, key=access_time):
+            if self.total_bytes <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.total_bytes -= self.sizes.pop(path)
+
+
+# ============ 核心类：本地倒排索引 ============
+
+class ArticleIndex:
+    """
+    已爬取文章的本地倒排索引（SQLite）
+    
+    中文按相邻两字（bigram）切分，英文和数字按单词切分；爬取和关键词分析时新文章随时加入，
+    之后查询关键词只读本地索引，不访问网络。
+    查询词的所有切分词都出现在文章中才算匹配，文章中出现次数最少的切分词的次数作为匹配次数的估计
+    """
+    
+    TOKEN_PATTERN = re.compile(r'[\u4e00-\u9fff]+|[a-z0-9]+')
+    
+    def __init__(self, index_file="article_index.db"):
+        """
+        初始化倒排索引
+        
+        Args:
+            index_file: 索引数据库文件路径
+        """
+        self.index_file = index_file
+        self.lock = threading.Lock()
+        import sqlite3
+        self.connection = sqlite3.connect(index_file, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_id INTEGER PRIMARY KEY,
+                    article_key TEXT UNIQUE NOT NULL,
+                    nickname TEXT,
+                    title TEXT,
+                    link TEXT,
+                    publish_time TEXT,
+                    publish_date TEXT,
+                    length INTEGER NOT NULL DEFAULT 0,
+                    has_content INTEGER NOT NULL DEFAULT 0,
+                    indexed_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc_id);
+                CREATE INDEX IF NOT EXISTS idx_documents_nickname ON documents (nickname);
+                CREATE TABLE IF NOT EXISTS corpus_stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+            """)
+            # 已索引正文的文章数和总长度随文章增删增量维护，BM25排序时不必扫描全部文章
+            self.connection.execute(
+                "INSERT OR IGNORE INTO corpus_stats (name, value) "
+                "SELECT 'documents', COUNT(*) FROM documents WHERE has_content = 1"
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO corpus_stats (name, value) "
+                "SELECT 'total_length', COALESCE(SUM(length), 0) FROM documents WHERE has_content = 1"
+            )
+    
+    @classmethod
+    def tokenize(cls, text):
+        """
+        切分文本
+        
+        Args:
+            text: 文本内容
+            
+        Returns:
+            list: 切分词列表（中文为相邻两字，单个汉字保持原样；英文和数字为小写单词）
+        """
+        tokens = []
+        for run in cls.TOKEN_PATTERN.findall((text or "").lower()):
+            if '\u4e00' <= run[0] <= '\u9fff':
+                if len(run) == 1:
+                    tokens.append(run)
+                else:
+                    tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            else:
+                tokens.append(run)
+        return tokens
+    
+    def add_article(self, article, content=None):
+        """
+        把文章加入索引（已存在的文章会被更新）
+        
+        Args:
+            article: 文章信息字典（至少包含link和title）
+            content: 正文文本；为None时只索引标题，且不会覆盖已索引的正文
+        """
+        link = article.get('link', '')
+        if not link:
+            return
+        
+        article_key = canonical_article_key(link)
+        metadata = (article.get('nickname'), article.get('title'), link,
+                    article.get('publish_time'), article.get('publish_date'))
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT doc_id, has_content, length FROM documents WHERE article_key = ?", (article_key,)
+            ).fetchone()
+            
+            # 只有标题的新信息不覆盖已经索引过的正文，只更新文章信息
+            if row and content is None and row[1]:
+                self.connection.execute(
+                    "UPDATE documents SET nickname = COALESCE(?, nickname), title = COALESCE(?, title), link = ?, "
+                    "publish_time = COALESCE(?, publish_time), publish_date = COALESCE(?, publish_date) WHERE doc_id = ?",
+                    metadata + (row[0],)
+                )
+                return
+            
+            tokens = self.tokenize(f"{article.get('title', '')}\n{content or ''}")
+            term_counts = {}
+            for token in tokens:
+                term_counts[token] = term_counts.get(token, 0) + 1
+            
+            if row and row[1]:
+                self.update_corpus_stats(-1, -row[2])
+            if content is not None:
+                self.update_corpus_stats(1, len(tokens))
+            
+            if row:
+                doc_id = row[0]
+                self.connection.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                self.connection.execute(
+                    "UPDATE documents SET nickname = COALESCE(?, nickname), title = COALESCE(?, title), link = ?, "
+                    "publish_time = COALESCE(?, publish_time), publish_date = COALESCE(?, publish_date), "
+                    "length = ?, has_content = ?, indexed_at = ? WHERE doc_id = ?",
+                    metadata + (len(tokens), int(content is not None), now, doc_id)
+                )
+            else:
+                cursor = self.connection.execute(
+                    "INSERT INTO documents (article_key, nickname, title, link, publish_time, publish_date, "
+                    "length, has_content, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (article_key,) + metadata + (len(tokens), int(content is not None), now)
+                )
+                doc_id = cursor.lastrowid
+            
+            self.connection.executemany(
+                "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                [(term, doc_id, tf) for term, tf in term_counts.items()]
+            )
+    
+    def update_corpus_stats(self, documents, total_length):
+        """调整已索引正文的文章数和总长度（在事务内调用）"""
+        self.connection.execute("UPDATE corpus_stats SET value = value + ? WHERE name = 'documents'", (documents,))
+        self.connection.execute("UPDATE corpus_stats SET value = value + ? WHERE name = 'total_length'", (total_length,))
+    
+    def corpus_stats(self):
+        """
+        已索引正文的文章统计
+        
+        Returns:
+            tuple: (文章数, 平均长度（切分词个数）)
+        """
+        with self.lock:
+            values = dict(self.connection.execute("SELECT name, value FROM corpus_stats").fetchall())
+        documents = values.get('documents', 0)
+        average_length = values.get('total_length', 0) / documents if documents else 0
+        return documents, average_length
+    
+    def query_terms(self, query):
+        """查询词切分后去重（保持顺序）"""
+        return list(dict.fromkeys(self.tokenize(query)))
+    
+    def match(self, query, nickname=None, content_only=False):
+        """
+        查找包含查询词的文章
+        
+        Args:
+            query: 查询词
+            nickname: 只在该公众号的文章中查找
+            content_only: 只查找已索引正文的文章
+            
+        Returns:
+            dict: {doc_id: 匹配次数估计}
+        """
+        terms = self.query_terms(query)
+        if not terms:
+            return {}
+        
+        conditions = ""
+        params = list(terms)
+        if nickname:
+            conditions += " AND d.nickname = ?"
+            params.append(nickname)
+        if content_only:
+            conditions += " AND d.has_content = 1"
+        params.append(len(terms))
+        
+        placeholders = ", ".join("?" * len(terms))
+        sql = (f"SELECT p.doc_id, MIN(p.tf) FROM postings p "
+               f"{'JOIN documents d ON d.doc_id = p.doc_id ' if conditions else ''}"
+               f"WHERE p.term IN ({placeholders}){conditions} "
+               f"GROUP BY p.doc_id HAVING COUNT(*) = ?")
+        with self.lock:
+            return dict(self.connection.execute(sql, params).fetchall())
+    
+    def search(self, keywords, weights=None, nickname=None, match_all=False, limit=50):
+        """
+        在本地索引中搜索文章
+        
+        Args:
+            keywords: 关键词或关键词列表
+            weights: 权重列表，默认都为1
+            nickname: 只在该公众号的文章中搜索，默认搜索所有公众号
+            match_all: True表示文章需要包含所有关键词，False表示包含任一关键词即可
+            limit: 最多返回的文章数量
+            
+        Returns:
+            list: 按加权匹配次数从高到低排序的文章列表，每篇包含keyword_counts和keyword_score
+        """
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        if weights is None:
+            weights = [1] * len(keywords)
+        
+        keyword_counts = {}  # doc_id -> {关键词: 次数}
+        for keyword in keywords:
+            matches = self.match(keyword, nickname)
+            for doc_id, count in matches.items():
+                keyword_counts.setdefault(doc_id, {})[keyword] = count
+        
+        if match_all:
+            keyword_counts = {doc_id: counts for doc_id, counts in keyword_counts.items()
+                              if len(counts) == len(set(keywords))}
+        
+        scores = {doc_id: sum(counts.get(keyword, 0) * weights[i] for i, keyword in enumerate(keywords))
+                  for doc_id, counts in keyword_counts.items()}
+        top = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)[:limit]
+        return self.get_articles(top, keyword_counts, scores)
+    
+    def get_articles(self, doc_ids, keyword_counts=None, scores=None):
+        """按给定顺序读取文章信息"""
+        if not doc_ids:
+            return []
+        placeholders = ", ".join("?" * len(doc_ids))
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT doc_id, nickname, title, link, publish_time, publish_date FROM documents "
+                f"WHERE doc_id IN ({placeholders})", list(doc_ids)
+            ).fetchall()
+        
+        by_id = {row[0]: row for row in rows}
+        articles = []
+        for doc_id in doc_ids:
+            row = by_id.get(doc_id)
+            if row is None:
+                continue
+            article = {'nickname': row[1], 'title': row[2], 'link': row[3],
+                       'publish_time': row[4], 'publish_date': row[5]}
+            if keyword_counts is not None:
+                article['keyword_counts'] = str(keyword_counts.get(doc_id, {}))
+            if scores is not None:
+                article['keyword_score'] = scores.get(doc_id, 0)
+            articles.append(article)
+        return articles
+    
+    def stats(self):
+        """
+        索引统计
+        
+        Returns:
+            dict: {'documents': 文章数, 'with_content': 已索引正文的文章数, 'terms': 不同切分词数量}
+        """
+        with self.lock:
+            documents, with_content = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(has_content), 0) FROM documents"
+            ).fetchone()
+            terms = self.connection.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+        return {'documents': documents, 'with_content': with_content, 'terms': terms}
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# ============ 核心类：文章页面缓存 ============
+
+class ArticlePageCache:
+    """
+    单次运行内的文章页面缓存
+    
+    爬取阶段为提取发布时间下载的页面会留在这里，关键词分析阶段直接复用，
+    同一篇文章只下载一次；按总字符数做LRU淘汰，避免长时间运行占用过多内存。
+    传入ArticleStore后，内存中没有的页面会先从本地存储读取，新下载的页面也会写入本地存储
+    """
+    
+    def __init__(self, max_chars=200 * 1024 * 1024, store=None):
+        """
+        初始化页面缓存
+        
+        Args:
+            max_chars: 缓存页面的总字符数上限，超出后淘汰最久未使用的页面
+            store: ArticleStore实例，作为内存缓存之后的第二级缓存
+        """
+        self.max_chars = max_chars
+        self.store = store
+        self.pages = OrderedDict()  # 文章标识 -> html
+        self.total_chars = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'store_hits': 0, 'misses': 0}
+    
+    def get(self, url):
+        """
+        获取缓存的页面
+        
+        Returns:
+            str: 页面HTML，未缓存时返回None
+        """
+        key = canonical_article_key(url)
+        with self.lock:
+            html = self.pages.get(key)
+            if html is not None:
+                self.pages.move_to_end(key)
+                self.stats['hits'] += 1
+                return html
+        
+        record = self.store.get(url) if self.store is not None else None
+        if record and record.get('html'):
+            with self.lock:
+                self.stats['store_hits'] += 1
+            self.remember(key, record['html'])
+            return record['html']
+        
+        with self.lock:
+            self.stats['misses'] += 1
+        return None
+    
+    def put(self, url, html):
+        """缓存页面（html为空时不缓存）"""
+        if not html:
+            return
+        self.remember(canonical_article_key(url), html)
+        if self.store is not None:
+            self.store.put(url, html=html)
+    
+    def remember(self, key, html):
+        """把页面放入内存缓存"""
+        with self.lock:
+            old = self.pages.pop(key, None)
+            if old is not None:
+                self.total_chars -= len(old)
+            self.pages[key] = html
+            self.total_chars += len(html)
+            while self.total_chars > self.max_chars and len(self.pages) > 1:
+                _, evicted = self.pages.popitem(last=False)
+                self.total_chars -= len(evicted)
+    
+    def get_body(self, url):
+        """
+        获取本地存储中已有的正文提取结果
+        
+        Returns:
+            dict: ArticleBodyExtractor的提取结果，没有本地存储或未保存过时返回None
+        """
+        if self.store is None:
+            return None
+        record = self.store.get(url)
+        return record.get('body') if record else None
+    
+    def put_body(self, url, body):
+        """把正文提取结果保存到本地存储"""
+        if self.store is not None:
+            self.store.put(url, body=body)
+    
+    def __contains__(self, url):
+        with self.lock:
+            return canonical_article_key(url) in self.pages
+    
+    def clear(self):
+        """清空内存缓存（本地存储不受影响）"""
+        with self.lock:
+            self.pages.clear()
+            self.total_chars = 0
+
+
+# ============ 核心类：文章页面并发下载 ============
+
+class AsyncArticleFetcher:
+    """
+    基于asyncio的文章页面下载引擎
+    
+    同一host的并发数和全局请求速率都有上限，可选随机抖动；
+    阻塞的HTTP请求放在线程池中执行，由事件循环统一调度
+    """
+    
+    def __init__(self, per_host_limit=4, requests_per_second=5, jitter=0.3, http_client=None, page_cache=None):
+        """
+        初始化下载引擎
+        
+        Args:
+            per_host_limit: 每个host的最大并发请求数
+            requests_per_second: 全局每秒最多发起的请求数
+            jitter: 每次请求前额外增加0~jitter秒的随机延迟
+            http_client: ArticleHttpClient实例，默认使用全局共享客户端
+            page_cache: ArticlePageCache实例，已缓存的页面不再下载
+        """
+        self.per_host_limit = per_host_limit
+        self.requests_per_second = requests_per_second
+        self.jitter = jitter
+        self.http_client = http_client if http_client is not None else get_http_client()
+        self.page_cache = page_cache if page_cache is not None else ArticlePageCache()
+    
+    def download(self, url):
+        """
+        下载单个页面（阻塞，在线程池中执行），下载结果写入页面缓存
+        
+        Returns:
+            str: 页面HTML，失败时返回None
+        """
+        html = self.http_client.get_text(url)
+        self.page_cache.put(url, html)
+        return html
+    
+    async def iter_fetch(self, urls, stop_event=None):
+        """
+        并发下载多个页面，按完成顺序逐个返回
+        
+        Args:
+            urls: URL列表（重复的URL只下载一次）
+            stop_event: threading.Event，被设置后不再发起新的请求
+            
+        Yields:
+            tuple: (url, html)，下载失败时html为None
+        """
+        import asyncio
+        
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        
+        loop = asyncio.get_running_loop()
+        host_semaphores = {}
+        rate_lock = asyncio.Lock()
+        next_slot = [loop.time()]
+        
+        async def fetch_one(url, executor):
+            # 已缓存的页面直接返回，不占用并发和限速名额
+            cached = self.page_cache.get(url)
+            if cached is not None:
+                return url, cached
+            
+            host = urlparse(url).netloc
+            semaphore = host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+            async with semaphore:
+                if stop_event is not None and stop_event.is_set():
+                    return url, None
                 
-                # 处理获取到的文章
-                for article in articles:
-                    # 从文章数据中提取所需信息
-                    title = article.get('title', '无标题')
-                    link = article.get('link', '无链接')
-                    
-                    # 检查是否已经处理过这个链接
-                    if link in fetched_links:
-                        print(f"文章 '{title}' 已经爬取过，跳过")
-                        continue
-                    
-                    # 从URL中提取发布时间
-                    article_date = None
-                    publish_date_str = ''
-                    
-                    if link != '无链接':
-                        article_date, publish_date_str = self.extract_publish_time_from_url(link)
-                        
-                        if article_date:
-                            # 如果有自定义的时间过滤函数
-                            if time_filter_func and not time_filter_func(article_date):
-                                print(f"文章 '{title}' 不符合时间过滤条件，跳过")
-                                
-                                # 如果设置了stop_on_outdated，并且文章确实是因为太旧而被过滤
-                                # 这里我们假设time_filter_func是用来检查文章是否在最近的日期范围内
-                                if stop_on_outdated:
-                                    print(f"发现不符合时间条件的文章，停止爬取公众号 '{nickname}'")
-                                    outdated_found = True
-                                    break
-                                    
-                                continue
-                                
-                            # 如果需要过滤最近几天的文章
-                            if date_range and article_date not in date_range:
-                                print(f"文章 '{title}' 发布于 {article_date}，不在指定的日期范围内")
-                                
-                                # 无论是否已收集文章，只要文章日期早于范围，如果启用了stop_on_outdated，就停止
-                                if stop_on_outdated:
-                                    print(f"发现超出日期范围的文章，停止爬取公众号 '{nickname}'")
-                                    outdated_found = True
-                                    break
-                                    
-                                # 原有的逻辑：只有已经收集了文章才因为日期早于范围而停止
-                                if article_date < min(date_range) and collected > 0:
-                                    print("已找到早于指定日期范围的文章，停止获取")
-                                    has_more = False
-                                    break
-                                continue
-                            
-                            # 添加文章信息
-                            articles_info.append({
-                                'nickname': nickname,
-                                'title': title,
-                                'link': link,
-                                'publish_time': publish_date_str,
-                                'publish_date': article_date.strftime('%Y-%m-%d')
-                            })
-                            
-                            # 记录已获取的链接
-                            fetched_links.add(link)
-                            
-                            collected += 1
-                            added_in_batch = True
-                            print(f"[{collected}/{count}] 已添加文章: {title}")
-                            
-                            # 如果已经收集足够的文章，则终止循环
-                            if collected >= count:
-                                print(f"已达到目标数量 {count} 篇文章，停止获取")
-                                has_more = False
-                                break
-                        else:
-                            print(f"从URL无法提取到发布时间: {link}")
+                # 全局限速：每个请求占用一个时间槽
+                async with rate_lock:
+                    now = loop.time()
+                    wait = next_slot[0] - now
+                    next_slot[0] = max(now, next_slot[0]) + 1.0 / self.requests_per_second
+                if self.jitter:
+                    wait += random.uniform(0, self.jitter)
+                if wait > 0:
+                    await asyncio.sleep(wait)
                 
-                # 如果发现了过期文章，退出主循环
-                if outdated_found:
-                    print(f"由于发现过期文章，提前停止爬取公众号 '{nickname}'")
+                return url, await loop.run_in_executor(executor, self.download, url)
+        
+        with ThreadPoolExecutor(max_workers=self.per_host_limit * 2) as executor:
+            tasks = [asyncio.ensure_future(fetch_one(url, executor)) for url in urls]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    yield await task
+            finally:
+                for task in tasks:
+                    task.cancel()
+    
+    def fetch_many(self, urls):
+        """
+        iter_fetch的同步版本：在后台线程中运行事件循环，下载完成一个就返回一个，
+        调用方提前停止迭代时不再发起新的请求
+        
+        Args:
+            urls: URL列表
+            
+        Yields:
+            tuple: (url, html)，下载失败时html为None
+        """
+        results = queue.Queue()
+        stop_event = threading.Event()
+        finished = object()
+        
+        async def drain():
+            async for item in self.iter_fetch(urls, stop_event):
+                results.put(item)
+        
+        def run():
+            import asyncio
+            try:
+                asyncio.run(drain())
+            except Exception as e:
+                print(f"并发下载文章页面时出错: {e}")
+            finally:
+                results.put(finished)
+        
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = results.get()
+                if item is finished:
+                    break
+                yield item
+        finally:
+            stop_event.set()
+    
+    def fetch_all(self, urls):
+        """
+        并发下载多个页面并等待全部完成
+        
+        Returns:
+            dict: {url: html}
+        """
+        return dict(self.fetch_many(urls))
+
+
+# ============ 核心类：文章正文提取 ============
+
+class ArticleBodyExtractor:
+    """
+    从文章页面中一次性提取正文文本、字数、图片链接和外链
+    
+    依次使用selectolax、lxml、BeautifulSoup中已安装的最快解析器，只遍历正文节点一次
+    """
+    
+    # 统计字数：每个汉字算一个字，连续的字母数字算一个词
+    WORD_PATTERN = re.compile(r'[\u4e00-\u9fff]|[A-Za-z0-9]+')
+    
+    # 不计入正文的元素（与BeautifulSoup、selectolax的处理一致）
+    SKIPPED_TAGS = ('script', 'style', 'template')
+    
+    def __init__(self, backend=None):
+        """
+        初始化正文提取器
+        
+        Args:
+            backend: 'selectolax'、'lxml' 或 'bs4'，默认使用已安装的最快解析器
+        """
+        # 只导入用到的解析器
+        self.selectolax_parser = None
+        self.lxml_etree = None
+        self.lxml_html = None
+        if backend in (None, 'selectolax'):
+            self.selectolax_parser = self.load_selectolax_parser()
+            if self.selectolax_parser is not None:
+                backend = 'selectolax'
+        if backend in (None, 'lxml'):
+            self.lxml_etree = import_optional('lxml.etree')
+            self.lxml_html = import_optional('lxml.html')
+            if self.lxml_html is not None:
+                backend = 'lxml'
+        self.backend = backend or 'bs4'
+    
+    @staticmethod
+    def load_selectolax_parser():
+        """selectolax的解析器类（优先使用lexbor后端），未安装时返回None"""
+        module = import_optional('selectolax.lexbor')
+        if module is not None:
+            return module.LexborHTMLParser
+        module = import_optional('selectolax.parser')
+        return module.HTMLParser if module is not None else None
+    
+    @classmethod
+    def available_backends(cls):
+        """
+        已安装的解析器，按速度从快到慢排列
+        
+        Returns:
+            list: 例如 ['selectolax', 'lxml', 'bs4']
+        """
+        backends = []
+        if cls.load_selectolax_parser() is not None:
+            backends.append('selectolax')
+        if import_optional('lxml.html') is not None:
+            backends.append('lxml')
+        return backends + ['bs4']
+    
+    @staticmethod
+    def empty():
+        """没有内容时的提取结果"""
+        return {'text': '', 'word_count': 0, 'images': [], 'links': []}
+    
+    def extract(self, html):
+        """
+        提取文章正文
+        
+        Args:
+            html: 文章页面HTML
+            
+        Returns:
+            dict: {'text': 正文文本, 'word_count': 字数, 'images': 图片链接列表, 'links': 外链列表}
+        """
+        if not html:
+            return self.empty()
+        
+        try:
+            if self.backend == 'selectolax':
+                text, images, links = self.extract_with_selectolax(html)
+            elif self.backend == 'lxml':
+                text, images, links = self.extract_with_lxml(html)
+            else:
+                text, images, links = self.extract_with_bs4(html)
+        except Exception as e:
+            print(f"使用{self.backend}解析文章正文时出错: {e}，改用BeautifulSoup")
+            text, images, links = self.extract_with_bs4(html)
+        
+        return {
+            'text': text,
+            'word_count': len(self.WORD_PATTERN.findall(text)),
+            'images': list(dict.fromkeys(images)),
+            'links': list(dict.fromkeys(links)),
+        }
+    
+    @staticmethod
+    def is_outbound_link(href):
+        return bool(href) and href.startswith(('http://', 'https://'))
+    
+    def extract_with_selectolax(self, html):
+        tree = self.selectolax_parser(html)
+        root = tree.css_first('#js_content') or tree.css_first('.rich_media_content') or tree.body or tree.root
+        for node in root.css(', '.join(self.SKIPPED_TAGS)):
+            node.decompose()
+        
+        # 微信文章的图片懒加载，真实地址在data-src中
+        images = []
+        for node in root.css('img'):
+            src = node.attributes.get('data-src') or node.attributes.get('src')
+            if src:
+                images.append(src)
+        links = [node.attributes.get('href') for node in root.css('a[href]')]
+        links = [href for href in links if self.is_outbound_link(href)]
+        return root.text(separator='', strip=True), images, links
+    
+    def extract_with_lxml(self, html):
+        document = self.lxml_html.fromstring(html)
+        nodes = document.xpath('//*[@id="js_content"]') or document.find_class('rich_media_content')
+        root = nodes[0] if nodes else document
+        
+        # 按文档顺序逐段取文本（与BeautifulSoup的get_text(strip=True)一致），跳过注释以及脚本、样式和模板的整个子树，
+        # 注释和被跳过元素之后的文本（tail）仍然保留；图片和外链在同一次遍历中收集
+        pieces = []
+        images = []
+        links = []
+        skip_depth = 0
+        for event, node in self.lxml_etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+            if event == 'start':
+                if skip_depth or node.tag in self.SKIPPED_TAGS:
+                    skip_depth += 1
+                    continue
+                if node.text:
+                    pieces.append(node.text.strip())
+                if node.tag == 'img':
+                    src = node.get('data-src') or node.get('src')
+                    if src:
+                        images.append(src)
+                elif node.tag == 'a' and self.is_outbound_link(node.get('href')):
+                    links.append(node.get('href'))
+            elif event == 'end':
+                if skip_depth:
+                    skip_depth -= 1
+                if not skip_depth and node is not root and node.tail:
+                    pieces.append(node.tail.strip())
+            elif not skip_depth and node.tail:
+                pieces.append(node.tail.strip())
+        return ''.join(pieces), images, links
+    
+    def extract_with_bs4(self, html):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        root = soup.select_one('#js_content') or soup.select_one('.rich_media_content') or soup
+        for node in root.find_all(self.SKIPPED_TAGS):
+            node.decompose()
+        
+        images = []
+        for node in root.find_all('img'):
+            src = node.get('data-src') or node.get('src')
+            if src:
+                images.append(src)
+        links = [node.get('href') for node in root.find_all('a', href=True)]
+        links = [href for href in links if self.is_outbound_link(href)]
+        return root.get_text(strip=True), images, links
+
+
+# ============ 核心类：多关键词匹配 ============
+
+class KeywordMatcher:
+    """
+    基于Aho-Corasick自动机的多关键词计数器
+    
+    所有关键词只需扫描一遍文本，耗时与关键词数量基本无关，适合几十到几百个带权重的关键词；
+    安装了pyahocorasick时使用其C实现，否则使用纯Python实现的自动机
+    
+    重叠计数方式（overlap）：
+        non_overlapping: 每个关键词各自按不重叠的方式计数，与 str.count 结果一致（默认）
+        overlapping: 所有出现位置都计数，包括同一关键词自身重叠的情况
+        longest: 不同关键词之间也不重叠，同一位置优先取最长的关键词
+    """
+    
+    OVERLAP_MODES = ('non_overlapping', 'overlapping', 'longest')
+    
+    def __init__(self, keywords, weights=None, overlap='non_overlapping', case_sensitive=False):
+        """
+        初始化关键词匹配器
+        
+        Args:
+            keywords: 关键词列表
+            weights: 权重列表，与关键词一一对应，默认都为1
+            overlap: 重叠计数方式，见类说明
+            case_sensitive: 是否区分大小写
+        """
+        if overlap not in self.OVERLAP_MODES:
+            raise ValueError(f"overlap 必须是 {self.OVERLAP_MODES} 之一，当前为 {overlap}")
+        if weights is None:
+            weights = [1] * len(keywords)
+        
+        self.keywords = list(keywords)
+        self.weights = list(weights)
+        self.overlap = overlap
+        self.case_sensitive = case_sensitive
+        
+        # 规范化后的关键词 -> 原关键词在列表中的下标（同一关键词可能出现多次）
+        self.patterns = {}
+        for i, keyword in enumerate(self.keywords):
+            if keyword:
+                self.patterns.setdefault(self.normalize(keyword), []).append(i)
+        
+        # 可选依赖：安装了pyahocorasick时使用其C实现的自动机
+        ahocorasick = import_optional('ahocorasick')
+        self.automaton = None
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for pattern in self.patterns:
+                self.automaton.add_word(pattern, pattern)
+            if self.patterns:
+                self.automaton.make_automaton()
+        else:
+            self.build_automaton()
+    
+    def normalize(self, text):
+        return text if self.case_sensitive else text.lower()
+    
+    def build_automaton(self):
+        """构建纯Python版本的Aho-Corasick自动机"""
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(pattern)
+        
+        # 按广度优先顺序计算失败指针，并合并失败链上的输出
+        queue_states = list(self.goto[0].values())
+        for state in queue_states:
+            for char, next_state in self.goto[state].items():
+                queue_states.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+    
+    def iter_matches(self, text):
+        """
+        扫描一遍文本，按结束位置顺序返回所有匹配
+        
+        Yields:
+            tuple: (结束位置（含）, 规范化后的关键词)
+        """
+        if not self.patterns or not text:
+            return
+        
+        if self.automaton is not None:
+            yield from self.automaton.iter(text)
+            return
+        
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern in outputs[state]:
+                yield position, pattern
+    
+    def count(self, text):
+        """
+        统计每个关键词的出现次数
+        
+        Args:
+            text: 文本内容
+            
+        Returns:
+            dict: {规范化后的关键词: 次数}
+        """
+        counts = dict.fromkeys(self.patterns, 0)
+        text = self.normalize(text or "")
+        
+        if self.overlap == 'overlapping':
+            for _, pattern in self.iter_matches(text):
+                counts[pattern] += 1
+        
+        elif self.overlap == 'non_overlapping':
+            # 每个关键词记录上一次计数的结束位置，与 str.count 一样从左到右贪心计数
+            next_allowed = dict.fromkeys(self.patterns, 0)
+            for end, pattern in self.iter_matches(text):
+                start = end - len(pattern) + 1
+                if start >= next_allowed[pattern]:
+                    counts[pattern] += 1
+                    next_allowed[pattern] = end + 1
+        
+        else:
+            # 所有关键词之间都不重叠：按起始位置从左到右，同一起点取最长的关键词
+            matches = sorted(((end - len(pattern) + 1, -len(pattern), pattern)
+                              for end, pattern in self.iter_matches(text)))
+            next_allowed = 0
+            for start, negative_length, pattern in matches:
+                if start >= next_allowed:
+                    counts[pattern] += 1
+                    next_allowed = start - negative_length
+        
+        return counts
+    
+    def score(self, text):
+        """
+        计算文本的关键词计数和加权总分
+        
+        Args:
+            text: 文本内容
+            
+        Returns:
+            tuple: (关键词计数字典（键为原关键词）, 总分数)
+        """
+        counts = self.count(text)
+        keyword_counts = {}
+        total_score = 0
+        for i, keyword in enumerate(self.keywords):
+            count = counts.get(self.normalize(keyword), 0) if keyword else 0
+            keyword_counts[keyword] = count
+            total_score += count * self.weights[i]
+        return keyword_counts, total_score
+
+
+class BM25Ranker:
+    """
+    BM25相关性排序
+    
+    与“次数×权重”相比，会按文章长度归一化（长文章不再天然占优），并提高少见关键词的权重。
+    语料统计（文章数、平均长度、包含关键词的文章数）优先取自本地倒排索引，索引为增量维护，
+    排序新一批文章时不需要重新扫描全部文章；没有索引时使用当前这批文章计算
+    """
+    
+    def __init__(self, k1=1.5, b=0.75, article_index=None):
+        """
+        初始化BM25排序器
+        
+        Args:
+            k1: 词频饱和参数，越大则出现次数的影响越大
+            b: 长度归一化参数，0表示不考虑文章长度，1表示完全按长度归一化
+            article_index: ArticleIndex实例，提供语料统计
+        """
+        self.k1 = k1
+        self.b = b
+        self.article_index = article_index
+    
+    @staticmethod
+    def document_length(title, text):
+        """文章长度（与倒排索引相同的切分词个数）"""
+        return len(ArticleIndex.tokenize(f"{title or ''}\n{text or ''}"))
+    
+    def corpus_stats(self, keywords, batch):
+        """
+        计算语料统计
+        
+        Args:
+            keywords: 关键词列表
+            batch: 当前这批文章 [(关键词计数字典, 文章长度), ...]
+            
+        Returns:
+            tuple: (文章数, 平均长度, {关键词: 包含该关键词的文章数})
+        """
+        if self.article_index is not None:
+            documents, average_length = self.article_index.corpus_stats()
+            if documents:
+                document_frequency = {keyword: len(self.article_index.match(keyword, content_only=True))
+                                      for keyword in set(keywords)}
+                return documents, average_length, document_frequency
+        
+        documents = len(batch)
+        average_length = sum(length for _, length in batch) / documents if documents else 0
+        document_frequency = {keyword: sum(1 for counts, _ in batch if counts.get(keyword, 0) > 0)
+                              for keyword in set(keywords)}
+        return documents, average_length, document_frequency
+    
+    def score(self, keyword_counts, length, keywords, weights, stats):
+        """
+        计算单篇文章的BM25分数
+        
+        Args:
+            keyword_counts: {关键词: 出现次数}
+            length: 文章长度
+            keywords: 关键词列表
+            weights: 权重列表
+            stats: corpus_stats的返回值
+            
+        Returns:
+            float: 加权BM25分数
+        """
+        documents, average_length, document_frequency = stats
+        if not documents or not average_length:
+            return 0
+        
+        total_score = 0
+        for i, keyword in enumerate(keywords):
+            tf = keyword_counts.get(keyword, 0)
+            if not tf:
+                continue
+            df = min(document_frequency.get(keyword, 0), documents)
+            idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * length / average_length)
+            total_score += weights[i] * idf * tf * (self.k1 + 1) / (tf + norm)
+        return round(total_score, 4)
+
+
+# ============ 核心类：多进程文章分析 ============
+
+# 分析进程内复用的正文提取器和关键词匹配器（由init_analysis_worker在每个进程启动时创建）
+analysis_worker_state = {}
+
+
+def init_analysis_worker(backend, keywords, weights, overlap):
+    """分析进程的初始化函数：每个进程只构建一次解析器和关键词自动机"""
+    analysis_worker_state['extractor'] = ArticleBodyExtractor(backend)
+    analysis_worker_state['matcher'] = KeywordMatcher(keywords, weights, overlap=overlap)
+
+
+def analyze_page_in_worker(item):
+    """
+    在分析进程中提取正文并计算关键词分数
+    
+    Args:
+        item: (url, html)
+        
+    Returns:
+        tuple: (url, 正文提取结果, 关键词计数字典, 总分数)，html为空时正文提取结果为None
+    """
+    url, html = item
+    if not html:
+        return url, None, None, None
+    body = analysis_worker_state['extractor'].extract(html)
+    keyword_counts, total_score = analysis_worker_state['matcher'].score(body['text'])
+    return url, body, keyword_counts, total_score
+
+
+class ArticleAnalysisPool:
+    """
+    多进程文章分析
+    
+    把HTML解析、正文提取和关键词计数分散到多个进程，绕开GIL；
+    输入按块分批提交，同一时间最多只有一块页面在内存中，结果按输入顺序逐个返回
+    """
+    
+    def __init__(self, max_workers=None, chunk_size=32, backend=None):
+        """
+        初始化分析进程池
+        
+        Args:
+            max_workers: 进程数，默认为CPU核数
+            chunk_size: 每个进程一次处理的页面数，每批提交 max_workers * chunk_size 个页面
+            backend: 正文解析器，见ArticleBodyExtractor
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.backend = backend
+    
+    def analyze(self, pages, keywords, weights, overlap='non_overlapping'):
+        """
+        并行分析页面
+        
+        Args:
+            pages: (url, html) 的可迭代对象，可以是边下载边产生的生成器
+            keywords: 关键词列表
+            weights: 权重列表
+            overlap: 关键词重叠计数方式，见KeywordMatcher
+            
+        Yields:
+            tuple: (url, 正文提取结果, 关键词计数字典, 总分数)，顺序与输入一致
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        
+        pages = iter(pages)
+        batch_size = self.max_workers * self.chunk_size
+        # 调用方此时通常还有下载线程和requests会话在运行，fork带线程的进程可能死锁，因此用spawn启动分析进程
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_analysis_worker,
+                                 initargs=(self.backend, keywords, weights, overlap)) as executor:
+            while True:
+                batch = list(itertools.islice(pages, batch_size))
+                if not batch:
                     break
-                    
-                # 更新偏移量，准备获取下一批文章
-                if added_in_batch:
-                    # 如果这批次成功添加了文章，使用常规偏移量增量
-                    offset += batch_size // 2  # 使用一半的批次大小作为增量，提高重叠度
-                else:
-                    # 如果这批次没有添加任何文章，使用较小的增量尝试
-                    offset += 1  # 增加最小偏移量，尝试捕获可能漏掉的文章
+                yield from executor.map(analyze_page_in_worker, batch, chunksize=self.chunk_size)
+
+
+# ============ 核心类：文章内容分析 ============
+
+class ArticleAnalyzer:
+    """文章内容分析类"""
+    
+    def __init__(self, fetcher=None, body_extractor=None, keyword_overlap='non_overlapping', article_index=None,
+                 process_workers=None, process_threshold=200):
+        """
+        初始化分析器
+        
+        Args:
+            fetcher: 批量下载文章页面的AsyncArticleFetcher，默认按默认参数创建
+            body_extractor: ArticleBodyExtractor实例，默认使用已安装的最快解析器
+            keyword_overlap: 关键词重叠计数方式，见KeywordMatcher
+            article_index: ArticleIndex实例，传入后分析过的文章正文会加入本地索引
+            process_workers: 多进程分析的进程数，默认为CPU核数，为0或1时不使用多进程
+            process_threshold: 需要解析的页面数达到该值时才使用多进程分析
+        """
+        self.fetcher = fetcher if fetcher is not None else AsyncArticleFetcher()
+        self.body_extractor = body_extractor if body_extractor is not None else ArticleBodyExtractor()
+        self.keyword_overlap = keyword_overlap
+        self.keyword_matcher = None
+        self.article_index = article_index
+        self.bm25_ranker = BM25Ranker(article_index=article_index)
+        self.process_workers = os.cpu_count() if process_workers is None else process_workers
+        self.process_threshold = process_threshold
+        
+    def fetch_article_content(self, url):
+        """
+        从文章链接获取完整内容
+        
+        Args:
+            url: 文章URL
+            
+        Returns:
+            str: 文章内容文本
+        """
+        return self.fetch_article_body(url)['text']
+    
+    def fetch_article_body(self, url):
+        """
+        从文章链接获取正文提取结果
+        
+        Args:
+            url: 文章URL
+            
+        Returns:
+            dict: {'text', 'word_count', 'images', 'links'}
+        """
+        try:
+            # 本地存储中已有提取结果时直接返回
+            body = self.fetcher.page_cache.get_body(url)
+            if body is not None:
+                return body
+            
+            # 爬取阶段已下载过的页面直接使用缓存
+            html = self.fetcher.page_cache.get(url)
+            if html is None:
+                # 随机延迟，避免请求过于频繁
+                time.sleep(random.uniform(1, 3))
                 
-                # 如果还有更多文章需要获取，添加随机延迟
-                if has_more and collected < count:
-                    delay = random.uniform(5, 10)
-                    print(f"等待 {delay:.2f} 秒后获取下一批文章...")
-                    time.sleep(delay)
-                    
-                attempt += 1
-                    
-            except Exception as e:
-                attempt += 1
-                print(f"获取公众号 '{nickname}' 的文章时出错 (尝试 {attempt}/{max_attempts}): {e}")
-                if attempt < max_attempts:
-                    delay = random.uniform(10, 15)
-                    print(f"等待 {delay:.2f} 秒后重试...")
-                    time.sleep(delay)
-                else:
-                    print(f"已达到最大尝试次数 {max_attempts}，停止获取")
-                    break
+                # 请求文章页面获取内容（与下载引擎共用同一个HTTP客户端）
+                html = self.fetcher.download(url)
+            if html:
+                body = self.extract_article_body(html)
+                self.fetcher.page_cache.put_body(url, body)
+                return body
+            
+            # 如果请求失败
+            print(f"请求文章内容失败: {url}")
+            return self.body_extractor.empty()
+            
+        except Exception as e:
+            print(f"获取文章内容时出错: {e}")
+            return self.body_extractor.empty()
+    
+    def extract_article_content(self, html):
+        """
+        从已下载的文章页面中提取正文文本
         
-        if outdated_found:
-            print(f"提前终止：公众号 '{nickname}' 的文章已超出时间范围，共获取到 {len(articles_info)} 篇符合条件的文章")
+        Args:
+            html: 文章页面HTML
+            
+        Returns:
+            str: 文章内容文本
+        """
+        return self.extract_article_body(html)['text']
+    
+    def extract_article_body(self, html):
+        """
+        从已下载的文章页面中一次性提取正文文本、字数、图片链接和外链
+        
+        Args:
+            html: 文章页面HTML
+            
+        Returns:
+            dict: {'text', 'word_count', 'images', 'links'}
+        """
+        return self.body_extractor.extract(html)
+    
+    def calculate_keyword_score(self, text, keywords, weights):
+        """
+        计算文本中关键词得分
+        
+        Args:
+            text: 文本内容
+            keywords: 关键词列表
+            weights: 权重列表，与关键词一一对应
+            
+        Returns:
+            tuple: (关键词计数字典, 总分数)
+        """
+        # 确保关键词和权重长度一致
+        if len(keywords) != len(weights):
+            print("关键词和权重数量不匹配")
+            return {}, 0
+        
+        # 关键词不变时复用已构建的自动机，所有关键词只扫描一遍文本 (不区分大小写)
+        return self.get_keyword_matcher(keywords, weights).score(text)
+    
+    def get_keyword_matcher(self, keywords, weights):
+        """获取与当前关键词、权重和重叠方式对应的KeywordMatcher"""
+        matcher = self.keyword_matcher
+        if (matcher is None or matcher.keywords != list(keywords) or matcher.weights != list(weights)
+                or matcher.overlap != self.keyword_overlap):
+            matcher = KeywordMatcher(keywords, weights, overlap=self.keyword_overlap)
+            self.keyword_matcher = matcher
+        return matcher
+    
+    def score_article(self, article, body, keywords, weights, scored=None):
+        """
+        计算单篇文章的关键词分数，并把正文提取结果写入文章信息
+        
+        Args:
+            article: 文章信息字典
+            body: 正文提取结果 {'text', 'word_count', 'images', 'links'}
+            keywords: 关键词列表
+            weights: 权重列表
+            scored: 已在分析进程中算好的 (关键词计数字典, 总分数)
+        """
+        content = body['text']
+        article['content_length'] = len(content)
+        article['word_count'] = body['word_count']
+        article['image_urls'] = body['images']
+        article['outbound_links'] = body['links']
+        
+        # 计算关键词分数
+        if scored is not None:
+            keyword_counts, total_score = scored
+        else:
+            keyword_counts, total_score = self.calculate_keyword_score(content, keywords, weights)
+        
+        # 保存到文章信息
+        article['keyword_counts'] = str(keyword_counts)  # 转为字符串以便保存到Excel
+        article['keyword_score'] = total_score
+        
+        # 打印分数
+        print(f"- 关键词统计: {keyword_counts}")
+        print(f"- 总分数: {total_score}")
+        
+        return keyword_counts, total_score
+    
+    def analyze_articles_with_keywords(self, articles, keywords, weights, ranking='count'):
+        """
+        分析文章列表中的关键词
+        
+        Args:
+            articles: 文章信息列表
+            keywords: 关键词列表
+            weights: 权重列表
+            ranking: 排序方式，'count' 为关键词次数×权重之和，'bm25' 为BM25相关性分数
+            
+        Returns:
+            list: 分析后的文章列表 (添加了keyword_counts和keyword_score字段)
+        """
+        if ranking not in ('count', 'bm25'):
+            raise ValueError(f"ranking 必须是 'count' 或 'bm25'，当前为 {ranking}")
+        
+        # 如果权重列表不够长，用1补齐；多余的权重忽略
+        weights = list(weights[:len(keywords)]) + [1] * max(0, len(keywords) - len(weights))
+            
+        print(f"开始分析 {len(articles)} 篇文章中的关键词: {keywords}")
+        print(f"关键词权重: {weights}")
+        print(f"排序方式: {'BM25' if ranking == 'bm25' else '次数×权重'}")
+        
+        # BM25需要的每篇文章的关键词次数和长度
+        bm25_inputs = {}  # id(article) -> (关键词计数字典, 文章长度)
+        
+        # 同一链接可能对应多条记录，下载一次后共用
+        articles_by_link = {}
+        for article in articles:
+            articles_by_link.setdefault(article.get('link', ''), []).append(article)
+        
+        # 链接无效的文章没有内容
+        for link, link_articles in articles_by_link.items():
+            if not link.startswith('http'):
+                for article in link_articles:
+                    keyword_counts, _ = self.score_article(article, self.body_extractor.empty(), keywords, weights)
+                    bm25_inputs[id(article)] = (keyword_counts, 0)
+        
+        def score_link(url, body, scored=None):
+            nonlocal processed
+            for article in articles_by_link[url]:
+                processed += 1
+                print(f"[{processed}/{len(articles)}] 处理文章: {article['title']}")
+                keyword_counts, _ = self.score_article(article, body, keywords, weights, scored)
+                if ranking == 'bm25':
+                    bm25_inputs[id(article)] = (keyword_counts, BM25Ranker.document_length(article.get('title'), body['text']))
+            
+            # 成功获取正文的文章加入本地索引
+            if self.article_index is not None and body['text']:
+                self.article_index.add_article(articles_by_link[url][0], body['text'])
+        
+        # 本地存储中已有正文的文章直接分析，不再下载和解析
+        processed = 0
+        urls = []
+        for link in articles_by_link:
+            if not link.startswith('http'):
+                continue
+            body = self.fetcher.page_cache.get_body(link)
+            if body is None:
+                urls.append(link)
+            else:
+                score_link(link, body)
+        
+        # 并发下载其余文章页面，哪篇先下载完就先分析哪篇
+        pages = self.fetcher.fetch_many(urls)
+        if self.process_workers > 1 and len(urls) >= self.process_threshold:
+            # 页面较多时把解析和计分交给多进程，主线程只负责下载、记录结果和写入缓存
+            print(f"需要解析 {len(urls)} 篇文章，使用 {self.process_workers} 个进程并行分析")
+            analysis_pool = ArticleAnalysisPool(max_workers=self.process_workers, backend=self.body_extractor.backend)
+            for url, body, keyword_counts, total_score in analysis_pool.analyze(
+                    pages, keywords, weights, overlap=self.keyword_overlap):
+                if body is None:
+                    score_link(url, self.body_extractor.empty())
+                    continue
+                self.fetcher.page_cache.put_body(url, body)
+                score_link(url, body, (keyword_counts, total_score))
+        else:
+            for url, html in pages:
+                body = self.body_extractor.empty()
+                if html:
+                    body = self.extract_article_body(html)
+                    self.fetcher.page_cache.put_body(url, body)
+                score_link(url, body)
+        
+        # BM25模式：这批文章都已加入索引后，用语料统计重新计算keyword_score
+        if ranking == 'bm25':
+            stats = self.bm25_ranker.corpus_stats(keywords, list(bm25_inputs.values()))
+            for article in articles:
+                keyword_counts, length = bm25_inputs.get(id(article), ({}, 0))
+                article['keyword_score'] = self.bm25_ranker.score(keyword_counts, length, keywords, weights, stats)
+        
+        # 根据关键词得分排序文章
+        sorted_articles = sorted(articles, key=lambda x: x.get('keyword_score', 0), reverse=True)
+        
+        print(f"===== 完成关键词分析，按分数排序 =====")
+        for i, article in enumerate(sorted_articles[:10]):  # 打印前10篇
+            if i < len(sorted_articles):
+                print(f"{i+1}. {article['title']} - 分数: {article.get('keyword_score', 0)}")
+        
+        return sorted_articles
+
+
+# ============ 核心类：文章结果实时保存 ============
+
+class ArticleSink(abc.ABC):
+    """
+    文章输出的基类：文章逐条（或逐批）写入，不需要先把全部结果放进一个列表
+    
+    子类实现write和close；支持with语句，退出时自动关闭
+    """
+    
+    @abc.abstractmethod
+    def write(self, article):
+        """写入一篇文章"""
+    
+    def write_many(self, articles):
+        """逐条写入多篇文章（可以是生成器）"""
+        for article in articles:
+            self.write(article)
+    
+    @abc.abstractmethod
+    def close(self):
+        """写完缓冲的内容并关闭文件（可以重复调用）"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def article_columns(article, excluded=()):
+    """nickname, title, link, publish_time, publish_date 在前，其余字段按出现顺序排在后面"""
+    preferred_columns = ['nickname', 'title', 'link', 'publish_time', 'publish_date']
+    columns = [col for col in preferred_columns if col in article]
+    columns += [col for col in article if col not in preferred_columns and col not in excluded]
+    return columns
+
+
+class JsonlArticleSink(ArticleSink):
+    """
+    逐条追加保存文章的JSON Lines文件
+    
+    每得到一篇文章就写入一行并刷新到磁盘，程序中途崩溃或凭证被封时已爬取的结果不会丢失；
+    最终的Excel报表从该文件生成
+    """
+    
+    def __init__(self, output_file, append=False, fsync=False):
+        """
+        初始化输出文件
+        
+        Args:
+            output_file: JSON Lines文件路径
+            append: 是否追加到已有文件，默认清空后重新写入
+            fsync: 是否每条记录都调用fsync（断电也不丢数据，但写入更慢）
+        """
+        self.output_file = output_file
+        self.fsync = fsync
+        self.count = 0
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(output_file, 'a' if append else 'w', encoding='utf-8')
+    
+    def write(self, article):
+        """写入一篇文章并立即刷新到磁盘"""
+        self.file.write(json.dumps(article, ensure_ascii=False, default=str) + '\n')
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.count += 1
+    
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+    
+    @staticmethod
+    def read(output_file):
+        """
+        读取JSON Lines文件中的全部文章（跳过中途崩溃时写了一半的最后一行）
+        
+        Returns:
+            list: 文章信息列表
+        """
+        articles = []
+        if not os.path.exists(output_file):
+            return articles
+        with open(output_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    articles.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"跳过 {output_file} 中不完整的记录")
+        return articles
+
+
+class ExcelArticleSink(ArticleSink):
+    """
+    逐行写入的Excel文件（xlsxwriter的constant_memory模式，未安装时使用openpyxl的write_only模式）
+    
+    行写出后不再保留在内存中，大批量导出也不需要先构建DataFrame。
+    布局与原来的Excel报表一致：有统计信息时首行为统计信息，文章表头从第4行开始
+    """
+    
+    SHEET_NAME = '文章信息'
+    
+    def __init__(self, output_file, stats_message=None, columns=None, excluded_columns=None):
+        """
+        初始化Excel文件
+        
+        Args:
+            output_file: 输出文件名
+            stats_message: 统计信息，写在表格首行
+            columns: 列名列表，默认由第一篇文章的字段决定（之后文章多出的字段不写入）
+            excluded_columns: 不写入Excel的字段，默认为EXCEL_EXCLUDED_COLUMNS
+        """
+        self.output_file = output_file
+        self.columns = columns
+        self.excluded_columns = EXCEL_EXCLUDED_COLUMNS if excluded_columns is None else excluded_columns
+        self.count = 0
+        self.row = 0
+        
+        self.xlsxwriter = import_optional('xlsxwriter')
+        if self.xlsxwriter is not None:
+            self.workbook = self.xlsxwriter.Workbook(output_file, {'constant_memory': True})
+            self.sheet = self.workbook.add_worksheet(self.SHEET_NAME)
+            self.bold = self.workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+        else:
+            import openpyxl
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+            self.write_only_cell = WriteOnlyCell
+            self.workbook = openpyxl.Workbook(write_only=True)
+            self.sheet = self.workbook.create_sheet(self.SHEET_NAME)
+            self.bold = Font(bold=True)
+        
+        if stats_message is not None:
+            self.append_row(['统计信息'], header=True)
+            self.append_row([stats_message])
+            self.append_row([])
+        
+        if self.columns is not None:
+            self.append_row(self.columns, header=True)
+    
+    @staticmethod
+    def cell_value(value):
+        """列表、字典等非标量值转为字符串"""
+        if value is None or isinstance(value, (str, int, float)):
+            return value
+        return str(value)
+    
+    def append_row(self, values, header=False):
+        if self.xlsxwriter is not None:
+            self.sheet.write_row(self.row, 0, values, self.bold if header else None)
+        elif header:
+            cells = []
+            for value in values:
+                cell = self.write_only_cell(self.sheet, value=value)
+                cell.font = self.bold
+                cells.append(cell)
+            self.sheet.append(cells)
+        else:
+            self.sheet.append(values)
+        self.row += 1
+    
+    def write(self, article):
+        if self.columns is None:
+            self.columns = article_columns(article, self.excluded_columns)
+            self.append_row(self.columns, header=True)
+        self.append_row([self.cell_value(article.get(col)) for col in self.columns])
+        self.count += 1
+    
+    def close(self):
+        if self.workbook is None:
+            return
+        if self.xlsxwriter is not None:
+            self.workbook.close()
         else:
-            print(f"共获取到公众号 '{nickname}' 的 {len(articles_info)} 篇文章")
+            self.workbook.save(self.output_file)
+        self.workbook = None
+
+
+class ParquetArticleSink(ArticleSink):
+    """
+    Parquet文件输出（需要安装pyarrow）
+    
+    文章攒够batch_size篇写入一个row group，不需要把全部结果放在内存中；
+    下游可以直接按列读取，不必再用pandas解析Excel
+    """
+    
+    # 已知字段的类型，其余字段按字符串保存
+    FIELD_TYPES = {
+        'content_length': 'int64',
+        'word_count': 'int64',
+        'keyword_score': 'float64',
+        'image_urls': 'list',
+        'outbound_links': 'list',
+    }
+    
+    def __init__(self, output_file, batch_size=1000, columns=None, stats_message=None):
+        """
+        初始化Parquet文件
+        
+        Args:
+            output_file: 输出文件名
+            batch_size: 每个row group的文章数
+            columns: 列名列表，默认由第一篇文章的字段决定（之后文章多出的字段不写入）
+            stats_message: 统计信息，保存在文件的元数据中
+        """
+        self.pyarrow = import_optional('pyarrow')
+        self.pyarrow_parquet = import_optional('pyarrow.parquet')
+        if self.pyarrow is None or self.pyarrow_parquet is None:
+            raise RuntimeError("输出Parquet文件需要安装pyarrow: pip install pyarrow")
+        self.output_file = output_file
+        self.batch_size = batch_size
+        self.columns = columns
+        self.stats_message = stats_message
+        self.batch = []
+        self.writer = None
+        self.schema = None
+        self.count = 0
+    
+    def field_type(self, column):
+        pyarrow = self.pyarrow
+        field_type = self.FIELD_TYPES.get(column)
+        if field_type == 'int64':
+            return pyarrow.int64()
+        if field_type == 'float64':
+            return pyarrow.float64()
+        if field_type == 'list':
+            return pyarrow.list_(pyarrow.string())
+        return pyarrow.string()
+    
+    def convert(self, column, value):
+        """把字段值转为列类型对应的值"""
+        if value is None:
+            return None
+        field_type = self.FIELD_TYPES.get(column)
+        if field_type == 'int64':
+            return int(value)
+        if field_type == 'float64':
+            return float(value)
+        if field_type == 'list':
+            return [str(item) for item in value]
+        return value if isinstance(value, str) else str(value)
+    
+    def write(self, article):
+        if self.columns is None:
+            self.columns = article_columns(article)
+        self.batch.append(article)
+        self.count += 1
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """把缓冲的文章写成一个row group"""
+        if not self.batch:
+            return
+        if self.writer is None:
+            metadata = {'stats_message': self.stats_message} if self.stats_message else None
+            self.schema = self.pyarrow.schema([(col, self.field_type(col)) for col in self.columns], metadata=metadata)
+            self.writer = self.pyarrow_parquet.ParquetWriter(self.output_file, self.schema)
+        data = {col: [self.convert(col, article.get(col)) for article in self.batch] for col in self.columns}
+        self.writer.write_table(self.pyarrow.Table.from_pydict(data, schema=self.schema))
+        self.batch = []
+    
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def open_article_sink(output_file, stats_message=None):
+    """
+    按文件扩展名选择输出格式
+    
+    Args:
+        output_file: 输出文件名，.jsonl 为JSON Lines，.parquet 为Parquet，其余为Excel
+        stats_message: 统计信息（Excel写在首行，Parquet保存在元数据中，JSON Lines不保存）
+        
+    Returns:
+        ArticleSink: 输出对象
+    """
+    extension = os.path.splitext(output_file)[1].lower()
+    if extension == '.jsonl':
+        return JsonlArticleSink(output_file)
+    if extension == '.parquet':
+        return ParquetArticleSink(output_file, stats_message=stats_message)
+    return ExcelArticleSink(output_file, stats_message=stats_message)
+
+
+# ============ 核心类：文章数据库 ============
+
+class ArticleDatabase:
+    """
+    文章数据库（SQLite），保存公众号、文章和关键词分析结果
+    
+    文章以规范化标识（canonical_article_key）为唯一键，重复爬到的文章只更新信息；
+    按天、跨公众号的查询都是一次带索引的SELECT，Excel只是从数据库导出的报表
+    """
+    
+    def __init__(self, database_file="wechat_articles.db", batch_size=100):
+        """
+        初始化数据库
+        
+        Args:
+            database_file: 数据库文件路径
+            batch_size: write()缓冲多少篇文章后批量写入一次
+        """
+        self.database_file = database_file
+        self.batch_size = batch_size
+        self.pending = []  # write()缓冲的 (文章, 运行编号)
+        self.lock = threading.RLock()
+        import sqlite3
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    nickname TEXT PRIMARY KEY,
+                    fakeid TEXT,
+                    first_seen_at TEXT,
+                    last_crawled_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS crawl_runs (
+                    run_id INTEGER PRIMARY KEY,
+                    mode TEXT,
+                    params TEXT,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    article_count INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS articles (
+                    article_key TEXT PRIMARY KEY,
+                    biz TEXT,
+                    mid TEXT,
+                    idx TEXT,
+                    nickname TEXT,
+                    title TEXT,
+                    link TEXT,
+                    publish_time TEXT,
+                    publish_date TEXT,
+                    content_length INTEGER,
+                    word_count INTEGER,
+                    first_seen_at TEXT,
+                    last_seen_at TEXT,
+                    last_run_id INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_articles_nickname_date ON articles (nickname, publish_date);
+                CREATE INDEX IF NOT EXISTS idx_articles_first_seen ON articles (first_seen_at);
+                CREATE INDEX IF NOT EXISTS idx_articles_run ON articles (last_run_id);
+                CREATE TABLE IF NOT EXISTS analysis_results (
+                    article_key TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    ranking TEXT NOT NULL,
+                    keyword_counts TEXT,
+                    keyword_score REAL,
+                    analyzed_at TEXT,
+                    PRIMARY KEY (article_key, query, ranking)
+                ) WITHOUT ROWID;
+            """)
+    
+    @staticmethod
+    def now():
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    @staticmethod
+    def analysis_query(keywords, weights):
+        """关键词和权重组成的分析条件标识"""
+        return json.dumps([[keyword, weight] for keyword, weight in zip(keywords, weights)], ensure_ascii=False)
+    
+    def start_run(self, mode, params=None):
+        """
+        记录一次爬取运行
+        
+        Args:
+            mode: 运行类型，如 'multiple'、'history'
+            params: 运行参数
+            
+        Returns:
+            int: 运行编号，写入文章时传入，导出时用来选出本次运行的文章
+        """
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO crawl_runs (mode, params, started_at) VALUES (?, ?, ?)",
+                (mode, json.dumps(params or {}, ensure_ascii=False, default=str), self.now())
+            )
+            return cursor.lastrowid
+    
+    def finish_run(self, run_id):
+        """记录运行结束时间和本次运行涉及的文章数"""
+        self.flush()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE crawl_runs SET finished_at = ?, "
+                "article_count = (SELECT COUNT(*) FROM articles WHERE last_run_id = ?) WHERE run_id = ?",
+                (self.now(), run_id, run_id)
+            )
+    
+    def update_accounts(self, nicknames, fakeid_cache=None):
+        """
+        记录公众号及其最近爬取时间
+        
+        Args:
+            nicknames: 公众号名称列表
+            fakeid_cache: FakeidCache实例，用于同时保存fakeid
+        """
+        now = self.now()
+        rows = [(nickname, fakeid_cache.get(nickname) if fakeid_cache else None, now, now) for nickname in nicknames]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO accounts (nickname, fakeid, first_seen_at, last_crawled_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(nickname) DO UPDATE SET fakeid = COALESCE(excluded.fakeid, fakeid), "
+                "last_crawled_at = excluded.last_crawled_at",
+                rows
+            )
+    
+    def write(self, article, run_id=None):
+        """缓冲一篇文章，攒够batch_size篇后批量写入"""
+        with self.lock:
+            self.pending.append((article, run_id))
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+    
+    def flush(self):
+        """写入write()缓冲的文章"""
+        with self.lock:
+            pending, self.pending = self.pending, []
+            by_run = {}
+            for article, run_id in pending:
+                by_run.setdefault(run_id, []).append(article)
+            for run_id, articles in by_run.items():
+                self.upsert_articles(articles, run_id)
+    
+    def upsert_articles(self, articles, run_id=None):
+        """
+        批量写入文章（一个事务），已存在的文章只更新信息，首次发现时间保持不变
+        
+        Args:
+            articles: 文章信息列表
+            run_id: 运行编号
             
-        return articles_info
+        Returns:
+            int: 写入的文章数
+        """
+        now = self.now()
+        rows = []
+        for article in articles:
+            link = article.get('link') or ''
+            if not link:
+                continue
+            identity = parse_article_identity(link) or {}
+            rows.append((
+                canonical_article_key(link), identity.get('biz'), identity.get('mid'), identity.get('idx'),
+                article.get('nickname'), article.get('title'), link,
+                article.get('publish_time'), article.get('publish_date'),
+                article.get('content_length'), article.get('word_count'),
+                now, now, run_id
+            ))
+        
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO articles (article_key, biz, mid, idx, nickname, title, link, publish_time, publish_date, "
+                "content_length, word_count, first_seen_at, last_seen_at, last_run_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(article_key) DO UPDATE SET "
+                "nickname = COALESCE(excluded.nickname, nickname), title = COALESCE(excluded.title, title), "
+                "link = excluded.link, publish_time = COALESCE(excluded.publish_time, publish_time), "
+                "publish_date = COALESCE(excluded.publish_date, publish_date), "
+                "content_length = COALESCE(excluded.content_length, content_length), "
+                "word_count = COALESCE(excluded.word_count, word_count), "
+                "last_seen_at = excluded.last_seen_at, last_run_id = COALESCE(excluded.last_run_id, last_run_id)",
+                rows
+            )
+        return len(rows)
+    
+    def save_analysis(self, articles, keywords, weights, ranking='count', run_id=None):
+        """
+        保存关键词分析结果（同时更新文章的字数等信息）
+        
+        Args:
+            articles: 分析后的文章列表（包含keyword_counts和keyword_score）
+            keywords: 关键词列表
+            weights: 权重列表
+            ranking: 排序方式
+            run_id: 运行编号
+        """
+        self.upsert_articles(articles, run_id)
+        query = self.analysis_query(keywords, weights)
+        now = self.now()
+        rows = [(canonical_article_key(article['link']), query, ranking,
+                 article.get('keyword_counts'), article.get('keyword_score'), now)
+                for article in articles if article.get('link')]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO analysis_results (article_key, query, ranking, keyword_counts, keyword_score, analyzed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(article_key, query, ranking) DO UPDATE SET keyword_counts = excluded.keyword_counts, "
+                "keyword_score = excluded.keyword_score, analyzed_at = excluded.analyzed_at",
+                rows
+            )
     
-    def fetch_wechat_articles(self, nickname_list, articles_per_account=10, days=2):
+    def get_articles(self, run_id=None, nicknames=None, start_date=None, end_date=None, analysis=None, limit=None):
         """
-        爬取多个公众号的文章
+        查询文章
         
         Args:
-            nickname_list: 公众号名称列表
-            articles_per_account: 每个公众号获取的文章数量(最大值)
-            days: 获取最近几天的文章 (默认为2，即今天和昨天)
+            run_id: 只返回该次运行爬到的文章
+            nicknames: 公众号名称或名称列表；结果按列表顺序分组
+            start_date: 发布日期下限（含），格式 YYYY-MM-DD
+            end_date: 发布日期上限（含）
+            analysis: (关键词列表, 权重列表, 排序方式)，给出时附带字数和分析结果，并按分数从高到低排序
+            limit: 最多返回的文章数量
             
         Returns:
-            tuple: (文章信息列表 [{nickname, title, link, publish_time}, ...], 统计信息)
+            list: 文章信息列表，默认按发布时间从新到旧排序
         """
-        if not self.web:
-            print("Web连接未初始化，请先设置有效凭证")
-            return [], {}
-            
-        # 获取当前日期和昨天日期
-        today = datetime.now().date()
-        date_range = [today - timedelta(days=i) for i in range(days)]
-        
-        print(f"当前日期: {today}，将抓取最近 {days} 天发布的文章")
-        
-        # 存储所有文章信息的列表
-        all_articles_info = []
-        
-        # 统计信息
-        total_accounts = len(nickname_list)
-        accounts_updated_recently = 0
-        accounts_not_updated = 0
+        return list(self.iter_articles(run_id=run_id, nicknames=nicknames, start_date=start_date, end_date=end_date,
+                                       analysis=analysis, limit=limit))
+    
+    def iter_articles(self, run_id=None, nicknames=None, start_date=None, end_date=None, analysis=None, limit=None,
+                      fetch_size=1000):
+        """
+        逐条读取查询到的文章（参数同get_articles），用单独的只读连接分批读取，
+        导出大量文章时不需要全部放在内存中，也不会阻塞爬取线程的写入
         
-        # 定义时间过滤函数：只保留最近days天的文章
-        def recent_days_filter(article_date):
-            return article_date in date_range
+        Yields:
+            dict: 文章信息
+        """
+        columns = "a.nickname, a.title, a.link, a.publish_time, a.publish_date"
+        joins = ""
+        conditions = []
+        params = []
+        order = "a.publish_time DESC"
         
-        for i, nickname in enumerate(nickname_list):
-            print(f"\n正在获取公众号 '{nickname}' 的文章 ({i+1}/{total_accounts})...")
-            
-            # 获取该公众号的文章（使用时间过滤）
-            # 启用stop_on_outdated，一旦发现过期文章就停止爬取当前公众号
-            account_articles = self.fetch_articles_from_account(
-                nickname=nickname,
-                count=articles_per_account,
-                time_filter_func=recent_days_filter,
-                stop_on_outdated=True  # 添加这个参数，一旦发现过期文章就停止
-            )
-            
-            # 添加文章到总列表
-            all_articles_info.extend(account_articles)
-            
-            # 更新统计信息
-            if account_articles:
-                accounts_updated_recently += 1
-                print(f"公众号 '{nickname}' 最近 {days} 天有更新，找到 {len(account_articles)} 篇文章")
-            else:
-                accounts_not_updated += 1
-                print(f"公众号 '{nickname}' 最近 {days} 天无更新")
-            
-            # 在每个公众号处理后添加额外的随机延迟
-            if i < len(nickname_list) - 1:  # 如果不是最后一个公众号
-                extra_delay = random.uniform(8, 15)
-                print(f"处理下一个公众号前等待 {extra_delay:.2f} 秒...")
-                time.sleep(extra_delay)
+        if analysis is not None:
+            keywords, weights, ranking = analysis
+            columns += ", a.content_length, a.word_count, r.keyword_counts, r.keyword_score"
+            joins = "JOIN analysis_results r ON r.article_key = a.article_key AND r.query = ? AND r.ranking = ?"
+            params.extend([self.analysis_query(keywords, weights), ranking])
+            order = "r.keyword_score DESC"
+        if isinstance(nicknames, str):
+            nicknames = [nicknames]
+        if nicknames:
+            conditions.append(f"a.nickname IN ({', '.join('?' * len(nicknames))})")
+            params.extend(nicknames)
+        if run_id is not None:
+            conditions.append("a.last_run_id = ?")
+            params.append(run_id)
+        if start_date:
+            conditions.append("a.publish_date >= ?")
+            params.append(str(start_date))
+        if end_date:
+            conditions.append("a.publish_date <= ?")
+            params.append(str(end_date))
+        if nicknames and len(nicknames) > 1:
+            # 按公众号列表顺序分组
+            order = f"CASE a.nickname {' '.join(['WHEN ? THEN ?'] * len(nicknames))} END, {order}"
+            for i, nickname in enumerate(nicknames):
+                params.extend([nickname, i])
         
-        # 准备统计信息
-        stats = {
-            'total_accounts': total_accounts,
-            'accounts_updated_recently': accounts_updated_recently,
-            'accounts_not_updated': accounts_not_updated,
-            'date': today.strftime('%Y-%m-%d')
-        }
+        sql = (f"SELECT {columns} FROM articles a {joins} "
+               f"{'WHERE ' + ' AND '.join(conditions) if conditions else ''} ORDER BY {order}")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
         
-        return all_articles_info, stats
+        self.flush()
+        import sqlite3
+        connection = sqlite3.connect(self.database_file)
+        try:
+            cursor = connection.execute(sql, params)
+            names = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(names, row))
+        finally:
+            connection.close()
     
-    def fetch_account_history(self, nickname, max_articles=100):
+    def titles_first_seen_on(self, date):
         """
-        爬取单个公众号的历史文章（最多max_articles篇）
+        指定日期首次爬到的文章标题
         
         Args:
-            nickname: 公众号名称
-            max_articles: 最大爬取文章数量，默认100
+            date: 日期（date对象或 YYYY-MM-DD 字符串）
             
         Returns:
-            list: 文章信息列表 [{nickname, title, link, publish_time, publish_date}, ...]
+            set: 文章标题集合
         """
-        if not self.web:
-            print("Web连接未初始化，请先设置有效凭证")
-            return []
-            
-        print(f"===== 开始爬取公众号 '{nickname}' 的历史文章 =====")
-        
-        # 获取该公众号的文章（不使用时间过滤）
-        articles = self.fetch_articles_from_account(
-            nickname=nickname,
-            count=max_articles
-        )
-        
-        print(f"===== 完成爬取公众号 '{nickname}' 的历史文章，共获取 {len(articles)} 篇 =====")
-        return articles
-
-
-# ============ 核心类：文章内容分析 ============
-
-class ArticleAnalyzer:
-    """文章内容分析类"""
+        day = str(date)
+        next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT title FROM articles WHERE first_seen_at >= ? AND first_seen_at < ? AND title IS NOT NULL",
+                (day, next_day)
+            ).fetchall()
+        return {row[0] for row in rows}
     
-    def __init__(self):
-        """初始化分析器"""
-        pass
-        
-    def fetch_article_content(self, url):
+    def export(self, output_file, stats_message=None, **query):
         """
-        从文章链接获取完整内容
+        把查询到的文章逐条导出到文件，格式由扩展名决定（.xlsx / .parquet / .jsonl，见open_article_sink）
         
         Args:
-            url: 文章URL
+            output_file: 输出文件名
+            stats_message: 统计信息
+            **query: 传给iter_articles的查询条件
             
         Returns:
-            str: 文章内容文本
+            int: 导出的文章数
         """
-        try:
-            # 设置请求头，模拟浏览器访问
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                'Connection': 'keep-alive'
-            }
-            
-            # 随机延迟，避免请求过于频繁
-            time.sleep(random.uniform(1, 3))
-            
-            # 请求文章页面获取内容
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                # 使用BeautifulSoup解析HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 提取文章内容 - 微信文章通常在rich_media_content中
-                content_element = soup.select_one('#js_content') or soup.select_one('.rich_media_content')
-                if content_element:
-                    # 获取所有文本，清理空白字符
-                    content_text = content_element.get_text(strip=True)
-                    return content_text
-                
-                # 如果找不到特定元素，尝试获取整个页面文本
-                return soup.get_text(strip=True)
-            
-            # 如果请求失败
-            print(f"请求文章内容失败，状态码: {response.status_code}")
-            return ""
-            
-        except Exception as e:
-            print(f"获取文章内容时出错: {e}")
-            return ""
+        with open_article_sink(output_file, stats_message=stats_message) as sink:
+            sink.write_many(self.iter_articles(**query))
+        print(f"已从数据库导出 {sink.count} 篇文章到 {output_file}")
+        return sink.count
     
-    def calculate_keyword_score(self, text, keywords, weights):
+    def export_to_excel(self, output_file, stats=None, filter_existing=True, stats_message=None, **query):
         """
-        计算文本中关键词得分
+        把查询到的文章导出为Excel报表
         
         Args:
-            text: 文本内容
-            keywords: 关键词列表
-            weights: 权重列表，与关键词一一对应
+            output_file: 输出文件名
+            stats: 统计信息，写在报表首行
+            filter_existing: 是否过滤昨天已爬到的文章
+            stats_message: 自定义统计信息
+            **query: 传给get_articles的查询条件
             
         Returns:
-            tuple: (关键词计数字典, 总分数)
+            list: 导出的文章列表（过滤前）
         """
-        # 确保关键词和权重长度一致
-        if len(keywords) != len(weights):
-            print("关键词和权重数量不匹配")
-            return {}, 0
+        articles = self.get_articles(**query)
+        save_articles_to_excel(articles, stats, output_file, filter_existing=filter_existing,
+                               stats_message=stats_message, database=self)
+        return articles
+    
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.connection.close()
+
+
+# ============ 核心类：文章去重索引 ============
+
+def article_dedup_key(url):
+    """
+    文章去重标识：__biz + mid + idx（不含sn等会变化的参数）
+    
+    Args:
+        url: 文章URL
         
-        # 统计每个关键词出现次数
-        keyword_counts = {}
-        total_score = 0
+    Returns:
+        str: "biz/mid/idx"，短链接为去掉查询参数后的地址
+    """
+    identity = parse_article_identity(url)
+    if identity:
+        return f"{identity['biz']}/{identity['mid']}/{identity['idx']}"
+    return canonical_article_key(url)
+
+
+class ArticleDedupIndex:
+    """
+    已爬取文章的去重索引
+    
+    按文章身份（__biz/mid/idx）记录每篇文章首次爬到的日期，只保留最近retention_days天的记录；
+    启动时载入内存，爬取过程中每篇文章O(1)判断是否已经爬取过，已爬过的文章不再请求文章页面。
+    按链接身份去重，不同公众号的同名文章不会被误判为重复
+    """
+    
+    def __init__(self, index_file="seen_articles.db", retention_days=30):
+        """
+        初始化去重索引
         
-        for i, keyword in enumerate(keywords):
-            # 统计关键词出现次数 (不区分大小写)
-            count = text.lower().count(keyword.lower())
-            keyword_counts[keyword] = count
-            
-            # 计算加权分数
-            score = count * weights[i]
-            total_score += score
+        Args:
+            index_file: 索引数据库文件路径
+            retention_days: 记录保留天数，更早爬到的文章不再视为重复
+        """
+        self.index_file = index_file
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.skipped = {}  # 公众号 -> 因已爬取过而跳过的文章数
+        import sqlite3
+        self.connection = sqlite3.connect(index_file, check_same_thread=False)
         
-        return keyword_counts, total_score
+        cutoff = (datetime.now().date() - timedelta(days=retention_days)).strftime('%Y-%m-%d')
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS seen_articles (
+                    dedup_key TEXT PRIMARY KEY,
+                    nickname TEXT,
+                    first_seen_date TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self.connection.execute("DELETE FROM seen_articles WHERE first_seen_date < ?", (cutoff,))
+            self.seen = dict(self.connection.execute("SELECT dedup_key, first_seen_date FROM seen_articles").fetchall())
+        print(f"去重索引中有最近 {retention_days} 天爬取过的 {len(self.seen)} 篇文章")
     
-    def analyze_articles_with_keywords(self, articles, keywords, weights):
+    def seen_before_today(self, url):
         """
-        分析文章列表中的关键词
+        文章是否在今天之前已经爬取过（今天重复运行时，今天爬到的文章仍会出现在结果中）
         
         Args:
-            articles: 文章信息列表
-            keywords: 关键词列表
-            weights: 权重列表
+            url: 文章URL
             
         Returns:
-            list: 分析后的文章列表 (添加了keyword_counts和keyword_score字段)
+            bool: 是否已爬取过
         """
-        # 限制关键词数量
-        if len(keywords) > 3:
-            print("关键词数量超过限制，只使用前3个关键词")
-            keywords = keywords[:3]
-            weights = weights[:3]
-        
-        # 如果权重列表不够长，用1补齐
-        while len(weights) < len(keywords):
-            weights.append(1)
-            
-        print(f"开始分析 {len(articles)} 篇文章中的关键词: {keywords}")
-        print(f"关键词权重: {weights}")
-        
-        # 为每篇文章获取内容并计算关键词分数
-        for i, article in enumerate(articles):
-            print(f"[{i+1}/{len(articles)}] 处理文章: {article['title']}")
-            
-            # 获取文章内容
-            content = self.fetch_article_content(article['link'])
-            article['content_length'] = len(content)
-            
-            # 计算关键词分数
-            keyword_counts, total_score = self.calculate_keyword_score(content, keywords, weights)
-            
-            # 保存到文章信息
-            article['keyword_counts'] = str(keyword_counts)  # 转为字符串以便保存到Excel
-            article['keyword_score'] = total_score
-            
-            # 打印分数
-            print(f"- 关键词统计: {keyword_counts}")
-            print(f"- 总分数: {total_score}")
-            
-            # 添加随机延迟，避免请求过于频繁
-            if i < len(articles) - 1:  # 如果不是最后一篇文章
-                delay = random.uniform(2, 5)
-                print(f"等待 {delay:.2f} 秒后处理下一篇文章...")
-                time.sleep(delay)
-        
-        # 根据关键词得分排序文章
-        sorted_articles = sorted(articles, key=lambda x: x.get('keyword_score', 0), reverse=True)
-        
-        print(f"===== 完成关键词分析，按分数排序 =====")
-        for i, article in enumerate(sorted_articles[:10]):  # 打印前10篇
-            if i < len(sorted_articles):
-                print(f"{i+1}. {article['title']} - 分数: {article.get('keyword_score', 0)}")
+        first_seen_date = self.seen.get(article_dedup_key(url))
+        return first_seen_date is not None and first_seen_date < datetime.now().strftime('%Y-%m-%d')
+    
+    def record_skip(self, nickname):
+        """记录一篇因已爬取过而跳过的文章"""
+        with self.lock:
+            self.skipped[nickname] = self.skipped.get(nickname, 0) + 1
+    
+    def add(self, url, nickname=None):
+        """
+        记录爬取到的文章（已记录的文章保持首次爬取日期不变）
         
-        return sorted_articles
+        Args:
+            url: 文章URL
+            nickname: 公众号名称
+        """
+        key = article_dedup_key(url)
+        if key in self.seen:
+            return
+        today = datetime.now().strftime('%Y-%m-%d')
+        with self.lock, self.connection:
+            self.seen[key] = today
+            self.connection.execute(
+                "INSERT OR IGNORE INTO seen_articles (dedup_key, nickname, first_seen_date) VALUES (?, ?, ?)",
+                (key, nickname, today)
+            )
+    
+    def __len__(self):
+        return len(self.seen)
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
 
 
 # ============ 高级封装类：微信文章管理器 ============
@@ -1257,17 +5249,47 @@ class ArticleAnalyzer:
 class WechatArticleManager:
     """微信公众号文章管理器 - 高级封装类"""
     
-    def __init__(self, credentials_file="weixin_credentials.py", headless=False):
+    def __init__(self, credentials_file="weixin_credentials.py", headless=False, fakeid_cache_file="fakeid_cache.json",
+                 watermark_file="account_watermarks.json", requests_per_minute=8, request_jitter=2.0,
+                 credential_pool=None, article_store_dir="article_store", index_file="article_index.db",
+                 database_file="wechat_articles.db", dedup_file="seen_articles.db", dedup_retention_days=30,
+                 validation_ttl=3600):
         """
         初始化管理器
         
         Args:
             credentials_file: 凭证文件路径
             headless: 是否使用无头模式（True表示不显示浏览器窗口）
+            fakeid_cache_file: 公众号fakeid缓存文件路径
+            watermark_file: 增量模式使用的公众号水位线文件路径
+            requests_per_minute: 该凭证每分钟允许的列表/搜索请求数
+            request_jitter: 每次请求额外增加的最大随机延迟（秒）
+            credential_pool: CredentialPool实例（可用CredentialPool.from_files创建），
+                传入后公众号会分散到多个凭证上爬取，credentials_file中的凭证也会加入池中
+            article_store_dir: 已下载文章的本地存储目录，为None时不保存到本地
+            index_file: 本地倒排索引数据库文件，为None时不建立索引
+            database_file: 文章数据库文件，爬取结果和分析结果都保存在其中，Excel从数据库导出；
+                为None时不使用数据库，Excel直接由爬取结果生成
+            dedup_file: 文章去重索引文件，多公众号爬取时跳过之前已爬取过的文章；
+                为None时改为按标题过滤昨天爬到的文章
+            dedup_retention_days: 去重索引保留的天数
+            validation_ttl: 凭证最近一次成功请求后多少秒内启动时不再在线验证
         """
-        self.auth_manager = WechatAuthManager(credentials_file)
+        self.auth_manager = WechatAuthManager(credentials_file, validation_ttl=validation_ttl)
+        self.fakeid_cache = FakeidCache(fakeid_cache_file)
+        self.watermark_store = AccountWatermarkStore(watermark_file)
+        self.rate_limiter = TokenBucket(requests_per_minute=requests_per_minute, jitter=request_jitter)
+        self.credential_pool = credential_pool
+        # 爬取和关键词分析共用页面缓存，每篇文章只下载一次；已保存到本地的文章不再下载
+        self.article_store = ArticleStore(article_store_dir) if article_store_dir else None
+        self.page_cache = ArticlePageCache(store=self.article_store)
+        # 爬取和分析过的文章都加入本地索引，之后可以用search_local_articles离线查询
+        self.article_index = ArticleIndex(index_file) if index_file else None
+        self.database = ArticleDatabase(database_file) if database_file else None
+        self.dedup_index = ArticleDedupIndex(dedup_file, retention_days=dedup_retention_days) if dedup_file else None
         self.crawler = None
-        self.analyzer = ArticleAnalyzer()
+        self.analyzer = ArticleAnalyzer(fetcher=AsyncArticleFetcher(page_cache=self.page_cache),
+                                        article_index=self.article_index)
         self.headless = headless  # 保存无头模式设置
     
     def ensure_authentication(self):
@@ -1280,7 +5302,14 @@ class WechatArticleManager:
         if self.auth_manager.ensure_valid_credentials(headless=self.headless):
             # 创建或更新爬虫实例
             if not self.crawler:
-                self.crawler = ArticleCrawler(self.auth_manager.cookie, self.auth_manager.token)
+                self.crawler = ArticleCrawler(self.auth_manager.cookie, self.auth_manager.token,
+                                              fakeid_cache=self.fakeid_cache, watermark_store=self.watermark_store,
+                                              rate_limiter=self.rate_limiter, credential_pool=self.credential_pool,
+                                              credential_name=self.auth_manager.credentials_file,
+                                              page_cache=self.page_cache, article_index=self.article_index,
+                                              dedup_index=self.dedup_index,
+                                              reauth_callback=self.reauthenticate_credential,
+                                              success_callback=self.auth_manager.record_success)
             else:
                 self.crawler.set_credentials(self.auth_manager.cookie, self.auth_manager.token)
             return True
@@ -1288,7 +5317,30 @@ class WechatArticleManager:
             print("无法获取有效凭证，操作中止")
             return False
     
-    def crawl_multiple_accounts(self, nickname_list, articles_per_account=10, days=2, output_file=None):
+    def reauthenticate_credential(self, credential_name):
+        """
+        爬取中途凭证失效时由爬虫调用，重新获取该凭证
+        
+        Args:
+            credential_name: 凭证名称（凭证文件路径）
+            
+        Returns:
+            tuple: 新的 (cookie, token)，失败时返回None
+        """
+        if credential_name == self.auth_manager.credentials_file:
+            if self.auth_manager.reauthenticate(headless=self.headless):
+                return self.auth_manager.cookie, self.auth_manager.token
+            return None
+        
+        # 凭证池中的其他凭证无法在这里扫码登录，只重新读取其凭证文件（可能已在其他地方更新）
+        auth_manager = WechatAuthManager(credential_name, validation_file=self.auth_manager.validation_file)
+        auth_manager.invalidate_validation()
+        if auth_manager.load_credentials():
+            return auth_manager.cookie, auth_manager.token
+        return None
+    
+    def crawl_multiple_accounts(self, nickname_list, articles_per_account=10, days=2, output_file=None, incremental=False, max_workers=3,
+                                resume=False):
         """
         爬取多个公众号的最近文章
         
@@ -1297,6 +5349,9 @@ class WechatArticleManager:
             articles_per_account: 每个公众号获取的文章数量
             days: 获取最近几天的文章
             output_file: 输出文件名，默认为None(自动生成)
+            incremental: 增量模式，只获取上次爬取之后的新文章
+            max_workers: 同时爬取的公众号数量
+            resume: 是否从上次中断的地方继续（需要与上次使用相同的参数和输出文件名）
             
         Returns:
             tuple: (成功标志, 文章列表)
@@ -1305,37 +5360,162 @@ class WechatArticleManager:
         if not self.ensure_authentication():
             return False, []
         
-        # 爬取文章
-        articles, stats = self.crawler.fetch_wechat_articles(
-            nickname_list, 
-            articles_per_account=articles_per_account, 
-            days=days
+        if output_file is None:
+            current_date = datetime.now()
+            output_file = f"{current_date.month}月{current_date.day}号wechat_articles.xlsx"
+        
+        # 爬取文章，每篇文章得到后立即写入JSON Lines文件，中途出错也不会丢失已爬取的结果
+        records_file = os.path.splitext(output_file)[0] + ".jsonl"
+        checkpoint = CrawlCheckpoint(
+            os.path.splitext(output_file)[0] + ".checkpoint.json",
+            {'mode': 'multiple', 'accounts': list(nickname_list), 'articles_per_account': articles_per_account,
+             'days': days, 'incremental': incremental}
         )
+        resumed = checkpoint.load(resume)
+        run_id = self.start_database_run('multiple', checkpoint.run_params)
+        if resumed:
+            restored = JsonlArticleSink.read(records_file)
+            checkpoint.restore_articles(restored)
+            if self.database is not None:
+                self.database.upsert_articles(restored, run_id)
+        print(f"爬取结果会实时保存到 {records_file}")
+        try:
+            with JsonlArticleSink(records_file, append=resumed) as sink:
+                for _, article in self.crawler.iter_wechat_articles(
+                    nickname_list, 
+                    articles_per_account=articles_per_account, 
+                    days=days,
+                    incremental=incremental,
+                    max_workers=max_workers,
+                    checkpoint=checkpoint,
+                    skip_seen=self.dedup_index is not None
+                ):
+                    sink.write(article)
+                    if self.database is not None:
+                        self.database.write(article, run_id)
+        finally:
+            if self.database is not None:
+                self.database.flush()
+        checkpoint.complete(nickname_list)
+        stats = self.crawler.last_run_stats
+        
+        if self.database is not None:
+            self.database.finish_run(run_id)
+            self.database.update_accounts(nickname_list, self.fakeid_cache)
+            # 从数据库导出本次运行的文章，按公众号列表顺序排列
+            articles = self.database.get_articles(run_id=run_id, nicknames=nickname_list)
+        else:
+            # 从实时保存的文件生成Excel，文章按公众号列表顺序排列
+            account_order = {}
+            for i, nickname in enumerate(nickname_list):
+                account_order.setdefault(nickname, i)
+            articles = sorted(JsonlArticleSink.read(records_file), key=lambda x: account_order.get(x.get('nickname'), len(nickname_list)))
         
         if not articles:
             print("未获取到任何文章")
             return False, []
         
-        # 保存到Excel
-        if output_file is None:
-            current_date = datetime.now()
-            output_file = f"{current_date.month}月{current_date.day}号wechat_articles.xlsx"
-            
-        save_articles_to_excel(articles, stats, output_file)
+        # 保存到Excel（已爬取过的文章在爬取时已经跳过，未启用去重索引时按标题过滤昨天的文章）
+        save_articles_to_excel(articles, stats, output_file, filter_existing=self.dedup_index is None, database=self.database)
         
         print(f"\n爬取完成！共爬取了 {len(articles)} 篇最近 {days} 天发布的文章")
         print(f"数据已保存到 {output_file}")
         
         return True, articles
     
-    def crawl_account_history(self, nickname, max_articles=100, output_file=None):
+    def save_articles(self, articles, output_file, run_id=None, analysis=None, stats_message=None):
+        """
+        保存单个公众号的结果，格式由文件扩展名决定（见open_article_sink）
+        
+        启用数据库时从数据库逐条导出本次运行的文章，否则直接写入传入的文章列表
+        
+        Args:
+            articles: 文章列表
+            output_file: 输出文件名
+            run_id: 数据库中的运行编号
+            analysis: (关键词列表, 权重列表, 排序方式)，导出关键词分析结果时给出
+            stats_message: 统计信息（Excel写在首行，Parquet写入元数据）
+        """
+        if self.database is not None:
+            self.database.export(output_file, stats_message=stats_message, run_id=run_id, analysis=analysis)
+            return
+        with open_article_sink(output_file, stats_message=stats_message) as sink:
+            sink.write_many(articles)
+    
+    def export_articles(self, output_file, **query):
+        """
+        从文章数据库导出文章，例如 export_articles("近一周.parquet", start_date="2025-06-01")
+        
+        Args:
+            output_file: 输出文件名，.xlsx / .parquet / .jsonl
+            **query: 查询条件（nicknames, start_date, end_date, run_id, analysis, limit）
+            
+        Returns:
+            int: 导出的文章数
+        """
+        if self.database is None:
+            print("未启用文章数据库（database_file为None）")
+            return 0
+        return self.database.export(output_file, **query)
+    
+    def start_database_run(self, mode, params):
+        """在数据库中记录一次运行，未使用数据库时返回None"""
+        if self.database is None:
+            return None
+        return self.database.start_run(mode, params)
+    
+    def collect_account_history(self, nickname, max_articles, output_file, resume=False):
+        """
+        爬取单个公众号的历史文章，结果实时写入与output_file同名的.jsonl文件，并记录检查点
+        
+        Args:
+            nickname: 公众号名称
+            max_articles: 最大爬取文章数量
+            output_file: 最终输出文件名（用于确定结果文件和检查点文件的位置）
+            resume: 是否从上次中断的地方继续
+            
+        Returns:
+            tuple: (数据库中的运行编号（未使用数据库时为None）, 全部文章（续爬时包含之前已保存的文章）)
+        """
+        base = os.path.splitext(output_file)[0]
+        records_file = base + ".jsonl"
+        checkpoint = CrawlCheckpoint(base + ".checkpoint.json",
+                                     {'mode': 'history', 'nickname': nickname, 'max_articles': max_articles})
+        resumed = checkpoint.load(resume)
+        run_id = self.start_database_run('history', checkpoint.run_params)
+        if resumed:
+            restored = JsonlArticleSink.read(records_file)
+            checkpoint.restore_articles(restored)
+            if self.database is not None:
+                self.database.upsert_articles(restored, run_id)
+        print(f"爬取结果会实时保存到 {records_file}")
+        
+        try:
+            with JsonlArticleSink(records_file, append=resumed) as sink:
+                for article in self.crawler.iter_articles(nickname=nickname, count=max_articles, checkpoint=checkpoint):
+                    sink.write(article)
+                    if self.database is not None:
+                        self.database.write(article, run_id)
+        finally:
+            if self.database is not None:
+                self.database.flush()
+        checkpoint.complete([nickname])
+        
+        if self.database is None:
+            return None, JsonlArticleSink.read(records_file)
+        self.database.finish_run(run_id)
+        self.database.update_accounts([nickname], self.fakeid_cache)
+        return run_id, self.database.get_articles(run_id=run_id)
+    
+    def crawl_account_history(self, nickname, max_articles=100, output_file=None, resume=False):
         """
         爬取单个公众号的历史文章
         
         Args:
             nickname: 公众号名称
             max_articles: 最大爬取文章数量
-            output_file: 输出文件名，默认为None(自动生成)
+            output_file: 输出文件名，默认为None(自动生成)；.parquet / .jsonl 结尾时输出对应格式
+            resume: 是否从上次中断的地方继续（需要与上次使用相同的参数和输出文件名）
             
         Returns:
             tuple: (成功标志, 文章列表)
@@ -1344,35 +5524,32 @@ class WechatArticleManager:
         if not self.ensure_authentication():
             return False, []
         
+        # 如果未指定输出文件名，则使用公众号名称自动生成
+        if output_file is None:
+            current_date = datetime.now()
+            output_file = f"{nickname}_{current_date.strftime('%Y%m%d')}_历史文章.xlsx"
+        
         # 爬取文章
-        articles = self.crawler.fetch_account_history(nickname, max_articles)
+        print(f"开始爬取公众号 '{nickname}' 的历史文章，最多 {max_articles} 篇")
+        run_id, articles = self.collect_account_history(nickname, max_articles, output_file, resume=resume)
         
         if not articles:
             print(f"未获取到公众号 '{nickname}' 的任何文章")
             return False, []
         
-        # 如果未指定输出文件名，则使用公众号名称自动生成
-        if output_file is None:
-            current_date = datetime.now()
-            output_file = f"{nickname}_{current_date.strftime('%Y%m%d')}_历史文章.xlsx"
-        
         # 创建简单的统计信息
         stats_message = f"公众号 '{nickname}' 历史文章爬取结果，共获取 {len(articles)} 篇文章"
         
-        # 保存到Excel（不过滤已存在的文章）
-        save_articles_to_excel(
-            articles_info=articles,
-            output_file=output_file,
-            filter_existing=False,
-            stats_message=stats_message
-        )
+        # 保存结果（不过滤已存在的文章），格式由文件扩展名决定
+        self.save_articles(articles, output_file, run_id=run_id, stats_message=stats_message)
         
         print(f"\n爬取完成！共爬取了公众号 '{nickname}' 的 {len(articles)} 篇历史文章")
         print(f"数据已保存到 {output_file}")
         
         return True, articles
     
-    def search_keywords_in_account(self, nickname, keywords, weights=None, max_articles=20, output_file=None):
+    def search_keywords_in_account(self, nickname, keywords, weights=None, max_articles=20, output_file=None, ranking='count',
+                                   resume=False):
         """
         搜索关键词并排序公众号文章
         
@@ -1381,7 +5558,9 @@ class WechatArticleManager:
             keywords: 关键词列表
             weights: 权重列表，默认都为1
             max_articles: 最大爬取文章数量
-            output_file: 输出文件名，默认为None(自动生成)
+            output_file: 输出文件名，默认为None(自动生成)；.parquet / .jsonl 结尾时输出对应格式
+            ranking: 排序方式，'count'（关键词次数×权重，默认）或 'bm25'
+            resume: 是否从上次中断的地方继续爬取文章列表
             
         Returns:
             tuple: (成功标志, 排序后的文章列表)
@@ -1394,37 +5573,71 @@ class WechatArticleManager:
         if not self.ensure_authentication():
             return False, []
         
+        # 如果未指定输出文件名，则使用关键词和公众号名称自动生成
+        if output_file is None:
+            keyword_str = "_".join(keywords)
+            current_date = datetime.now()
+            output_file = f"{nickname}_{keyword_str}_{current_date.strftime('%Y%m%d')}.xlsx"
+        
         # 爬取文章
-        articles = self.crawler.fetch_account_history(nickname, max_articles)
+        print(f"开始爬取公众号 '{nickname}' 的历史文章，最多 {max_articles} 篇")
+        run_id, articles = self.collect_account_history(nickname, max_articles, output_file, resume=resume)
         
         if not articles:
             print(f"未获取到公众号 '{nickname}' 的任何文章")
             return False, []
         
         # 分析关键词并排序
-        sorted_articles = self.analyzer.analyze_articles_with_keywords(articles, keywords, weights)
-        
-        # 如果未指定输出文件名，则使用关键词和公众号名称自动生成
-        if output_file is None:
-            keyword_str = "_".join(keywords)
-            current_date = datetime.now()
-            output_file = f"{nickname}_{keyword_str}_{current_date.strftime('%Y%m%d')}.xlsx"
+        sorted_articles = self.analyzer.analyze_articles_with_keywords(articles, keywords, weights, ranking=ranking)
+        if self.database is not None:
+            self.database.save_analysis(sorted_articles, keywords, weights, ranking, run_id)
         
         # 创建简单的统计信息
         keywords_str = ", ".join([f"{keywords[i]}(权重{weights[i]})" for i in range(len(keywords))])
         stats_message = f"公众号 '{nickname}' 关键词搜索: {keywords_str}，共分析 {len(sorted_articles)} 篇文章"
         
-        # 保存到Excel（不过滤已存在的文章）
-        save_articles_to_excel(
-            articles_info=sorted_articles,
-            output_file=output_file,
-            filter_existing=False,
-            stats_message=stats_message
-        )
+        # 保存结果（不过滤已存在的文章），格式由文件扩展名决定
+        self.save_articles(sorted_articles, output_file, run_id=run_id, analysis=(keywords, weights, ranking),
+                           stats_message=stats_message)
         
         print(f"\n搜索完成！共处理公众号 '{nickname}' 的 {len(sorted_articles)} 篇文章")
         print(f"数据已按关键词分数从高到低排序并保存到 {output_file}")
         
         return True, sorted_articles
-
-
+    
+    def search_local_articles(self, keywords, weights=None, nickname=None, match_all=False, limit=50, output_file=None):
+        """
+        在本地索引中搜索已爬取过的文章（不访问网络，也不需要登录）
+        
+        Args:
+            keywords: 关键词或关键词列表
+            weights: 权重列表，默认都为1
+            nickname: 只搜索该公众号的文章，默认搜索所有公众号
+            match_all: True表示文章需要包含所有关键词
+            limit: 最多返回的文章数量
+            output_file: 输出Excel文件名，默认为None（不保存）
+            
+        Returns:
+            tuple: (成功标志, 按关键词分数排序的文章列表)
+        """
+        if self.article_index is None:
+            print("未启用本地索引（index_file为None）")
+            return False, []
+        
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        articles = self.article_index.search(keywords, weights, nickname=nickname, match_all=match_all, limit=limit)
+        if not articles:
+            print(f"本地索引中没有找到包含关键词 {keywords} 的文章")
+            return False, []
+        
+        stats_message = f"本地索引关键词搜索: {', '.join(keywords)}，共找到 {len(articles)} 篇文章"
+        print(stats_message)
+        if output_file:
+            save_articles_to_excel(
+                articles_info=articles,
+                output_file=output_file,
+                filter_existing=False,
+                stats_message=stats_message
+            )
+        return True, articles